@@ -1,35 +1,25 @@
 import streamlit as st
-import json
-import os
 from datetime import datetime
+import datos_cache
 
 ALERTAS_FILE = "data/alertas_pendientes.json"
 HISTORIAL_ALERTAS = "data/alertas_atendidas.json"
 
 def cargar_alertas_pendientes():
-    if os.path.exists(ALERTAS_FILE):
-        with open(ALERTAS_FILE, "r", encoding="utf-8") as f:
-            return json.load(f)
-    return []
+    # Copia editable: mostrar_notificaciones filtra la lista y la vuelve a guardar
+    return datos_cache.leer_json_editable(ALERTAS_FILE, [])
 
 def guardar_alertas_pendientes(alertas):
-    with open(ALERTAS_FILE, "w", encoding="utf-8") as f:
-        json.dump(alertas, f, indent=2, ensure_ascii=False)
+    datos_cache.guardar_json(ALERTAS_FILE, alertas, indent=2)
 
 def registrar_alerta_atendida(alerta, usuario):
     alerta_atendida = alerta.copy()
     alerta_atendida["atendida_por"] = usuario
     alerta_atendida["fecha_atendida"] = datetime.now().isoformat()
 
-    historial = []
-    if os.path.exists(HISTORIAL_ALERTAS):
-        with open(HISTORIAL_ALERTAS, "r", encoding="utf-8") as f:
-            historial = json.load(f)
-
+    historial = datos_cache.leer_json_editable(HISTORIAL_ALERTAS, [])
     historial.append(alerta_atendida)
-
-    with open(HISTORIAL_ALERTAS, "w", encoding="utf-8") as f:
-        json.dump(historial, f, indent=2, ensure_ascii=False)
+    datos_cache.guardar_json(HISTORIAL_ALERTAS, historial, indent=2)
 
 def mostrar_notificaciones(usuario):
     with st.sidebar:
@@ -50,11 +40,12 @@ def mostrar_notificaciones(usuario):
                     continue  # No se agrega de nuevo
                 nuevas_alertas.append(alerta)
 
-        guardar_alertas_pendientes(nuevas_alertas)
+        # Solo se reescribe el archivo si se atendió alguna alerta
+        if len(nuevas_alertas) != len(alertas):
+            guardar_alertas_pendientes(nuevas_alertas)
 
         if not nuevas_alertas:
             st.info("No hay notificaciones nuevas.")
 def obtener_notificaciones():
     """Devuelve la cantidad de alertas pendientes."""
-    alertas = cargar_alertas_pendientes()
-    return len(alertas)
\ No newline at end of file
+    return len(datos_cache.leer_json(ALERTAS_FILE, []))
\ No newline at end of file
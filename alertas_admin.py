@@ -1,12 +1,12 @@
 # alertas.py
 import streamlit as st
-import sqlite3
+import conexion_db
 import datetime
 
 DB_ALERTAS = "alertas.db"
 
 def init_db():
-    conn = sqlite3.connect(DB_ALERTAS)
+    conn = conexion_db.conectar(DB_ALERTAS)
     c = conn.cursor()
     c.execute("""
         CREATE TABLE IF NOT EXISTS alertas (
@@ -21,7 +21,7 @@ def init_db():
     conn.close()
 
 def registrar_alerta(tipo, mensaje, prioridad="media"):
-    conn = sqlite3.connect(DB_ALERTAS)
+    conn = conexion_db.conectar(DB_ALERTAS)
     c = conn.cursor()
     fecha = datetime.datetime.now().strftime("%Y-%m-%d %H:%M:%S")
     c.execute("INSERT INTO alertas (tipo, mensaje, fecha, prioridad) VALUES (?, ?, ?, ?)",
@@ -33,7 +33,7 @@ def mostrar_alertas_admin():
     st.header("🔔 Panel de Alertas")
     init_db()
     
-    conn = sqlite3.connect(DB_ALERTAS)
+    conn = conexion_db.conectar(DB_ALERTAS)
     c = conn.cursor()
     c.execute("SELECT tipo, mensaje, fecha, prioridad FROM alertas ORDER BY fecha DESC")
     alertas = c.fetchall()
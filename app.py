@@ -175,8 +175,6 @@ import login
 import produccion_etapas
 import produccion_crear_op
 import produccion
-import json
-import os
 import alertas
 import produccion_trazabilidad
 import produccion_tpm  # Módulo TPM
@@ -191,11 +189,11 @@ import logistica
 import q_calidad
 import orden_servicios
 import produccion_smed
+import precarga
 from inventario import mostrar_gestion_inventario  # ⬅ Aquí importamos Inventario
 
 # Archivos de datos
 ALERTAS_FILE = "data/alertas_pendientes.json"
-OPS_FILE = "data/ordenes_produccion.json"
 
 # Mostrar información del usuario y botón de logout
 def mostrar_usuario_rol_logout():
@@ -230,173 +228,122 @@ def mostrar_usuario_rol_logout():
 
 
 
-# Cargar OPs desde archivo JSON
-def cargar_ops():
-    if os.path.exists(OPS_FILE):
-        with open(OPS_FILE, "r", encoding="utf-8") as f:
-            return json.load(f)
-    return []
-
-
 if 'login' not in st.session_state or not st.session_state['login']:
 
     login.login_modulo()
 
     
 else:
-    progress_text = "⏳ Preparando tu panel..."
-    # Creamos un contenedor vacío
-    progress_container = st.empty()
-
-    # Dentro del contenedor ponemos la barra
-    my_bar = progress_container.progress(0, text=progress_text)
+    # Precarga real de cachés: solo una vez por sesión
+    if "precarga" not in st.session_state:
+        progress_container = st.empty()
+        my_bar = progress_container.progress(0, text="⏳ Preparando tu panel...")
 
-    for percent_complete in range(100):
-        time.sleep(0.02)  # velocidad (0.02 → tarda ~2 seg)
-        my_bar.progress(percent_complete + 1, text=progress_text)
+        def al_avanzar(i, total, nombre):
+            my_bar.progress(int(i * 100 / total), text=f"⏳ {nombre}...")
 
-    # Mensaje de listo dentro del mismo contenedor
-    progress_container.success("✅ Listo!")
-    time.sleep(0.8)
-
-    # 🔥 Aquí borramos todo (barra + mensaje)
-    progress_container.empty()
+        st.session_state["precarga"] = precarga.ejecutar(st.session_state.get("usuario"), al_avanzar)
+        progress_container.empty()
 
     # 👉 Después de esto ya renderizas tu dashboard
-    # main_tabs = st.tabs([...])
     # Inicializar estado
     if "mostrar_sidebar" not in st.session_state:
         st.session_state.mostrar_sidebar = False
-    
-    # --- Tabs principales ---
-    main_tabs = st.tabs([
-        "📋 Menú  ",
-        "📋 Administración  ",
-        "🛒 Compras  ",
-        "💰 Ventas  ",
-        "🏭 Producción  ",
-        "🚚 Logística  ",
-        "✅ Calidad  "
-    ])
-
-    # --- MENU---
-
-# --- Pestaña Menú ---
-    with main_tabs[0]:
+
+    # --- Secciones ---
+    # Solo se ejecuta el módulo de la sección elegida (st.tabs ejecutaba todas
+    # las pestañas en cada rerun).
+    def seccion_menu():
         # Botón menú
         if st.button("📋 Menú", key="menu_btn"):
             st.session_state.mostrar_menu = not st.session_state.get("mostrar_menu", False)
-
-        # Si está abierto, mostrar opciones
-        if st.session_state.get("mostrar_menu", False):
-            mostrar_usuario_rol_logout()
-            alertas.mostrar_notificaciones(st.session_state['usuario'])
-
-
-    # --- ADMINISTRACIÓN ---
-    with main_tabs[1]:
-        sub_tabs_admin = st.tabs(["👤 Usuarios", "⚙️ Configuración", "🔔 Alertas"])
-
-        with sub_tabs_admin[0]:
-            if st.session_state['rol'] == "administrador":
-                login.gestion_usuario()
-                
-            else:
+            st.rerun()  # el sidebar ya se dibujó en esta pasada
+
+        with st.expander("⏱️ Tiempos de carga"):
+            pasos = st.session_state.get("precarga", [])
+            st.caption(f"Precarga: {sum(p['ms'] for p in pasos):.0f} ms")
+            st.dataframe(pasos, use_container_width=True, hide_index=True)
+            st.caption("Último render por sección (ms)")
+            st.json(st.session_state.get("tiempos_render", {}))
+
+    def solo_roles(funcion, roles=("administrador",), aviso=True):
+        def envoltura():
+            if st.session_state['rol'] in roles:
+                funcion()
+            elif aviso:
                 st.warning("No tienes permiso para ver esta sección.")
+        return envoltura
+
+    def control_produccion():
+        produccion.tablero_kanban()
+        produccion.visualizar_trazabilidad_sankey()
+
+    SECCIONES = {
+        "📋 Menú  ": {
+            "📋 Menú": seccion_menu
+        },
+        "📋 Administración  ": {
+            "👤 Usuarios": solo_roles(login.gestion_usuario),
+            "⚙️ Configuración": solo_roles(configuracion.mostrar_configuracion),
+            "🔔 Alertas": alertas_admin.mostrar_alertas_admin
+        },
+        "🛒 Compras  ": {
+            "📄 Orden de Compra ": orden_general.mostrar_modulo_compras,
+            "📄 Orden de Servicio ": orden_servicios.mostrar_modulo_servicios,
+            "📦 Recepción ": orden_general.mostrar_recepcion_materiales
+        },
+        "💰 Ventas  ": {
+            "📄 Cotizaciones ": d_ventas.mostrar_cotizaciones,
+            "📄 Órdenes de Venta ": d_ventas.mostrar_ordenes_venta,
+            "🚚 Despachos ": d_ventas.mostrar_despachos
+        },
+        "🏭 Producción  ": {
+            "➕ Crear OP ": solo_roles(produccion_crear_op.crear_op, ("administrador", "planificador"), aviso=False),
+            "⚙️ Etapas ": produccion_etapas.modulo_etapas,
+            "📊 Control de Producción ": control_produccion,
+            "🗺️ VSM ": produccion_vsm.mostrar_vsm,
+            "🧹 5S ": produccion_5s.mostrar_5s,
+            "SMED ": produccion_smed.smed_app,
+            "🔧 TPM  ": produccion_tpm.mostrar_tpm,
+            "🔍 Trazabilidad ": produccion_trazabilidad.mostrar_trazabilidad
+        },
+        "🚚 Logística  ": {
+            "📐 Layout ": logistica_planos.mostrar_visor_glb,
+            "🚛 Distribución ": logistica.mostrar_distribucion,
+            "📦 Inventario ": mostrar_gestion_inventario
+        },
+        "✅ Calidad  ": {
+            "✅ Inspección ": q_calidad.mostrar_calidad,
+            "📋 No Conformidades ": q_calidad.no_conformidades,
+            "📈 Análisis de Defectos ": q_calidad.analisis_defectos
+        }
+    }
 
-        with sub_tabs_admin[1]:
-            if st.session_state['rol'] == "administrador":
-                configuracion.mostrar_configuracion()
-            else:
-                st.warning("No tienes permiso para ver esta sección.")
-
-        with sub_tabs_admin[2]:
-            alertas_admin.mostrar_alertas_admin()
-
-    # --- COMPRAS ---
-    with main_tabs[2]:
-        sub_tabs_compras = st.tabs(["📄 Orden de Compra ", "📄 Orden de Servicio ", "📦 Recepción "])
-
-        with sub_tabs_compras[0]:
-            orden_general.mostrar_modulo_compras()
-
-        with sub_tabs_compras[1]:
-            orden_servicios.mostrar_modulo_servicios()
-
-        with sub_tabs_compras[2]:
-            orden_general.mostrar_recepcion_materiales()
-
-
-
-    # --- VENTAS ---
-    with main_tabs[3]:
-        sub_tabs_ventas = st.tabs(["📄 Cotizaciones ", "📄 Órdenes de Venta ", "🚚 Despachos "])
-
-        with sub_tabs_ventas[0]:
-            d_ventas.mostrar_cotizaciones()
-
-        with sub_tabs_ventas[1]:
-            d_ventas.mostrar_ordenes_venta()
-
-        with sub_tabs_ventas[2]:
-            d_ventas.mostrar_despachos()
-
-    # --- PRODUCCIÓN ---
-    with main_tabs[4]:
-        sub_tabs_produccion = st.tabs([
-            "➕ Crear OP ", "⚙️ Etapas ", "📊 Control de Producción ",
-            "🗺️ VSM ", "🧹 5S ", "SMED ", "🔧 TPM  ", "🔍 Trazabilidad "
-        ])
-
-        with sub_tabs_produccion[0]:
-            if st.session_state['rol'] in ["administrador", "planificador"]:
-                produccion_crear_op.crear_op()
-
-        with sub_tabs_produccion[1]:
-            produccion_etapas.modulo_etapas()
-
-        with sub_tabs_produccion[2]:
-            produccion.tablero_kanban()
-            produccion.visualizar_trazabilidad_sankey()
-
-        with sub_tabs_produccion[3]:
-            produccion_vsm.mostrar_vsm()
-          
-
-        with sub_tabs_produccion[4]:
-            produccion_5s.mostrar_5s()
-
-        with sub_tabs_produccion[5]:
-            produccion_smed.smed_app()
-        
-        with sub_tabs_produccion[6]:
-            produccion_tpm.mostrar_tpm()
-
-        with sub_tabs_produccion[7]:
-            produccion_trazabilidad.mostrar_trazabilidad()
-
-    # --- LOGÍSTICA ---
-    with main_tabs[5]:
-        sub_tabs_logistica = st.tabs(["📐 Layout ", "🚛 Distribución ", "📦 Inventario "])
-
-        with sub_tabs_logistica[0]:
-            logistica_planos.mostrar_visor_glb()
-
-        with sub_tabs_logistica[1]:
-            logistica.mostrar_distribucion()
-
-        with sub_tabs_logistica[2]:
-            mostrar_gestion_inventario()
-
-    # --- CALIDAD ---
-    with main_tabs[6]:
-        sub_tabs_calidad = st.tabs(["✅ Inspección ", "📋 No Conformidades ", "📈 Análisis de Defectos "])
-
-        with sub_tabs_calidad[0]:
-            q_calidad.mostrar_calidad()
-
-        with sub_tabs_calidad[1]:
-            q_calidad.no_conformidades()
-
-        with sub_tabs_calidad[2]:
-            q_calidad.analisis_defectos()
\ No newline at end of file
+    # --- Navegación principal ---
+    nombres_main = list(SECCIONES)
+    main = st.segmented_control(
+        "Sección", nombres_main, default=nombres_main[0],
+        key="nav_main", label_visibility="collapsed"
+    ) or nombres_main[0]
+
+    sub_secciones = SECCIONES[main]
+    nombres_sub = list(sub_secciones)
+    if len(nombres_sub) > 1:
+        sub = st.segmented_control(
+            "Subsección", nombres_sub, default=nombres_sub[0],
+            key=f"nav_sub_{nombres_main.index(main)}", label_visibility="collapsed"
+        ) or nombres_sub[0]
+    else:
+        sub = nombres_sub[0]
+
+    # --- Sidebar (usuario, logout y notificaciones) en todas las secciones ---
+    if st.session_state.get("mostrar_menu", False):
+        mostrar_usuario_rol_logout()
+        alertas.mostrar_notificaciones(st.session_state['usuario'])
+
+    # --- Render de la sección activa con su tiempo ---
+    inicio_render = time.perf_counter()
+    sub_secciones[sub]()
+    ms_render = (time.perf_counter() - inicio_render) * 1000
+    st.session_state.setdefault("tiempos_render", {})[f"{main.strip()} / {sub.strip()}"] = round(ms_render, 1)
+    st.caption(f"⏱️ {sub.strip()} renderizado en {ms_render:.0f} ms")
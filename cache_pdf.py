@@ -0,0 +1,97 @@
+# cache_pdf.py
+# Caché de PDFs generados (OC, OS) direccionada por contenido.
+# El nombre del archivo lleva el id del documento y un hash de sus campos:
+# mientras la orden no cambie se sirve el mismo PDF sin volver a armarlo,
+# y al editarla el hash cambia y la versión anterior se descarta.
+import glob
+import hashlib
+import json
+import os
+import threading
+import uuid
+
+CARPETA_CACHE = "files/cache_pdf"
+MAX_BYTES_CACHE = 200 * 1024 * 1024  # al superarlo se borran los menos usados
+
+_lock = threading.Lock()
+
+
+def huella(datos):
+    """Hash estable de los campos del documento."""
+    texto = json.dumps(datos, sort_keys=True, default=str, ensure_ascii=False)
+    return hashlib.sha256(texto.encode("utf-8")).hexdigest()[:20]
+
+
+def ruta(prefijo, id_doc, datos):
+    return os.path.join(CARPETA_CACHE, f"{prefijo}_{id_doc}_{huella(datos)}.pdf")
+
+
+def en_cache(prefijo, id_doc, datos):
+    return os.path.exists(ruta(prefijo, id_doc, datos))
+
+
+def _leer(destino):
+    with open(destino, "rb") as f:
+        datos = f.read()
+    try:
+        os.utime(destino)  # marca de uso para el desalojo
+    except OSError:
+        pass
+    return datos
+
+
+def _desalojar():
+    archivos = []
+    for archivo in glob.glob(os.path.join(CARPETA_CACHE, "*.pdf")):
+        try:
+            info = os.stat(archivo)
+            archivos.append((info.st_mtime, info.st_size, archivo))
+        except OSError:
+            continue  # borrado por otro proceso
+    total = sum(tamano for _, tamano, _ in archivos)
+    for _, tamano, archivo in sorted(archivos):
+        if total <= MAX_BYTES_CACHE:
+            break
+        try:
+            os.remove(archivo)
+            total -= tamano
+        except OSError:
+            pass
+
+
+def obtener(prefijo, id_doc, datos, generar):
+    """Bytes del PDF del documento. Si no está en caché llama a
+    generar(datos, ruta_pdf), lo guarda y borra las versiones anteriores
+    del mismo documento."""
+    destino = ruta(prefijo, id_doc, datos)
+    if os.path.exists(destino):
+        return _leer(destino)
+
+    os.makedirs(CARPETA_CACHE, exist_ok=True)
+    temporal = f"{destino}.{uuid.uuid4().hex[:8]}.tmp"  # cada usuario arma su propio temporal
+    try:
+        generar(datos, temporal)
+        os.replace(temporal, destino)
+    finally:
+        if os.path.exists(temporal):
+            os.remove(temporal)
+
+    with _lock:
+        for anterior in glob.glob(os.path.join(CARPETA_CACHE, f"{prefijo}_{id_doc}_*.pdf")):
+            if anterior != destino:
+                try:
+                    os.remove(anterior)
+                except OSError:
+                    pass
+        _desalojar()
+    return _leer(destino)
+
+
+def invalidar(prefijo, id_doc=None):
+    """Borra los PDFs de un documento (o de todo el prefijo)."""
+    patron = f"{prefijo}_{id_doc}_*.pdf" if id_doc is not None else f"{prefijo}_*.pdf"
+    for archivo in glob.glob(os.path.join(CARPETA_CACHE, patron)):
+        try:
+            os.remove(archivo)
+        except OSError:
+            pass
@@ -0,0 +1,123 @@
+# conexion_db.py
+# Administrador de conexiones SQLite compartido por todos los módulos.
+# Cada base (.db) mantiene un pool de conexiones abiertas en modo WAL, así un
+# clic ya no paga el costo de abrir el archivo y los lectores no bloquean al
+# que escribe. conn.close() devuelve la conexión al pool en vez de cerrarla.
+import os
+import sqlite3
+import threading
+from contextlib import contextmanager
+
+TIMEOUT_SEG = 10          # espera máxima ante un bloqueo de escritura
+MAX_LIBRES = 8            # conexiones ociosas que se guardan por base
+
+_lock = threading.Lock()
+_libres = {}              # ruta -> [Conexion]
+_pid = os.getpid()        # proceso dueño de _libres
+_heredadas = []           # conexiones del padre tras un fork: no se usan ni se cierran
+
+
+class Conexion(sqlite3.Connection):
+    """sqlite3.Connection cuyo close() la devuelve al pool."""
+
+    def close(self):
+        _devolver(self)
+
+    def cerrar_definitivo(self):
+        super().close()
+
+
+def _abrir(ruta):
+    conn = sqlite3.connect(ruta, timeout=TIMEOUT_SEG, check_same_thread=False, factory=Conexion)
+    conn.execute("PRAGMA journal_mode = WAL;")
+    conn.execute("PRAGMA synchronous = NORMAL;")
+    conn.execute(f"PRAGMA busy_timeout = {TIMEOUT_SEG * 1000};")
+    conn._ruta = ruta
+    conn._pid = os.getpid()
+    return conn
+
+
+def _revisar_fork():
+    """En un proceso hijo (fork del pool de procesos) el pool heredado es del
+    padre: una conexión SQLite no debe usarse en otro proceso. Llamar con _lock."""
+    global _pid
+    if _pid != os.getpid():
+        _heredadas.extend(c for lista in _libres.values() for c in lista)
+        _libres.clear()
+        _pid = os.getpid()
+
+
+def _devolver(conn):
+    if conn._pid != os.getpid():
+        _heredadas.append(conn)
+        return
+    try:
+        if conn.in_transaction:
+            conn.rollback()  # lo no confirmado se descarta, igual que al cerrar
+    except sqlite3.ProgrammingError:
+        return  # ya estaba cerrada
+    with _lock:
+        _revisar_fork()
+        libres = _libres.setdefault(conn._ruta, [])
+        if len(libres) < MAX_LIBRES and conn not in libres:
+            libres.append(conn)
+            return
+    conn.cerrar_definitivo()
+
+
+# ============================
+# API pública
+# ============================
+def conectar(ruta):
+    """Reemplazo de sqlite3.connect(ruta): toma una conexión del pool.
+    Se libera con conn.close() como siempre."""
+    ruta = str(ruta)
+    with _lock:
+        _revisar_fork()
+        libres = _libres.get(ruta)
+        conn = libres.pop() if libres else None
+    if conn is None:
+        conn = _abrir(ruta)
+    else:
+        # Estado por conexión que otro módulo pudo cambiar: vuelve al de una
+        # conexión nueva (p. ej. produccion_repositorio activa foreign_keys)
+        conn.execute("PRAGMA foreign_keys = OFF;")
+    conn.row_factory = None
+    return conn
+
+
+@contextmanager
+def conexion(ruta):
+    """with conexion(db) as conn: ... (devuelve la conexión al terminar)."""
+    conn = conectar(ruta)
+    try:
+        yield conn
+    finally:
+        conn.close()
+
+
+@contextmanager
+def transaccion(ruta):
+    """with transaccion(db) as conn: ... confirma al salir o revierte si hay error.
+    BEGIN IMMEDIATE toma el bloqueo de escritura al inicio, así dos usuarios
+    no leen el mismo saldo antes de escribir."""
+    conn = conectar(ruta)
+    try:
+        conn.execute("BEGIN IMMEDIATE")
+        yield conn
+        conn.commit()
+    except BaseException:
+        conn.rollback()
+        raise
+    finally:
+        conn.close()
+
+
+def cerrar_todo():
+    """Cierra las conexiones ociosas de todas las bases."""
+    with _lock:
+        _revisar_fork()
+        libres = [c for lista in _libres.values() for c in lista]
+        _libres.clear()
+    for conn in libres:
+        conn.cerrar_definitivo()
@@ -1,12 +1,12 @@
 # configuracion.py
 import streamlit as st
-import sqlite3
+import conexion_db
 import os
 
 DB_PATH = "configuracion.db"
 
 def init_db():
-    conn = sqlite3.connect(DB_PATH)
+    conn = conexion_db.conectar(DB_PATH)
     c = conn.cursor()
     c.execute("""
         CREATE TABLE IF NOT EXISTS configuracion (
@@ -28,7 +28,7 @@ def mostrar_configuracion():
     st.header("⚙️ Configuración del Sistema")
     init_db()
 
-    conn = sqlite3.connect(DB_PATH)
+    conn = conexion_db.conectar(DB_PATH)
     c = conn.cursor()
     c.execute("SELECT * FROM configuracion ORDER BY id DESC LIMIT 1")
     config = c.fetchone()
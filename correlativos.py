@@ -0,0 +1,128 @@
+# correlativos.py
+# Numeración central de documentos (OC, OS, COT, PROD).
+# Una fila por contador en correlativos.db: reservar un número es un UPDATE
+# atómico de esa fila, sin contar registros ni leer historiales completos.
+import os
+import re
+
+import conexion_db
+
+DB_CORRELATIVOS = "correlativos.db"
+
+# tipo -> formato del número
+FORMATOS = {
+    "OC": "{:04d}",
+    "OS": "{:04d}",
+    "COT": "COT-{:04d}",
+    "PROD": "PROD{:04d}",
+}
+
+
+# ============================
+# Semillas: último número ya usado antes de existir el contador
+# ============================
+def _max_numero(valores, patron=r"(\d+)$"):
+    maximo = 0
+    for v in valores:
+        m = re.search(patron, str(v or ""))
+        if m:
+            maximo = max(maximo, int(m.group(1)))
+    return maximo
+
+
+def _columna(db, sql):
+    if not os.path.exists(db):
+        return []
+    conn = conexion_db.conectar(db)
+    try:
+        return [r[0] for r in conn.execute(sql).fetchall()]
+    except Exception:
+        return []  # tabla aún no creada
+    finally:
+        conn.close()
+
+
+def _semilla_oc():
+    return _max_numero(_columna("ordenes_compra.db", "SELECT numero_oc FROM ordenes_compra"), r"^0*(\d+)$")
+
+
+def _semilla_os():
+    return _max_numero(_columna("orden_servicios.db", "SELECT numero_os FROM ordenes_servicio"), r"^0*(\d+)$")
+
+
+def _semilla_cot():
+    import cotizaciones_db  # al importarlo migra historial_cotizaciones.json si hace falta
+    return _max_numero(cotizaciones_db.numeros(), r"^COT-(\d+)$")
+
+
+def _semilla_prod():
+    return _max_numero(_columna("inventario.db", "SELECT codigo FROM inventario WHERE codigo LIKE 'PROD%'"), r"^PROD(\d+)$")
+
+
+SEMILLAS = {
+    "OC": _semilla_oc,
+    "OS": _semilla_os,
+    "COT": _semilla_cot,
+    "PROD": _semilla_prod,
+}
+
+
+# ============================
+# Esquema
+# ============================
+def init_db():
+    conn = conexion_db.conectar(DB_CORRELATIVOS)
+    c = conn.cursor()
+    c.execute("""
+        CREATE TABLE IF NOT EXISTS secuencias (
+            tipo TEXT PRIMARY KEY,
+            ultimo INTEGER NOT NULL
+        )
+    """)
+    conn.commit()
+    conn.close()
+
+
+def _asegurar(c, tipo):
+    """Crea el contador la primera vez, partiendo del mayor número ya emitido."""
+    c.execute("SELECT 1 FROM secuencias WHERE tipo = ?", (tipo,))
+    if c.fetchone() is None:
+        semilla = SEMILLAS.get(tipo, lambda: 0)()
+        c.execute("INSERT OR IGNORE INTO secuencias (tipo, ultimo) VALUES (?, ?)", (tipo, semilla))
+
+
+def formatear(tipo, numero):
+    return FORMATOS.get(tipo, "{}").format(numero)
+
+
+# ============================
+# API pública
+# ============================
+def siguiente(tipo):
+    """Número que probablemente saldrá (solo para mostrar, no lo reserva).
+    Es un SELECT simple; solo la primera vez, sin contador, crea la fila."""
+    conn = conexion_db.conectar(DB_CORRELATIVOS)
+    c = conn.cursor()
+    c.execute("SELECT ultimo FROM secuencias WHERE tipo = ?", (tipo,))
+    fila = c.fetchone()
+    conn.close()
+    if fila is None:
+        with conexion_db.transaccion(DB_CORRELATIVOS) as conn:
+            c = conn.cursor()
+            _asegurar(c, tipo)
+            c.execute("SELECT ultimo FROM secuencias WHERE tipo = ?", (tipo,))
+            fila = c.fetchone()
+    return formatear(tipo, fila[0] + 1)
+
+
+def reservar(tipo):
+    """Reserva atómicamente el siguiente número del tipo y lo devuelve formateado.
+    Dos usuarios que guardan a la vez reciben números distintos."""
+    with conexion_db.transaccion(DB_CORRELATIVOS) as conn:
+        c = conn.cursor()
+        _asegurar(c, tipo)
+        c.execute("UPDATE secuencias SET ultimo = ultimo + 1 WHERE tipo = ? RETURNING ultimo", (tipo,))
+        return formatear(tipo, c.fetchone()[0])
+
+
+init_db()
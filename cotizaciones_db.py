@@ -0,0 +1,225 @@
+# cotizaciones_db.py
+# Repositorio de cotizaciones sobre SQLite.
+# Reemplaza historial_cotizaciones.json: guardar o editar una cotización es
+# un upsert de su fila, y el historial se consulta por cliente y fecha con
+# paginación por cursor en lugar de cargar todo el archivo.
+import json
+import os
+from datetime import datetime
+
+import conexion_db
+
+DB_COTIZACIONES = "cotizaciones.db"
+HISTORIAL_JSON = "historial_cotizaciones.json"
+
+# Columnas propias; el resto de la cotización (tabla, cantidades, desglose...)
+# se guarda como JSON en `datos`
+CAMPOS_COT = [
+    "numero", "cliente", "fecha", "descripcion", "cantidad_aceptada",
+    "acabados", "recubrimientos", "material", "maquina_tipo_impresion"
+]
+
+
+# ============================
+# Conexión y esquema
+# ============================
+def get_conn():
+    return conexion_db.conectar(DB_COTIZACIONES)
+
+
+def init_db():
+    conn = get_conn()
+    c = conn.cursor()
+    c.execute("""
+        CREATE TABLE IF NOT EXISTS cotizaciones (
+            id INTEGER PRIMARY KEY AUTOINCREMENT,
+            numero TEXT NOT NULL,
+            cliente TEXT,
+            fecha TEXT,
+            descripcion TEXT,
+            cantidad_aceptada INTEGER,
+            acabados TEXT,
+            recubrimientos TEXT,
+            material TEXT,
+            maquina_tipo_impresion TEXT,
+            datos TEXT, -- JSON
+            actualizado TEXT
+        )
+    """)
+    c.execute("""
+        CREATE TABLE IF NOT EXISTS meta (
+            clave TEXT PRIMARY KEY,
+            valor TEXT
+        )
+    """)
+    c.execute("CREATE UNIQUE INDEX IF NOT EXISTS idx_cot_numero ON cotizaciones(numero)")
+    c.execute("CREATE INDEX IF NOT EXISTS idx_cot_cliente_fecha ON cotizaciones(cliente COLLATE NOCASE, fecha, id)")
+    c.execute("CREATE INDEX IF NOT EXISTS idx_cot_fecha ON cotizaciones(fecha, id)")
+    conn.commit()
+    conn.close()
+
+    migrar_desde_json()
+    reparar_cantidades_legado()
+
+
+def migrar_desde_json():
+    """Importa una sola vez historial_cotizaciones.json.
+    El archivo no se modifica; la marca queda registrada en la tabla meta."""
+    conn = get_conn()
+    c = conn.cursor()
+    c.execute("SELECT valor FROM meta WHERE clave = 'migracion_json'")
+    if c.fetchone():
+        conn.close()
+        return 0
+
+    historial = []
+    if os.path.exists(HISTORIAL_JSON):
+        with open(HISTORIAL_JSON, "r", encoding="utf-8") as f:
+            historial = json.load(f) or []
+
+    migradas = 0
+    for cot in historial:
+        if cot.get("numero"):
+            _upsert(c, _desde_legado(cot), actualizar=False)
+            migradas += 1
+
+    c.execute("INSERT INTO meta (clave, valor) VALUES ('migracion_json', ?)",
+              (datetime.now().isoformat(),))
+    conn.commit()
+    conn.close()
+    return migradas
+
+
+def _desde_legado(cot):
+    """El historial JSON guardaba la cantidad aceptada como "cantidades": <int>;
+    hoy "cantidades" es la lista de quiebres. El número pasa a su columna."""
+    cot = dict(cot)
+    if isinstance(cot.get("cantidades"), (int, float)):
+        cantidad = cot.pop("cantidades")
+        if cot.get("cantidad_aceptada") is None:
+            cot["cantidad_aceptada"] = int(cantidad)
+    return cot
+
+
+def reparar_cantidades_legado():
+    """Corrige una sola vez las filas ya migradas sin _desde_legado
+    (cantidad_aceptada NULL y la cantidad escalar dentro de `datos`)."""
+    conn = get_conn()
+    c = conn.cursor()
+    c.execute("SELECT valor FROM meta WHERE clave = 'reparacion_cantidades'")
+    if c.fetchone():
+        conn.close()
+        return 0
+
+    c.execute(f"SELECT {', '.join(CAMPOS_COT)}, datos FROM cotizaciones WHERE cantidad_aceptada IS NULL")
+    reparadas = 0
+    for fila in c.fetchall():
+        cot = _a_dict(fila)
+        if isinstance(cot.get("cantidades"), (int, float)):
+            _upsert(c, _desde_legado(cot))
+            reparadas += 1
+
+    c.execute("INSERT INTO meta (clave, valor) VALUES ('reparacion_cantidades', ?)",
+              (datetime.now().isoformat(),))
+    conn.commit()
+    conn.close()
+    return reparadas
+
+
+# ============================
+# Conversión fila <-> dict
+# ============================
+def _a_fila(cot):
+    extra = {k: v for k, v in cot.items() if k not in CAMPOS_COT}
+    return [cot.get(campo) for campo in CAMPOS_COT] + [json.dumps(extra, ensure_ascii=False)]
+
+
+def _a_dict(fila):
+    cot = dict(zip(CAMPOS_COT, fila[:len(CAMPOS_COT)]))
+    cot.update(json.loads(fila[len(CAMPOS_COT)] or "{}"))
+    return cot
+
+
+def _upsert(c, cot, actualizar=True):
+    conflicto = f"""DO UPDATE SET {", ".join(f"{campo} = excluded.{campo}" for campo in CAMPOS_COT[1:])},
+                   datos = excluded.datos, actualizado = excluded.actualizado""" if actualizar else "DO NOTHING"
+    c.execute(f"""
+        INSERT INTO cotizaciones ({", ".join(CAMPOS_COT)}, datos, actualizado)
+        VALUES ({", ".join("?" * (len(CAMPOS_COT) + 1))}, ?)
+        ON CONFLICT(numero) {conflicto}
+    """, _a_fila(cot) + [datetime.now().isoformat()])
+
+
+# ============================
+# API pública
+# ============================
+def guardar(cot):
+    """Inserta o actualiza (por número) solo esta cotización."""
+    conn = get_conn()
+    c = conn.cursor()
+    _upsert(c, cot)
+    conn.commit()
+    conn.close()
+
+
+def obtener(numero):
+    conn = get_conn()
+    c = conn.cursor()
+    c.execute(f"SELECT {', '.join(CAMPOS_COT)}, datos FROM cotizaciones WHERE numero = ?", (numero,))
+    fila = c.fetchone()
+    conn.close()
+    return _a_dict(fila) if fila else None
+
+
+def pagina(limite=20, despues=None, cliente=None, desde=None, hasta=None, texto=None):
+    """Cotizaciones de la más reciente a la más antigua, `limite` por página.
+    `despues` es el cursor (fecha, id) devuelto por la página anterior.
+    Devuelve (filas, cursor_siguiente); cursor_siguiente es None al final.
+    Cada fila es (id, numero, cliente, fecha, descripcion, cantidad_aceptada)."""
+    condiciones, params = [], []
+    if cliente:
+        condiciones.append("cliente = ? COLLATE NOCASE")
+        params.append(cliente)
+    if desde:
+        condiciones.append("fecha >= ?")
+        params.append(str(desde))
+    if hasta:
+        condiciones.append("fecha <= ?")
+        params.append(str(hasta))
+    if texto:
+        condiciones.append("(numero LIKE ? OR descripcion LIKE ?)")
+        params += [f"%{texto}%", f"%{texto}%"]
+    if despues:
+        condiciones.append("(fecha, id) < (?, ?)")
+        params += list(despues)
+    where = f"WHERE {' AND '.join(condiciones)}" if condiciones else ""
+
+    conn = get_conn()
+    c = conn.cursor()
+    c.execute(f"""
+        SELECT id, numero, cliente, fecha, descripcion, cantidad_aceptada
+        FROM cotizaciones {where}
+        ORDER BY fecha DESC, id DESC
+        LIMIT ?
+    """, params + [limite + 1])
+    filas = c.fetchall()
+    conn.close()
+
+    cursor = None
+    if len(filas) > limite:
+        filas = filas[:limite]
+        cursor = (filas[-1][3], filas[-1][0])
+    return filas, cursor
+
+
+def numeros():
+    """Todos los números emitidos (para la semilla del correlativo COT)."""
+    conn = get_conn()
+    c = conn.cursor()
+    c.execute("SELECT numero FROM cotizaciones")
+    resultado = [r[0] for r in c.fetchall()]
+    conn.close()
+    return resultado
+
+
+init_db()
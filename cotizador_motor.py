@@ -0,0 +1,488 @@
+# cotizador_motor.py
+# Motor de precios del cotizador, sin Streamlit.
+# Las tablas de base_data se compilan una sola vez a diccionarios (búsqueda
+# directa por clave) y cotizar(spec) devuelve el desglose completo, desde los
+# conceptos de costo hasta SUB TOTAL ... COSTO UNIT., para una o muchas
+# cantidades a la vez. Se puede importar y medir fuera de la app:
+#   python cotizador_motor.py
+import math
+import time
+
+import numpy as np
+import pandas as pd
+
+# =====================
+# DATA BASE
+# =====================
+detalle_costos = ["DISEÑO","PRUEBA DE COLOR","PLACAS","IMPRESIÓN",
+    "MATERIAL 1:","COSTO CONVERSION:", "CORTE RESMAS A PLIEGO", "PLASTICO MATE RETIRA","0",
+    "0","PELICULA RECUBRIMIENTO","MANTILLA RECUBRIIENTO:","TROQUEL","TROQUELADO 1","TROQUELADO 2",
+    "CITOS","HOT STAMPING","CLICHÉ HOT STAMPING","PELICULA HOT STAMPING","REPUJADO","CLICHÉ REPUJADO",
+    "PELICULA REPUJADO","MANUALIDAD 1:","MANUALIDAD 2:","ASA DE BOLSA", "EMPAQUETADO",
+    "DESGLOCE","CONTRAPLACADO","MOVILIDAD INTERNA","DELIVERY","SUB TOTAL","COSTOS FIJOS",
+    "COMISION VENTA","COSTO TOTAL","UTILIDAD","COSTO FINAL VENTA","COSTO FINAL INCLUIDO IGV",
+    "COSTO UNIT.","TIRAJE DE IMPRESION","PRECIO MINIMO","HOJAS DE RESMAS A UTILIZAR",
+    "CANTIDAD MINIMA DE PLIEGOS"
+]
+
+base_data = {
+    "DISEÑO": {
+        "YA EXISTE": 0,
+        "NUEVO SIMPLE": 20,
+        "NUEVO MEDIO": 50,
+        "NUEVO ESPECIAL": 90
+    },
+
+    "PRUEBA DE COLOR": {
+        "0": 0,
+        "DIGITAL A4": 20,
+        "DIGITAL A3": 40,
+        "OFFSET 50X35": 90,
+        "OFFSET 50X70": 140,
+        "OFFSET 70X100": 350
+    },
+
+
+    "IMPRESIÓN": {
+        "MAQUINA": [ "GTOZ(50X35CM 1 Y 2 COLORES)",
+            "KOMORI(35X50 CM)","KOMORI(50X70 CM)",
+            "CD(70X100CM)", "SORSZ(70X100CM 1 Y 2 COLORES)",
+            "0"
+        ],
+        "COLORES DE IMPRESION": [
+            "1", "2", "1T/1R", "3", "4", "4S", "2T/2R",
+            "5", "4ST/1R", "6", "4ST/2R", "3T/3R", "4ST/4SR"
+        ],
+        "PLACAS": [
+            1, 2, 2, 3, 4, 4, 4,
+            5, 5, 6, 6, 6, 8
+        ],
+        "DATOS_TABLA": {
+            "MAQUINA DE IMPRESIÓN": ["1", "2", "1T/1R", "3", "4", "4S", "2T/2R",
+            "5", "4ST/1R", "6", "4ST/2R", "3T/3R", "4ST/4SR"],
+            "CANTIDAD DE PLACAS": [1, 2, 2, 3, 4, 4, 4, 5, 5, 6, 6, 6, 8],
+            "GTOZ(50X35CM 1 Y 2 COLORES)": [25, 50, 50, 75, 100, 50, 100, 125, 75, 150, 100, 150, 100],
+            "KOMORI(35X50 CM)": [35, 70, 70, 105, 140, 70, 140, 175, 105, 210, 140, 210, 140],
+            "KOMORI(50X70 CM)": [60, 120, 120, 180, 240, 90, 240, 300, 150, 360, 210, 360, 180],
+            "CD(70X100CM)": [220, 440, 440, 660, 880, 250, 880, 1100, 470, 1320, 690, 1320, 500],
+            "SORSZ(70X100CM 1 Y 2 COLORES)": [120, 240, 240, 360, 480, 300, 480, 600, 420, 720, 540, 720, 600],
+            "MEDIDA DE PLACAS": [
+                "51X40 PINZA 3 CM", "74.5X60.5 PINZA 6CM", "74.5X60.5 PINZA 6CM",
+                "79X103 PINZA 5 CM", "79X103 PINZA 5 CM", "", "", "", "", "", "", "", ""
+            ],
+            "PRECIO DE PLACAS": [8.75, 15, 15, 25, 30, 0, 0, 0, 0, 0, 0, 0, 0]
+        }
+    },
+
+
+    "SERIGRAFIA": {
+        "CANTIDAD DE PLACAS": [1, 2, 2, 3, 4, 4, 4, 5, 5, 6, 6, 6, 8],
+        "SERIGRAFIA 50X35": [140, 280, 280, 420, 560, 560, 560, 700, 700, 840, 840, 840, 1120],
+        "SERIGRAFIA 50X70 CM": [220, 440, 440, 660, 880, 880, 880, 1100, 1100, 1320, 1320, 1320, 1760],
+        "SERIGRAFIA 70X100 CM": [300, 600, 600, 900, 1200, 1200, 1200, 1500, 1500, 1800, 1800, 1800, 2400],
+        "0": [0, 0, 0, 0, 0, 0, 0, 0, 0, 0, 0, 0, 0]
+    },
+
+
+    "MAQUINA DE TROQUELADO": {
+        "HEIDELBERG 40X57 CM": 25,
+        "HEIDELBERG 57X82 CM.": 25,
+        "MAQUINA DE LIBRO 70X100 CM.TROQUEL GRANDE": 100,
+        "MAQUINA DE LIBRO 70X100 CM.TROQUEL MEDIANO-REPUJADO": 70,
+        "MAQUINA DE LIBRO 70X100 CM.TROQUEL CHICO": 60,
+        "0": 0
+    },
+    "TIPO DE MANUALIDAD": {
+        "PEGA LINEAL CAJA CONGELADOS": 45,
+        "TRIPLE PEGA CAJA": 45,
+        "ARMADO DE LONCHERA": 45,
+        "FORMADORA DE CAJAS": 25,
+        "ARMADO DE CAJAS ESPECIALES": 120,
+        "PEGADO DE BOLSA 1 PARTE": 350,
+        "PEGADO DE CONO": 45,
+        "PEGADO DE 1 CUERPO + CONTRAPLACADO DE 2 ASAS INCLUYE COLA": 252.5,
+        "PEGADO DE MICA": 25,
+        "0": 0
+    },
+    "CLICHÉ": {
+        "0": 0,
+        "MINIMO (5X5 CM)": 30,
+        "X DIMENSION": "#¡REF!"
+    },
+    "PELICULA": {
+        "0": 0,
+        "MINIMO": 14.16,
+        "X DIMENSION": "#¡REF!"
+    },
+    "DESGLOCE": {
+        "0": 0,
+        "SIMPLE": 5,
+        "1 MILLAR X HORA, 1 PERSONA": 9,
+        "1 MILLAR X HORA, 2 PERSONA": 18,
+        "I MILLAR X HORA, 3 PERSONAS": 27
+    },
+    "REFUERZOS DE BOLSA": {
+        "0": 0,
+        "SOLO BASE": 90,
+        "BASE Y LATERALES": 120
+    },
+    "EMPAQUETADO": {
+        "PAQUETE DE 400(2 HOJAS X PLIEGO)": 3,
+        "MITAD DE PAPEL PAQUETE X 300": 9,
+        "MITAD DE PAPEL PAQUETE X 500": 10,
+        "LONCHERAS ARMADAS EN CAJAS": 30,
+        "LONCHERAS EMPAQUETADAS EN PAPEL": 22,
+        "BANDEJAS ARMADAS EMPAQUETADAS EN PAPEL": 5,
+        "0": 0
+    },
+
+    "TROQUEL": {
+        "0": 0,
+        "YA EXISTE": 20,
+        "MINIMO": 15,
+        "NUEVO MEDIANO": 50,
+        "NUEVO GRANDE": 120,
+        "AGREGA PRECIO MANUALMENTE": 20
+    },    
+    "MOVILIDAD INTERNA": {
+        "0": 0,
+        "MOVILIDAD INTERNA CERCA": 25,
+        "MOVILIDAD INTERNA LEJOS": 50
+    },
+    "ASA DE BOLSA": {
+        "0": 0,
+        "ASA DE PAPEL TWIST": 200,
+        "ASA TROQUELADA": 35,
+        "ASA DRIZA DELGADA": 94,
+        "ASA DRIZA GRUESA": 133,
+        "ASA TELA SATINADA 15 MM.": 206,
+        "ASA TELA SATINADA 20 MM.": 224,
+        "ASA YUTE DELGADA": 76,
+        "ASA YUTE GRUESA": 94
+    },
+    "CLICHÉ COTIZADOR 2": {
+        "0": 0,
+        "MINIMO (5X5 CM)": 30,
+        "X DIMENSION": "#¡REF!"
+    },
+    "PELICULA COTIZADOR 2": {
+        "0": 0,
+        "MINIMO": 14.16,
+        "X DIMENSION": "#¡REF!"
+    },
+    "TROQUEL COTIZADOR 2": {
+        "0": 0,
+        "YA EXISTE": 20,
+        "MINIMO": 15,
+        "NUEVO MEDIANO": 50,
+        "NUEVO GRANDE": 120,
+        "AGREGA PRECIO MANUALMENTE": "#¡REF!"
+    },
+    "DELIVERY": {
+        "0": 0,
+        "SIMPLE 1 ENTREGA": 25,
+        "2 ENTREGAS": 50,
+        "3 ENTREGAS": 75,
+        "4 ENTREGAS": 100,
+        "CAMION PEQUEÑO H100 2 TONELADAS": 250,
+        "CAMION MEDIANO H300 5 TONELADAS": 350
+    },
+    "IMPRESION LASER": {
+        "0": 0,
+        "A4 (21X29.7 CM.)INCLUYE MATERIAL(COUCHE HASTA 300 GRS -ADHESIVO P3-RB C-14)": 1000,
+        "A3 (29.7X42 CM.)INCLUYE MATERIAL(COUCHE HASTA 300 GRS -ADHESIVO P3-RB C-14)": 2000,
+        "A4 (21X29.7 CM.)SIN MATERIAL": 800,
+        "A3 (29.7X42 CM.)SIN MATERIAL": 1600
+    },
+    "IMPRESION PLOTER": {
+        "0": 0,
+        "146X100 CM.VINYL ADHESIVO ARCLAD (IMPRESION + LAMINADO + TROQUELADO)": 50000,
+        "146X100 CM.VINYL ADHESIVO ARCLAD (IMPRESION + TROQUELADO)": 4200,
+        "146X100 CM. VINYL ADHESIVO ARCLAD(IMPRESION + LAMINADO)": 3400
+    },
+    "CONTRAPLACADO": {
+        "0": 0,
+        "50X35 CM": 200,
+        "33.3X70 CM.": 240,
+        "50X70 CM.": 70,
+        "70X100 CM.": 700
+    }
+
+}
+
+
+# Filas de la tabla de costos del cotizador (en este orden)
+CONCEPTOS = [
+    "CANTIDAD", "DISEÑO", "PRUEBA DE COLOR", "PLACAS", "IMPRESIÓN", "MATERIAL 1:",
+    "COSTO CONVERSION:", "CORTE RESMAS A PLIEGO", "BARNIZ UV SECTORIZADO TIRA", "0", "0",
+    "PELICULA RECUBRIMIENTO", "MANTILLA RECUBRIIENTO:", "TROQUEL", "TROQUELADO 1", "TROQUELADO 2",
+    "CITOS", "HOT STAMPING", "CLICHÉ HOT STAMPING", "PELICULA HOT STAMPING", "REPUJADO",
+    "CLICHÉ REPUJADO", "PELICULA REPUJADO", "MANUALIDAD 1:", "MANUALIDAD 2:", "ASA DE BOLSA",
+    "EMPAQUETADO", "DESGLOCE", "CONTRAPLACADO", "MOVILIDAD INTERNA", "DELIVERY", "SUB TOTAL",
+    "COSTOS FIJOS", "COMISION VENTA", "COSTO TOTAL", "UTILIDAD", "COSTO FINAL VENTA",
+    "COSTO FINAL INCLUIDO IGV", "COSTO UNIT.", "TIRAJE DE IMPRESION", "PRECIO MINIMO",
+    "HOJAS DE RESMAS A UTILIZAR", "CANTIDAD MINIMA DE PLIEGOS"
+]
+
+# Márgenes y mínimos: la hoja original tenía las filas (COSTOS FIJOS, COMISION
+# VENTA, UTILIDAD, CANTIDAD MINIMA DE PLIEGOS) pero no sus valores. Sus valores
+# por defecto se publican en la lista de precios (sección SECCION_MARGENES,
+# versionada en listas_precios); una versión sin esa sección los deja en 0.
+SECCION_MARGENES = "MÁRGENES Y MÍNIMOS"
+# clave de la spec -> (fila de la sección, divisor: los % se publican como 10 = 10 %)
+MARGENES = {
+    "costos_fijos_pct": ("COSTOS FIJOS %", 100),
+    "comision_pct": ("COMISION VENTA %", 100),
+    "utilidad_pct": ("UTILIDAD %", 100),
+    "precio_minimo": ("PRECIO MINIMO (S/)", 1),
+    "minimo_pliegos": ("CANTIDAD MINIMA DE PLIEGOS", 1),
+}
+# Constantes fijas
+IGV = 0.18             # tasa general del IGV en Perú
+HOJAS_POR_RESMA = 500
+
+# Valores por defecto de una cotización; cotizar() completa la spec con estos
+SPEC_BASE = {
+    "cantidad": 1000,
+    "diseno": "YA EXISTE",
+    "prueba_color": "0",
+    "maquina": "0",
+    "colores": "1",
+    "placas": None,               # n° de placas elegido; None = el de la tabla según colores
+    "producto_x_pliego": 1,
+    "pliegos_demasia": 0,
+    "pliegos_x_hoja": 1,
+    "hojas_resma": None,          # si se indica, reemplaza al cálculo por pliegos_x_hoja
+    "precio_resma": 0.0,          # sin IGV, 500 hojas
+    "costo_conversion": 0.0,
+    "corte_x_millar": 0.0,        # corte de resma a pliego, por millar de hojas
+    "costo_consumo": 0.0,         # recubrimiento por metro
+    "metros_usar": 0.0,
+    "costo_pelicula": 0.0,
+    "costo_mantilla": 0.0,
+    "costo_troquel": 0.0,
+    "troquelado1": "0",           # máquina de troquelado (precio por millar de pliegos)
+    "troquelado2": "0",
+    "citos": 0.0,
+    "hot_x_millar": 0.0,
+    "cliche_hot": 0.0,
+    "pelicula_hot": 0.0,
+    "repujado_x_millar": 0.0,
+    "cliche_repujado": 0.0,
+    "pelicula_repujado": 0.0,
+    "manualidad1_x_millar": 0.0,
+    "manualidad2_x_millar": 0.0,
+    "asa_x_millar": 0.0,
+    "empaquetado_x_millar": 0.0,
+    "desgloce_x_millar": 0.0,
+    "contraplacado": "0",
+    "movilidad": "0",
+    "delivery": "0",
+    "precio_minimo": 0.0,         # márgenes: los de la lista de precios (compilar) si la spec no los trae
+    "minimo_pliegos": 0,
+    "costos_fijos_pct": 0.0,
+    "comision_pct": 0.0,
+    "utilidad_pct": 0.0,
+}
+
+
+# ============================
+# Compilación de tablas
+# ============================
+def _numero(valor):
+    """Las celdas con error de la hoja original (#¡REF!) cuentan como 0."""
+    return float(valor) if isinstance(valor, (int, float)) else 0.0
+
+
+def compilar(base):
+    """Convierte base_data (o una versión de listas_precios) en diccionarios
+    de búsqueda directa."""
+    datos = base["IMPRESIÓN"]["DATOS_TABLA"]
+    colores = datos["MAQUINA DE IMPRESIÓN"]
+    maquinas = [m for m in base["IMPRESIÓN"]["MAQUINA"] if m in datos]
+    margenes = base.get(SECCION_MARGENES, {})
+    return {
+        "opciones": {
+            seccion: {opcion: _numero(precio) for opcion, precio in valores.items()}
+            for seccion, valores in base.items()
+            if isinstance(valores, dict) and all(not isinstance(v, (dict, list)) for v in valores.values())
+        },
+        "impresion": {(m, color): _numero(datos[m][i]) for m in maquinas for i, color in enumerate(colores)},
+        "precio_placa": {color: _numero(datos["PRECIO DE PLACAS"][i]) for i, color in enumerate(colores)},
+        "num_placas": {color: int(datos["CANTIDAD DE PLACAS"][i]) for i, color in enumerate(colores)},
+        "margenes": {clave: _numero(margenes.get(fila)) / divisor for clave, (fila, divisor) in MARGENES.items()},
+    }
+
+
+# Tablas de la lista incluida en el código (semilla de listas_precios)
+TABLAS = compilar(base_data)
+
+
+def precio_opcion(seccion, opcion, tablas=None):
+    return (tablas or TABLAS)["opciones"].get(seccion, {}).get(opcion, 0.0)
+
+
+def precio_impresion(maquina, colores, tablas=None):
+    """Precio por millar de pliegos según máquina y colores (0 si no aplica)."""
+    return (tablas or TABLAS)["impresion"].get((maquina, colores), 0.0)
+
+
+def precio_placas(colores, tablas=None):
+    """Precio de una placa para la combinación de colores."""
+    return (tablas or TABLAS)["precio_placa"].get(colores, 0.0)
+
+
+def num_placas(colores, tablas=None):
+    return (tablas or TABLAS)["num_placas"].get(colores, 0)
+
+
+# ============================
+# Cálculo
+# ============================
+def cotizar_cantidades(spec, cantidades, tablas=None, ajustes=None):
+    """Desglose para varias cantidades en una sola pasada de NumPy.
+    spec: dict con las claves de SPEC_BASE (las que falten toman su valor
+    por defecto); su "cantidad" solo sirve de referencia para escalar
+    "hojas_resma" cuando se indica a mano.
+    Devuelve {concepto: ndarray} en el orden de CONCEPTOS, un valor por cantidad.
+    Costos fijos (diseño, placas, troquel, clichés, películas, movilidad...)
+    se cobran una vez; impresión, troquelado, hot stamping y repujado van
+    por millar de pliegos (con el mínimo de pliegos); manualidades, asas,
+    empaquetado y desgloce por millar de unidades; el material por hoja de
+    resma. COSTO FINAL VENTA nunca baja de PRECIO MINIMO.
+    tablas: resultado de compilar() para una versión de la lista de precios
+    (por defecto, la lista incluida en el código).
+    ajustes: {concepto: {índice de cantidad: valor}} que reemplazan el costo
+    calculado antes de sumar los totales (correcciones a mano del vendedor).
+    Solo se aplican a los conceptos de costo; los totales siempre se recalculan."""
+    tablas = tablas or TABLAS
+    s = {**SPEC_BASE, **tablas["margenes"], **spec}
+    cantidad = np.maximum(np.asarray(cantidades, dtype=float), 1)
+    por_pliego = max(int(s["producto_x_pliego"]), 1)
+    por_hoja = float(s["pliegos_x_hoja"]) or 1
+
+    pliegos = np.ceil(cantidad / por_pliego) + int(s["pliegos_demasia"])
+    if s["hojas_resma"]:
+        pliegos_ref = math.ceil(max(int(s["cantidad"]), 1) / por_pliego) + int(s["pliegos_demasia"])
+        hojas = np.ceil(float(s["hojas_resma"]) * pliegos / pliegos_ref)
+    else:
+        hojas = np.ceil(pliegos / por_hoja)
+    millares_tiraje = np.maximum(pliegos, s["minimo_pliegos"]) / 1000
+    millares_unid = cantidad / 1000
+    fijo = np.ones_like(cantidad)
+
+    costos = {
+        "DISEÑO": precio_opcion("DISEÑO", s["diseno"], tablas) * fijo,
+        "PRUEBA DE COLOR": precio_opcion("PRUEBA DE COLOR", s["prueba_color"], tablas) * fijo,
+        "PLACAS": precio_placas(s["colores"], tablas) * (s["placas"] or num_placas(s["colores"], tablas)) * fijo,
+        "IMPRESIÓN": precio_impresion(s["maquina"], s["colores"], tablas) * millares_tiraje,
+        "MATERIAL 1:": s["precio_resma"] / HOJAS_POR_RESMA * hojas,
+        "COSTO CONVERSION:": s["costo_conversion"] * fijo,
+        "CORTE RESMAS A PLIEGO": s["corte_x_millar"] * hojas / 1000,
+        "BARNIZ UV SECTORIZADO TIRA": s["costo_consumo"] * s["metros_usar"] * fijo,
+        "PELICULA RECUBRIMIENTO": s["costo_pelicula"] * fijo,
+        "MANTILLA RECUBRIIENTO:": s["costo_mantilla"] * fijo,
+        "TROQUEL": s["costo_troquel"] * fijo,
+        "TROQUELADO 1": precio_opcion("MAQUINA DE TROQUELADO", s["troquelado1"], tablas) * millares_tiraje,
+        "TROQUELADO 2": precio_opcion("MAQUINA DE TROQUELADO", s["troquelado2"], tablas) * millares_tiraje,
+        "CITOS": s["citos"] * fijo,
+        "HOT STAMPING": s["hot_x_millar"] * millares_tiraje,
+        "CLICHÉ HOT STAMPING": s["cliche_hot"] * fijo,
+        "PELICULA HOT STAMPING": s["pelicula_hot"] * fijo,
+        "REPUJADO": s["repujado_x_millar"] * millares_tiraje,
+        "CLICHÉ REPUJADO": s["cliche_repujado"] * fijo,
+        "PELICULA REPUJADO": s["pelicula_repujado"] * fijo,
+        "MANUALIDAD 1:": s["manualidad1_x_millar"] * millares_unid,
+        "MANUALIDAD 2:": s["manualidad2_x_millar"] * millares_unid,
+        "ASA DE BOLSA": s["asa_x_millar"] * millares_unid,
+        "EMPAQUETADO": s["empaquetado_x_millar"] * millares_unid,
+        "DESGLOCE": s["desgloce_x_millar"] * millares_unid,
+        "CONTRAPLACADO": precio_opcion("CONTRAPLACADO", s["contraplacado"], tablas) * fijo,
+        "MOVILIDAD INTERNA": precio_opcion("MOVILIDAD INTERNA", s["movilidad"], tablas) * fijo,
+        "DELIVERY": precio_opcion("DELIVERY", s["delivery"], tablas) * fijo,
+    }
+
+    for concepto, por_cantidad in (ajustes or {}).items():
+        if concepto not in costos:
+            continue
+        valores = np.array(np.broadcast_to(costos[concepto], cantidad.shape), dtype=float)
+        for indice, valor in por_cantidad.items():
+            if 0 <= int(indice) < len(valores) and valor is not None:
+                valores[int(indice)] = float(valor)
+        costos[concepto] = valores
+
+    sub_total = np.sum(list(costos.values()), axis=0)
+    costos_fijos = sub_total * s["costos_fijos_pct"]
+    comision = (sub_total + costos_fijos) * s["comision_pct"]
+    costo_total = sub_total + costos_fijos + comision
+    utilidad = costo_total * s["utilidad_pct"]
+    final_venta = np.maximum(costo_total + utilidad, s["precio_minimo"])
+
+    cero = np.zeros_like(cantidad)
+    resultado = {concepto: costos.get(concepto, cero) for concepto in CONCEPTOS}
+    resultado.update({
+        "CANTIDAD": cantidad,
+        "SUB TOTAL": sub_total,
+        "COSTOS FIJOS": costos_fijos,
+        "COMISION VENTA": comision,
+        "COSTO TOTAL": costo_total,
+        "UTILIDAD": utilidad,
+        "COSTO FINAL VENTA": final_venta,
+        "COSTO FINAL INCLUIDO IGV": final_venta * (1 + IGV),
+        "COSTO UNIT.": final_venta / cantidad,
+        "TIRAJE DE IMPRESION": pliegos,
+        "PRECIO MINIMO": s["precio_minimo"] * fijo,
+        "HOJAS DE RESMAS A UTILIZAR": hojas,
+        "CANTIDAD MINIMA DE PLIEGOS": s["minimo_pliegos"] * fijo,
+    })
+    return resultado
+
+
+def cotizar(spec, tablas=None):
+    """Desglose de una sola cantidad (spec["cantidad"]): {concepto: float}."""
+    cantidad = spec.get("cantidad", SPEC_BASE["cantidad"])
+    return {concepto: float(valores[0]) for concepto, valores in cotizar_cantidades(spec, [cantidad], tablas).items()}
+
+
+def tabla_quiebres(spec, cantidades, tablas=None):
+    """Tabla de precios por cantidad: una fila por concepto y una columna por cantidad."""
+    resultado = cotizar_cantidades(spec, cantidades, tablas)
+    return pd.DataFrame(
+        [resultado[concepto] for concepto in CONCEPTOS],
+        index=CONCEPTOS,
+        columns=[f"{int(q):,}" for q in resultado["CANTIDAD"]]
+    )
+
+
+def tabla_costos(resultado):
+    """Lista [(concepto, valor)] en el orden de la tabla; conserva las filas repetidas ("0")."""
+    return [(concepto, resultado.get(concepto, 0.0)) for concepto in CONCEPTOS]
+
+
+def benchmark(n=10000):
+    """Cotizaciones por segundo con una spec típica."""
+    spec = {"cantidad": 5000, "maquina": "KOMORI(50X70 CM)", "colores": "4", "diseno": "NUEVO MEDIO",
+            "producto_x_pliego": 4, "pliegos_demasia": 100, "pliegos_x_hoja": 2, "precio_resma": 380.0,
+            "troquelado1": "HEIDELBERG 57X82 CM.", "delivery": "SIMPLE 1 ENTREGA", "precio_minimo": 250}
+    inicio = time.perf_counter()
+    for i in range(n):
+        cotizar({**spec, "cantidad": 1000 + i})
+    segundos = time.perf_counter() - inicio
+    return {"cotizaciones": n, "segundos": round(segundos, 3), "por_seg": round(n / segundos, 1)}
+
+
+def benchmark_quiebres(puntos=100, repeticiones=1000):
+    """Milisegundos por tabla de `puntos` cantidades (curva de costo unitario)."""
+    cantidades = np.geomspace(100, 100000, puntos)
+    spec = {"maquina": "KOMORI(50X70 CM)", "colores": "4", "producto_x_pliego": 4, "precio_resma": 380.0,
+            "manualidad1_x_millar": 45, "delivery": "SIMPLE 1 ENTREGA", "precio_minimo": 250}
+    inicio = time.perf_counter()
+    for _ in range(repeticiones):
+        cotizar_cantidades(spec, cantidades)
+    ms = (time.perf_counter() - inicio) * 1000 / repeticiones
+    return {"cantidades": puntos, "ms_por_tabla": round(ms, 3)}
+
+
+if __name__ == "__main__":
+    print(benchmark())
+    print(benchmark_quiebres())
@@ -1,246 +1,129 @@
 import streamlit as st
 import pandas as pd
-import json, os
+import numpy as np
 from datetime import date
+import datos_cache
+import correlativos
+import cotizaciones_db
+import maestros
+import listas_precios
+import cotizador_motor as motor
 
-HISTORIAL_FILE = "historial_cotizaciones.json"
 CLIENTES_FILE = "clientes.json"
 
-def cargar_historial():
-    if os.path.exists(HISTORIAL_FILE):
-        with open(HISTORIAL_FILE, "r", encoding="utf-8") as f:
-            return json.load(f)
-    return []
-
-def guardar_historial(historial):
-    with open(HISTORIAL_FILE, "w", encoding="utf-8") as f:
-        json.dump(historial, f, ensure_ascii=False, indent=2)
-
 
 # --- Funciones para cargar y guardar clientes ---
 def cargar_clientes():
-    if os.path.exists(CLIENTES_FILE):
-        with open(CLIENTES_FILE, "r", encoding="utf-8") as f:
-            return json.load(f)
-    return []
+    return datos_cache.leer_json_editable(CLIENTES_FILE, [])
 
 def guardar_clientes(clientes):
-    with open(CLIENTES_FILE, "w", encoding="utf-8") as f:
-        json.dump(clientes, f, ensure_ascii=False, indent=2)
-
-# --- Cargar clientes ---
-clientes = cargar_clientes()
-nombres_clientes = [cliente["nombre"] for cliente in clientes]
-
-
-
-# =====================
-# DATA BASE
-# =====================
-detalle_costos = ["DISEÑO","PRUEBA DE COLOR","PLACAS","IMPRESIÓN",
-    "MATERIAL 1:","COSTO CONVERSION:", "CORTE RESMAS A PLIEGO", "PLASTICO MATE RETIRA","0",
-    "0","PELICULA RECUBRIMIENTO","MANTILLA RECUBRIIENTO:","TROQUEL","TROQUELADO 1","TROQUELADO 2",
-    "CITOS","HOT STAMPING","CLICHÉ HOT STAMPING","PELICULA HOT STAMPING","REPUJADO","CLICHÉ REPUJADO",
-    "PELICULA REPUJADO","MANUALIDAD 1:","MANUALIDAD 2:","ASA DE BOLSA", "EMPAQUETADO",
-    "DESGLOCE","CONTRAPLACADO","MOVILIDAD INTERNA","DELIVERY","SUB TOTAL","COSTOS FIJOS",
-    "COMISION VENTA","COSTO TOTAL","UTILIDAD","COSTO FINAL VENTA","COSTO FINAL INCLUIDO IGV",
-    "COSTO UNIT.","TIRAJE DE IMPRESION","PRECIO MINIMO","HOJAS DE RESMAS A UTILIZAR",
-    "CANTIDAD MINIMA DE PLIEGOS"
-]
-
-base_data = {
-    "DISEÑO": {
-        "YA EXISTE": 0,
-        "NUEVO SIMPLE": 20,
-        "NUEVO MEDIO": 50,
-        "NUEVO ESPECIAL": 90
-    },
-
-    "PRUEBA DE COLOR": {
-        "0": 0,
-        "DIGITAL A4": 20,
-        "DIGITAL A3": 40,
-        "OFFSET 50X35": 90,
-        "OFFSET 50X70": 140,
-        "OFFSET 70X100": 350
-    },
-
-
-    "IMPRESIÓN": {
-        "MAQUINA": [ "GTOZ(50X35CM 1 Y 2 COLORES)",
-            "KOMORI(35X50 CM)","KOMORI(50X70 CM)",
-            "CD(70X100CM)", "SORSZ(70X100CM 1 Y 2 COLORES)",
-            "0"
-        ],
-        "COLORES DE IMPRESION": [
-            "1", "2", "1T/1R", "3", "4", "4S", "2T/2R",
-            "5", "4ST/1R", "6", "4ST/2R", "3T/3R", "4ST/4SR"
-        ],
-        "PLACAS": [
-            1, 2, 2, 3, 4, 4, 4,
-            5, 5, 6, 6, 6, 8
-        ],
-        "DATOS_TABLA": {
-            "MAQUINA DE IMPRESIÓN": ["1", "2", "1T/1R", "3", "4", "4S", "2T/2R",
-            "5", "4ST/1R", "6", "4ST/2R", "3T/3R", "4ST/4SR"],
-            "CANTIDAD DE PLACAS": [1, 2, 2, 3, 4, 4, 4, 5, 5, 6, 6, 6, 8],
-            "GTOZ(50X35CM 1 Y 2 COLORES)": [25, 50, 50, 75, 100, 50, 100, 125, 75, 150, 100, 150, 100],
-            "KOMORI(35X50 CM)": [35, 70, 70, 105, 140, 70, 140, 175, 105, 210, 140, 210, 140],
-            "KOMORI(50X70 CM)": [60, 120, 120, 180, 240, 90, 240, 300, 150, 360, 210, 360, 180],
-            "CD(70X100CM)": [220, 440, 440, 660, 880, 250, 880, 1100, 470, 1320, 690, 1320, 500],
-            "SORSZ(70X100CM 1 Y 2 COLORES)": [120, 240, 240, 360, 480, 300, 480, 600, 420, 720, 540, 720, 600],
-            "MEDIDA DE PLACAS": [
-                "51X40 PINZA 3 CM", "74.5X60.5 PINZA 6CM", "74.5X60.5 PINZA 6CM",
-                "79X103 PINZA 5 CM", "79X103 PINZA 5 CM", "", "", "", "", "", "", "", ""
-            ],
-            "PRECIO DE PLACAS": [8.75, 15, 15, 25, 30, 0, 0, 0, 0, 0, 0, 0, 0]
+    datos_cache.guardar_json(CLIENTES_FILE, clientes, indent=2)
+
+
+
+
+QUIEBRES_DEFECTO = "1000, 3000, 5000, 10000"
+ROLES_LISTAS_PRECIOS = ("administrador",)  # quiénes publican listas de precios
+
+def parsear_cantidades(texto):
+    """'1000, 3k, 5000' -> [1000, 3000, 5000]; ignora lo que no sea número."""
+    cantidades = []
+    for parte in str(texto).replace(";", ",").split(","):
+        parte = parte.strip().lower().replace(" ", "")
+        multiplicador = 1000 if parte.endswith("k") else 1
+        try:
+            valor = int(float(parte.rstrip("k")) * multiplicador)
+        except ValueError:
+            continue
+        if valor > 0:
+            cantidades.append(valor)
+    return cantidades
+
+
+def leer_ajustes(guardados, tabla_editada):
+    """Correcciones a mano de la tabla de costos: las guardadas con la
+    cotización más las hechas en la tabla editable (fila -> concepto,
+    columna "Cantidad n" -> índice n-1). Una celda vaciada vuelve al cálculo."""
+    ajustes = {concepto: dict(valores) for concepto, valores in (guardados or {}).items()}
+    for fila, cambios in ((tabla_editada or {}).get("edited_rows") or {}).items():
+        concepto = motor.CONCEPTOS[int(fila)]
+        for columna, valor in cambios.items():
+            if not columna.startswith("Cantidad "):
+                continue
+            indice = str(int(columna.split()[1]) - 1)
+            if valor is None:
+                ajustes.get(concepto, {}).pop(indice, None)
+            else:
+                ajustes.setdefault(concepto, {})[indice] = float(valor)
+    return {concepto: valores for concepto, valores in ajustes.items() if valores}
+
+
+def añadir_cantidad(cantidades):
+    """Agrega una columna a la tabla de costos: el doble de la mayor cantidad."""
+    st.session_state["cot_quiebres"] = f"{st.session_state['cot_quiebres']}, {max(cantidades) * 2}"
+
+
+# --- Listas de precios: publicar una versión nueva de una sección ---
+def mostrar_listas_precios():
+    # Mismo criterio que solo_roles en app.py: el rol de la sesión
+    if st.session_state.get("rol") not in ROLES_LISTAS_PRECIOS:
+        st.warning("No tienes permiso para ver esta sección.")
+        return
+    versiones = listas_precios.listar()
+    st.dataframe(
+        pd.DataFrame(versiones, columns=["Versión", "Vigente desde", "Creado", "Usuario", "Nota"]),
+        use_container_width=True, hide_index=True
+    )
+
+    actual = listas_precios.vigente()
+    base_actual = listas_precios.base(actual)
+    secciones = listas_precios.secciones_simples(base_actual)
+    if motor.SECCION_MARGENES not in secciones:
+        # Versiones anteriores a los márgenes en la lista: se publican desde aquí
+        secciones.append(motor.SECCION_MARGENES)
+    seccion = st.selectbox("Sección", secciones, key="lp_seccion")
+    valores = base_actual.get(seccion) or {fila: None for fila, _ in motor.MARGENES.values()}
+    editada = st.data_editor(
+        pd.DataFrame({"OPCIÓN": list(valores.keys()), "PRECIO": list(valores.values())}),
+        num_rows="dynamic", use_container_width=True, hide_index=True, key=f"lp_tabla_{actual}_{seccion}"
+    )
+    col1, col2 = st.columns(2)
+    vigente_desde = col1.date_input("Vigente desde", key="lp_vigente_desde")
+    nota = col2.text_input("Nota", key="lp_nota")
+
+    if st.button("📋 Publicar nueva versión", key="lp_publicar"):
+        datos = dict(base_actual)
+        datos[seccion] = {
+            str(fila["OPCIÓN"]): (None if pd.isna(fila["PRECIO"]) else float(fila["PRECIO"]))
+            for fila in editada.to_dict(orient="records") if str(fila["OPCIÓN"] or "").strip()
         }
-    },
-
-
-    "SERIGRAFIA": {
-        "CANTIDAD DE PLACAS": [1, 2, 2, 3, 4, 4, 4, 5, 5, 6, 6, 6, 8],
-        "SERIGRAFIA 50X35": [140, 280, 280, 420, 560, 560, 560, 700, 700, 840, 840, 840, 1120],
-        "SERIGRAFIA 50X70 CM": [220, 440, 440, 660, 880, 880, 880, 1100, 1100, 1320, 1320, 1320, 1760],
-        "SERIGRAFIA 70X100 CM": [300, 600, 600, 900, 1200, 1200, 1200, 1500, 1500, 1800, 1800, 1800, 2400],
-        "0": [0, 0, 0, 0, 0, 0, 0, 0, 0, 0, 0, 0, 0]
-    },
-
-
-    "MAQUINA DE TROQUELADO": {
-        "HEIDELBERG 40X57 CM": 25,
-        "HEIDELBERG 57X82 CM.": 25,
-        "MAQUINA DE LIBRO 70X100 CM.TROQUEL GRANDE": 100,
-        "MAQUINA DE LIBRO 70X100 CM.TROQUEL MEDIANO-REPUJADO": 70,
-        "MAQUINA DE LIBRO 70X100 CM.TROQUEL CHICO": 60,
-        "0": 0
-    },
-    "TIPO DE MANUALIDAD": {
-        "PEGA LINEAL CAJA CONGELADOS": 45,
-        "TRIPLE PEGA CAJA": 45,
-        "ARMADO DE LONCHERA": 45,
-        "FORMADORA DE CAJAS": 25,
-        "ARMADO DE CAJAS ESPECIALES": 120,
-        "PEGADO DE BOLSA 1 PARTE": 350,
-        "PEGADO DE CONO": 45,
-        "PEGADO DE 1 CUERPO + CONTRAPLACADO DE 2 ASAS INCLUYE COLA": 252.5,
-        "PEGADO DE MICA": 25,
-        "0": 0
-    },
-    "CLICHÉ": {
-        "0": 0,
-        "MINIMO (5X5 CM)": 30,
-        "X DIMENSION": "#¡REF!"
-    },
-    "PELICULA": {
-        "0": 0,
-        "MINIMO": 14.16,
-        "X DIMENSION": "#¡REF!"
-    },
-    "DESGLOCE": {
-        "0": 0,
-        "SIMPLE": 5,
-        "1 MILLAR X HORA, 1 PERSONA": 9,
-        "1 MILLAR X HORA, 2 PERSONA": 18,
-        "I MILLAR X HORA, 3 PERSONAS": 27
-    },
-    "REFUERZOS DE BOLSA": {
-        "0": 0,
-        "SOLO BASE": 90,
-        "BASE Y LATERALES": 120
-    },
-    "EMPAQUETADO": {
-        "PAQUETE DE 400(2 HOJAS X PLIEGO)": 3,
-        "MITAD DE PAPEL PAQUETE X 300": 9,
-        "MITAD DE PAPEL PAQUETE X 500": 10,
-        "LONCHERAS ARMADAS EN CAJAS": 30,
-        "LONCHERAS EMPAQUETADAS EN PAPEL": 22,
-        "BANDEJAS ARMADAS EMPAQUETADAS EN PAPEL": 5,
-        "0": 0
-    },
-
-    "TROQUEL": {
-        "0": 0,
-        "YA EXISTE": 20,
-        "MINIMO": 15,
-        "NUEVO MEDIANO": 50,
-        "NUEVO GRANDE": 120,
-        "AGREGA PRECIO MANUALMENTE": 20
-    },    
-    "MOVILIDAD INTERNA": {
-        "0": 0,
-        "MOVILIDAD INTERNA CERCA": 25,
-        "MOVILIDAD INTERNA LEJOS": 50
-    },
-    "ASA DE BOLSA": {
-        "0": 0,
-        "ASA DE PAPEL TWIST": 200,
-        "ASA TROQUELADA": 35,
-        "ASA DRIZA DELGADA": 94,
-        "ASA DRIZA GRUESA": 133,
-        "ASA TELA SATINADA 15 MM.": 206,
-        "ASA TELA SATINADA 20 MM.": 224,
-        "ASA YUTE DELGADA": 76,
-        "ASA YUTE GRUESA": 94
-    },
-    "CLICHÉ COTIZADOR 2": {
-        "0": 0,
-        "MINIMO (5X5 CM)": 30,
-        "X DIMENSION": "#¡REF!"
-    },
-    "PELICULA COTIZADOR 2": {
-        "0": 0,
-        "MINIMO": 14.16,
-        "X DIMENSION": "#¡REF!"
-    },
-    "TROQUEL COTIZADOR 2": {
-        "0": 0,
-        "YA EXISTE": 20,
-        "MINIMO": 15,
-        "NUEVO MEDIANO": 50,
-        "NUEVO GRANDE": 120,
-        "AGREGA PRECIO MANUALMENTE": "#¡REF!"
-    },
-    "DELIVERY": {
-        "0": 0,
-        "SIMPLE 1 ENTREGA": 25,
-        "2 ENTREGAS": 50,
-        "3 ENTREGAS": 75,
-        "4 ENTREGAS": 100,
-        "CAMION PEQUEÑO H100 2 TONELADAS": 250,
-        "CAMION MEDIANO H300 5 TONELADAS": 350
-    },
-    "IMPRESION LASER": {
-        "0": 0,
-        "A4 (21X29.7 CM.)INCLUYE MATERIAL(COUCHE HASTA 300 GRS -ADHESIVO P3-RB C-14)": 1000,
-        "A3 (29.7X42 CM.)INCLUYE MATERIAL(COUCHE HASTA 300 GRS -ADHESIVO P3-RB C-14)": 2000,
-        "A4 (21X29.7 CM.)SIN MATERIAL": 800,
-        "A3 (29.7X42 CM.)SIN MATERIAL": 1600
-    },
-    "IMPRESION PLOTER": {
-        "0": 0,
-        "146X100 CM.VINYL ADHESIVO ARCLAD (IMPRESION + LAMINADO + TROQUELADO)": 50000,
-        "146X100 CM.VINYL ADHESIVO ARCLAD (IMPRESION + TROQUELADO)": 4200,
-        "146X100 CM. VINYL ADHESIVO ARCLAD(IMPRESION + LAMINADO)": 3400
-    },
-    "CONTRAPLACADO": {
-        "0": 0,
-        "50X35 CM": 200,
-        "33.3X70 CM.": 240,
-        "50X70 CM.": 70,
-        "70X100 CM.": 700
-    }
-
-}
+        nueva = listas_precios.publicar(datos, vigente_desde, st.session_state.get("usuario"), nota or None)
+        if nueva == actual:
+            st.info("Sin cambios: la lista vigente ya tiene esos precios.")
+        else:
+            st.success(f"✅ Lista de precios v{nueva} vigente desde {vigente_desde}.")
+            st.rerun()
 
 
 # --- Función principal para mostrar el cotizador ---
 def mostrar_cotizador():
     cotizacion_editando = st.session_state.get("cotizacion_editar", None)
+
+    # Una cotización guardada se recalcula con la lista con la que se hizo
+    version_lista = listas_precios.vigente()
+    if cotizacion_editando:
+        version_cot = listas_precios.version_de(cotizacion_editando)
+        if version_cot != version_lista and not st.toggle(
+                f"Recalcular con la lista vigente (v{version_lista})", key="cot_lista_vigente"):
+            version_lista = version_cot
+    base_data = listas_precios.base(version_lista)
+    tablas = listas_precios.tablas(version_lista)
+
     col_form, col_tabla = st.columns([2,1])
 
     with col_form:
         st.subheader("N° 0 : Datos principales")
+        st.caption(f"Lista de precios v{version_lista}")
 
         # --- Layout en tres columnas ---
         # --- Layout principal en tres columnas ---
@@ -250,25 +133,23 @@ def mostrar_cotizador():
         # Columna 1 - Número de cotización
         # =========================
         with col1:
+            numero_sugerido = None
             if cotizacion_editando:
                 cotizacion_num = st.text_input("Número de cotización", value=cotizacion_editando["numero"])
             else:
+                numero_sugerido = correlativos.siguiente("COT")
                 cotizacion_num = st.text_input(
                     "Número de cotización", 
-                    value=f"COT-{len(cargar_historial())+1:04}"
+                    value=numero_sugerido
                 )
 
         # =========================
         # Columna 2 - Seleccionar cliente
         # =========================
         with col2:
-            clientes = cargar_clientes()
-            nombres_clientes = [c["nombre"] for c in clientes]
-
-            cliente_seleccionado = st.selectbox(
-                "Selecciona un cliente",
-                nombres_clientes,
-                index=nombres_clientes.index(cotizacion_editando["cliente"]) if cotizacion_editando else 0
+            cliente_seleccionado = maestros.selector(
+                "clientes", "Selecciona un cliente", "cot_cliente",
+                seleccion=cotizacion_editando["cliente"] if cotizacion_editando else None
             )
 
         # =========================
@@ -304,8 +185,10 @@ def mostrar_cotizador():
                         "telefono": nuevo_telefono,
                         "contacto": nuevo_contacto
                     }
+                    clientes = cargar_clientes()
                     clientes.append(nuevo_cliente)
                     guardar_clientes(clientes)
+                    maestros.invalidar("clientes")
                     st.success(f"✅ Cliente '{nuevo_nombre}' agregado correctamente.")
                     st.rerun()
                 else:
@@ -333,7 +216,7 @@ def mostrar_cotizador():
         with col3:
             cantidad = st.number_input(
                 "Cantidad",
-                value=cotizacion_editando["cantidad"] if cotizacion_editando else 0,
+                value=int(cotizacion_editando.get("cantidad_aceptada") or 0) if cotizacion_editando else 0,
                 step=1,
                 min_value=0
             )
@@ -360,7 +243,7 @@ def mostrar_cotizador():
         # Solo las filas que queremos
         detalles_permitidos = ["DISEÑO", "PRUEBA DE COLOR"]
 
-        df = pd.DataFrame({
+        df_diseno = pd.DataFrame({
             "DETALLE DE COSTOS": detalles_permitidos,
             "OPCIÓN": ["" for _ in detalles_permitidos],
             "PRECIO": [0 for _ in detalles_permitidos]
@@ -394,14 +277,13 @@ def mostrar_cotizador():
                     key=f"sel_{fila.replace(' ', '_')}"
                 )
 
-            precio_sel = opciones[opcion_sel]
-            df.loc[i, "OPCIÓN"] = opcion_sel
-            df.loc[i, "PRECIO"] = precio_sel
+            precio_sel = motor.precio_opcion(fila, opcion_sel, tablas)
+            df_diseno.loc[i, "OPCIÓN"] = opcion_sel
+            df_diseno.loc[i, "PRECIO"] = precio_sel
 
 
         st.subheader("N° 2 :  Impresión")
 
-        # ---------------- FUNCIÓN BUSCARV ----------------
         # --- Obtener listas ---
         maquinas = base_data["IMPRESIÓN"]["MAQUINA"]
         colores = base_data["IMPRESIÓN"]["COLORES DE IMPRESION"]
@@ -417,26 +299,16 @@ def mostrar_cotizador():
             color_sel = st.selectbox("COLORES DE IMPRESION", colores)
 
         with col3:
-            placas_sel = st.selectbox("PLACAS", placas_lista)
-
-        # --- Funciones BUSCARV ---
-        def buscar_precio_impresion(maquina, color):
-            tabla = base_data["IMPRESIÓN"]["DATOS_TABLA"]
-            if color in tabla["MAQUINA DE IMPRESIÓN"]:
-                idx = tabla["MAQUINA DE IMPRESIÓN"].index(color)
-                return tabla[maquina][idx]
-            return 0
-
-        def buscar_precio_placas(color):
-            tabla = base_data["IMPRESIÓN"]["DATOS_TABLA"]
-            if color in tabla["MAQUINA DE IMPRESIÓN"]:
-                idx = tabla["MAQUINA DE IMPRESIÓN"].index(color)
-                return tabla["PRECIO DE PLACAS"][idx]
-            return 0
-
-        # --- Cálculos ---
-        precio_impresion = buscar_precio_impresion(maquina_sel, color_sel)
-        precio_placas = buscar_precio_placas(color_sel)
+            # Por defecto, las placas que corresponden a los colores elegidos
+            placas_defecto = motor.num_placas(color_sel, tablas)
+            placas_sel = st.selectbox(
+                "PLACAS", placas_lista,
+                index=placas_lista.index(placas_defecto) if placas_defecto in placas_lista else 0
+            )
+
+        # --- Cálculos (tablas compiladas en cotizador_motor) ---
+        precio_impresion = motor.precio_impresion(maquina_sel, color_sel, tablas)
+        precio_placas = motor.precio_placas(color_sel, tablas)
 
         # --- Mostrar resultados ---
         df = pd.DataFrame([{
@@ -580,9 +452,11 @@ def mostrar_cotizador():
 
         # ------------------- COLUMNA 1 -------------------
         with col1:
-            troquelado1 = st.text_input("TROQUELADO 1")
-            # 💡 Si quieres lista desplegable desde base_data:
-            # troquelado1 = st.selectbox("TROQUELADO 1", base_data["troquelado1"])
+            troquelado1 = st.selectbox(
+                "TROQUELADO 1", list(base_data["MAQUINA DE TROQUELADO"].keys()),
+                index=len(base_data["MAQUINA DE TROQUELADO"]) - 1,
+                format_func=lambda k: f"{k} — S/ {base_data['MAQUINA DE TROQUELADO'][k]} x millar"
+            )
 
         # ------------------- COLUMNA 2 -------------------
         with col2:
@@ -593,9 +467,11 @@ def mostrar_cotizador():
 
         # ------------------- COLUMNA 3 -------------------
         with col3:
-            troquelado2 = st.text_input("TROQUELADO 2")
-            # 💡 Si quieres lista desplegable:
-            # troquelado2 = st.selectbox("TROQUELADO 2", base_data["troquelado2"])
+            troquelado2 = st.selectbox(
+                "TROQUELADO 2", list(base_data["MAQUINA DE TROQUELADO"].keys()),
+                index=len(base_data["MAQUINA DE TROQUELADO"]) - 1,
+                format_func=lambda k: f"{k} — S/ {base_data['MAQUINA DE TROQUELADO'][k]} x millar"
+            )
 
         # ------------------- COLUMNA 4 -------------------
         with col4:
@@ -685,9 +561,6 @@ def mostrar_cotizador():
                 format_func=lambda k: f"{k} — S/ {base_data['CONTRAPLACADO'][k]}"
             )
 
-            # 3️⃣ Precio de la opción seleccionada
-            contraplacado_precio = base_data["CONTRAPLACADO"][contraplacado_opcion]
-
 
 # ==========================================================================================================================================
 
@@ -718,8 +591,6 @@ def mostrar_cotizador():
                 format_func=lambda k: f"{k} — S/ {base_data['MOVILIDAD INTERNA'][k]}"
             )
 
-            movilidad_precio = base_data["MOVILIDAD INTERNA"][movilidad_opcion]
-
 
 
 
@@ -742,8 +613,6 @@ def mostrar_cotizador():
                 format_func=lambda k: f"{k} — S/ {base_data['DELIVERY'][k]}"
             )
 
-            delivery_precio = base_data["DELIVERY"][delivery_opcion]
-
 
 
 
@@ -752,153 +621,184 @@ def mostrar_cotizador():
 
 # ==========================================================================================================================================
 
-        if st.button("💾 Guardar Cotización"):
+        # Todo el cálculo de costos sale del motor (función pura)
+        spec = {
+            "cantidad": cantidad_total,
+            "diseno": df_diseno.loc[0, "OPCIÓN"],
+            "prueba_color": df_diseno.loc[1, "OPCIÓN"],
+            "maquina": maquina_sel,
+            "colores": color_sel,
+            "placas": placas_sel,
+            "producto_x_pliego": producto_x_pliego,
+            "pliegos_demasia": pliegos_demasia,
+            "pliegos_x_hoja": pliegos_x_hoja,
+            "hojas_resma": hojas_resma_utilizar or None,
+            "precio_resma": precio_resma_sin_igv,
+            "costo_conversion": costo_conversion,
+            "costo_consumo": costo_consumo,
+            "metros_usar": metros_usar,
+            "costo_pelicula": costo_pelicula,
+            "costo_mantilla": costo_mantilla,
+            "costo_troquel": costo_troquel,
+            "troquelado1": troquelado1,
+            "troquelado2": troquelado2,
+            "citos": citos,
+            "hot_x_millar": costo_millar_hot,
+            "cliche_hot": costo_cliche_hot,
+            "pelicula_hot": costo_pelicula_hot,
+            "repujado_x_millar": costo_millar_rep,
+            "cliche_repujado": costo_cliche_rep,
+            "pelicula_repujado": costo_pelicula_rep,
+            "manualidad1_x_millar": manualidad_1,
+            "manualidad2_x_millar": manualidad_2,
+            "asa_x_millar": asa_bolsa,
+            "empaquetado_x_millar": empaquetado,
+            "desgloce_x_millar": desgloce,
+            "contraplacado": contraplacado_opcion,
+            "movilidad": movilidad_opcion,
+            "delivery": delivery_opcion,
+        }
+        st.subheader("N° 9 :  Márgenes y mínimos")
+        # Valores de la lista de precios, o los guardados con la cotización que se edita
+        margenes = {**tablas["margenes"], **((cotizacion_editando or {}).get("margenes") or {})}
+        sin_margenes = motor.SECCION_MARGENES not in base_data and not (cotizacion_editando or {}).get("margenes")
+        if sin_margenes:
+            st.warning(f"La lista de precios v{version_lista} no tiene la sección {motor.SECCION_MARGENES}: "
+                       "ingresa los márgenes de esta cotización.")
+        col1, col2, col3, col4, col5 = st.columns(5)
+        with col1:
+            costos_fijos_pct = st.number_input("COSTOS FIJOS %", min_value=0.0, max_value=100.0, step=0.5,
+                                               value=float(margenes["costos_fijos_pct"]) * 100)
+        with col2:
+            comision_pct = st.number_input("COMISION VENTA %", min_value=0.0, max_value=100.0, step=0.5,
+                                           value=float(margenes["comision_pct"]) * 100)
+        with col3:
+            utilidad_pct = st.number_input("UTILIDAD %", min_value=0.0, max_value=500.0, step=0.5,
+                                           value=float(margenes["utilidad_pct"]) * 100)
+        with col4:
+            precio_minimo = st.number_input("PRECIO MINIMO (S/)", min_value=0.0, step=1.0,
+                                            value=float(margenes["precio_minimo"]))
+        with col5:
+            minimo_pliegos = st.number_input("CANTIDAD MINIMA DE PLIEGOS", min_value=0, step=100,
+                                             value=int(margenes["minimo_pliegos"]),
+                                             help="La impresión se cobra como mínimo por esta cantidad de pliegos.")
+        margenes = {
+            "costos_fijos_pct": costos_fijos_pct / 100, "comision_pct": comision_pct / 100,
+            "utilidad_pct": utilidad_pct / 100, "precio_minimo": precio_minimo, "minimo_pliegos": minimo_pliegos,
+        }
+        spec.update(margenes)
+        faltan_margenes = sin_margenes and not any(margenes.values())
+
+        st.subheader("N° 10 :  Cantidades a cotizar")
+        st.session_state.setdefault("cot_quiebres", QUIEBRES_DEFECTO)
+        texto_cantidades = st.text_input(
+            "Quiebres de precio (separados por coma)", key="cot_quiebres",
+            help="La primera columna siempre es la CANTIDAD TOTAL de la sección 3."
+        )
+        cantidades = list(dict.fromkeys([int(cantidad_total)] + parsear_cantidades(texto_cantidades)))
+        # Se acumulan en sesión: agregar una columna reinicia la tabla editable
+        ajustes = leer_ajustes(st.session_state.get("cot_ajustes", (cotizacion_editando or {}).get("ajustes")),
+                               st.session_state.get("tabla_cantidades_ventas"))
+        st.session_state["cot_ajustes"] = ajustes
+        quiebres = motor.cotizar_cantidades(spec, cantidades, tablas, ajustes)
+        desglose = {concepto: float(valores[0]) for concepto, valores in quiebres.items()}
+
+        if st.button("💾 Guardar Cotización", disabled=faltan_margenes,
+                     help="Ingresa los márgenes (N° 9)." if faltan_margenes else None):
+            # El número sugerido se reserva recién al guardar (atómico)
+            if not cotizacion_editando and cotizacion_num == numero_sugerido:
+                cotizacion_num = correlativos.reservar("COT")
             nueva_cot = {
                 "numero": cotizacion_num,
                 "cliente": cliente,
                 "fecha": str(fecha),
                 "descripcion": descripcion,
-                "cantidades": cantidad,
+                "cantidad_aceptada": cantidad,
+                "cantidades": cantidades,
                 "acabados": acabados,
                 "recubrimientos": recubrimientos,
                 "material": material,
                 "maquina_tipo_impresion": maquina_tipo_impresion,
-                "tabla": df.to_dict(orient="records")
+                "lista_precios": version_lista,
+                "margenes": margenes,
+                "ajustes": ajustes,
+                "tabla": df_diseno.to_dict(orient="records"),
+                "desglose": desglose,
+                "precios_por_cantidad": [
+                    {"cantidad": q, "costo_final_venta": round(float(v), 2), "costo_unit": round(float(u), 4)}
+                    for q, v, u in zip(cantidades, quiebres["COSTO FINAL VENTA"], quiebres["COSTO UNIT."])
+                ]
             }
-            historial = cargar_historial()
-            if cotizacion_editando:
-                historial = [nueva_cot if c["numero"] == cotizacion_num else c for c in historial]
-                st.session_state.pop("cotizacion_editar")
-            else:
-                historial.append(nueva_cot)
-
-            guardar_historial(historial)
+            # Upsert de una sola fila; el resto del historial no se toca
+            cotizaciones_db.guardar(nueva_cot)
+            st.session_state.pop("cotizacion_editar", None)
+            st.session_state.pop("tabla_cantidades_ventas", None)
+            st.session_state.pop("cot_ajustes", None)
             st.success("Cotización guardada correctamente ✅")
             st.rerun()
 
 # ==================================================================================================================================================
 
     with col_tabla:
-        # Lista de conceptos (filas de la tabla)
-        conceptos = [
-            "CANTIDAD",
-            "DISEÑO",
-            "PRUEBA DE COLOR",
-            "PLACAS",
-            "IMPRESIÓN",
-            "MATERIAL 1:",
-            "COSTO CONVERSION:",
-            "CORTE RESMAS A PLIEGO",
-            "BARNIZ UV SECTORIZADO TIRA",
-            "0",
-            "0",
-            "PELICULA RECUBRIMIENTO",
-            "MANTILLA RECUBRIIENTO:",
-            "TROQUEL",
-            "TROQUELADO 1",
-            "TROQUELADO 2",
-            "CITOS",
-            "HOT STAMPING",
-            "CLICHÉ HOT STAMPING",
-            "PELICULA HOT STAMPING",
-            "REPUJADO",
-            "CLICHÉ REPUJADO",
-            "PELICULA REPUJADO",
-            "MANUALIDAD 1:",
-            "MANUALIDAD 2:",
-            "ASA DE BOLSA",
-            "EMPAQUETADO",
-            "DESGLOCE",
-            "CONTRAPLACADO",
-            "MOVILIDAD INTERNA",
-            "DELIVERY",
-            "SUB TOTAL",
-            "COSTOS FIJOS",
-            "COMISION VENTA",
-            "COSTO TOTAL",
-            "UTILIDAD",
-            "COSTO FINAL VENTA",
-            "COSTO FINAL INCLUIDO IGV",
-            "COSTO UNIT.",
-            "TIRAJE DE IMPRESION",
-            "PRECIO MINIMO",
-            "HOJAS DE RESMAS A UTILIZAR",
-            "CANTIDAD MINIMA DE PLIEGOS"
-        ]
-
-# ==========================================================================================================================================
-# ==========================================================================================================================================
-# ==========================================================================================================================================
-
-        # Asegurar que existe la tabla (tal como ya lo haces)
-        if "tabla_cantidades" not in st.session_state:
-            st.session_state.tabla_cantidades = pd.DataFrame(
-                {"Concepto": conceptos, "Cantidad 1": [0]*len(conceptos)}
-            )
-
-
-
-        try:
-            # Buscar la fila "CONTRAPLACADO" en la tabla
-            idx_contrap = st.session_state.tabla_cantidades.index[
-                st.session_state.tabla_cantidades["Concepto"] == "CONTRAPLACADO"
-            ][0]
-            # Reemplazar su valor con el precio elegido
-            st.session_state.tabla_cantidades.at[idx_contrap, "Cantidad 1"] = contraplacado_precio
-
-        except IndexError:
-            # Si "CONTRAPLACADO" no existe en la lista de conceptos, no hacer nada
-            pass
-
-
-
-
-        try:
-            idx_movilidad = st.session_state.tabla_cantidades.index[
-                st.session_state.tabla_cantidades["Concepto"] == "MOVILIDAD INTERNA"
-            ][0]
-            st.session_state.tabla_cantidades.at[idx_movilidad, "Cantidad 1"] = movilidad_precio
-        except IndexError:
-            pass  # si no existe la fila, no hacemos nada
-
-        # Actualizar la fila DELIVERY con el precio elegido
-        try:
-            idx_delivery = st.session_state.tabla_cantidades.index[
-                st.session_state.tabla_cantidades["Concepto"] == "DELIVERY"
-            ][0]
-            st.session_state.tabla_cantidades.at[idx_delivery, "Cantidad 1"] = delivery_precio
-        except IndexError:
-            # Por si la fila "DELIVERY" no estuviera en la lista de conceptos
-            pass
-
-
-
-
-        # Estado inicial
-        if "tabla_cantidades" not in st.session_state:
-            st.session_state.tabla_cantidades = pd.DataFrame({"Concepto": conceptos, "Cantidad 1": [0]*len(conceptos)})
+        # Tabla de costos: una columna por cantidad, calculada en una sola pasada
         st.subheader("-------  Costos de produccion  ------")
-        # Botón para añadir una nueva columna
-        if st.button("➕ Añadir columna de cantidades"):
-            col_nueva = f"Cantidad {len(st.session_state.tabla_cantidades.columns)}"
-            st.session_state.tabla_cantidades[col_nueva] = st.session_state.tabla_cantidades.iloc[:, 1]  # Copia de Cantidad 1
+        tabla = pd.DataFrame({"Concepto": motor.CONCEPTOS})
+        for n, q in enumerate(cantidades, 1):
+            tabla[f"Cantidad {n}"] = [round(float(quiebres[c][n - 1]), 2) for c in motor.CONCEPTOS]
+        st.session_state.tabla_cantidades = tabla
 
-        # Mostrar tabla editable
         st.subheader("Tabla costos")
-        st.session_state.tabla_cantidades = st.data_editor(
-            st.session_state.tabla_cantidades,
-            num_rows="dynamic",
-            use_container_width=True,
-         key="tabla_cantidades_ventas"
-            
-        )
+        st.button("➕ Añadir columna de cantidades", on_click=añadir_cantidad, args=(cantidades,))
+        st.data_editor(tabla, key="tabla_cantidades_ventas", use_container_width=True,
+                       hide_index=True, height=600, disabled=["Concepto"])
+        st.caption("Los costos se pueden corregir a mano; SUB TOTAL, márgenes y precio final se recalculan.")
+
+        # Curva de costo unitario (100 puntos entre la menor y la mayor cantidad x 2)
+        puntos = np.geomspace(max(min(cantidades), 1), max(max(cantidades) * 2, 2), 100).round()
+        curva = motor.cotizar_cantidades(spec, puntos, tablas)
+        st.caption("Costo unitario según cantidad")
+        st.line_chart(pd.DataFrame({"Cantidad": curva["CANTIDAD"], "Costo unit.": curva["COSTO UNIT."]}).set_index("Cantidad"))
+
 # ==========================================================================================================================================
 # ==========================================================================================================================================
 # ==========================================================================================================================================
 
         st.subheader("Historial")
-        historial = cargar_historial()
-        for cot in historial:
-            if st.button(f"✏️ Editar {cot['numero']}"):
-                st.session_state["cotizacion_editar"] = cot
-                st.rerun()
\ No newline at end of file
+        filtro_cliente = maestros.selector("clientes", "Cliente", "cot_hist_cliente", vacio="Todos")
+        col_h1, col_h2 = st.columns(2)
+        filtro_desde = col_h1.date_input("Desde", value=None, key="cot_hist_desde")
+        filtro_hasta = col_h2.date_input("Hasta", value=None, key="cot_hist_hasta")
+        filtro_texto = st.text_input("N° o descripción", key="cot_hist_texto")
+        filtros = dict(
+            cliente=None if filtro_cliente == "Todos" else filtro_cliente,
+            desde=filtro_desde, hasta=filtro_hasta, texto=filtro_texto or None
+        )
+
+        # Pila de cursores: cambiar un filtro vuelve a la primera página
+        if st.session_state.get("cot_hist_filtros") != filtros:
+            st.session_state["cot_hist_filtros"] = filtros
+            st.session_state["cot_hist_cursores"] = [None]
+        cursores = st.session_state["cot_hist_cursores"]
+        filas, siguiente = cotizaciones_db.pagina(10, cursores[-1], **filtros)
+        if filas:
+            for _, numero, cliente_cot, fecha_cot, descripcion_cot, _ in filas:
+                if st.button(f"✏️ Editar {numero}", key=f"editar_cot_{numero}",
+                             help=f"{fecha_cot} · {cliente_cot} · {descripcion_cot}"):
+                    st.session_state["cotizacion_editar"] = cotizaciones_db.obtener(numero)
+                    st.session_state.pop("tabla_cantidades_ventas", None)
+                    st.session_state.pop("cot_ajustes", None)
+                    st.rerun()
+            col_p1, col_p2, col_p3 = st.columns([1, 2, 1])
+            if col_p1.button("⬅️", disabled=len(cursores) == 1, key="cot_hist_anterior"):
+                cursores.pop()
+                st.rerun()
+            col_p2.caption(f"Página {len(cursores)}")
+            if col_p3.button("➡️", disabled=siguiente is None, key="cot_hist_siguiente"):
+                cursores.append(siguiente)
+                st.rerun()
+        else:
+            st.info("No hay cotizaciones con esos filtros.")
+
+        if st.session_state.get("rol") in ROLES_LISTAS_PRECIOS:
+            with st.expander("📋 Listas de precios"):
+                mostrar_listas_precios()
\ No newline at end of file
@@ -0,0 +1,90 @@
+# datos_cache.py
+# Capa común de acceso a archivos JSON (etapas, alertas, cotizaciones, clientes...).
+# Cada archivo se parsea una sola vez por proceso y se vuelve a leer solo si
+# cambia su (mtime, tamaño) o si se guarda con guardar_json().
+import copy
+import json
+import os
+import threading
+from types import MappingProxyType
+
+_lock = threading.Lock()
+# ruta absoluta -> (mtime_ns, tamaño, datos, vista de solo lectura)
+_cache = {}
+
+
+def _clave(ruta):
+    return os.path.abspath(ruta)
+
+
+def _congelar(valor):
+    """Vista de solo lectura: dict -> MappingProxyType, list -> tuple."""
+    if isinstance(valor, dict):
+        return MappingProxyType({k: _congelar(v) for k, v in valor.items()})
+    if isinstance(valor, list):
+        return tuple(_congelar(v) for v in valor)
+    return valor
+
+
+def _cargar(ruta):
+    """Devuelve la entrada de caché vigente o None si el archivo no existe."""
+    clave = _clave(ruta)
+    try:
+        st = os.stat(clave)
+    except OSError:
+        with _lock:
+            _cache.pop(clave, None)
+        return None
+
+    with _lock:
+        entrada = _cache.get(clave)
+        if entrada and entrada[0] == st.st_mtime_ns and entrada[1] == st.st_size:
+            return entrada
+
+    with open(clave, "r", encoding="utf-8") as f:
+        datos = json.load(f)
+    entrada = (st.st_mtime_ns, st.st_size, datos, _congelar(datos))
+    with _lock:
+        _cache[clave] = entrada
+    return entrada
+
+
+# ============================
+# API pública
+# ============================
+def leer_json(ruta, defecto=None):
+    """Contenido del archivo como vista de solo lectura (compartida entre módulos).
+    Si el archivo no existe devuelve `defecto`."""
+    entrada = _cargar(ruta)
+    if entrada is None:
+        return defecto
+    return entrada[3]
+
+
+def leer_json_editable(ruta, defecto=None):
+    """Copia mutable del contenido, para quien va a modificarlo y guardarlo."""
+    entrada = _cargar(ruta)
+    if entrada is None:
+        return copy.deepcopy(defecto)
+    return copy.deepcopy(entrada[2])
+
+
+def guardar_json(ruta, datos, indent=4):
+    """Escribe el archivo (vía temporal + reemplazo) e invalida su caché."""
+    carpeta = os.path.dirname(ruta)
+    if carpeta:
+        os.makedirs(carpeta, exist_ok=True)
+    temporal = f"{ruta}.tmp"
+    with open(temporal, "w", encoding="utf-8") as f:
+        json.dump(datos, f, indent=indent, ensure_ascii=False)
+    os.replace(temporal, ruta)
+    invalidar(ruta)
+
+
+def invalidar(ruta=None):
+    """Olvida un archivo (o todos si no se indica ruta)."""
+    with _lock:
+        if ruta is None:
+            _cache.clear()
+        else:
+            _cache.pop(_clave(ruta), None)
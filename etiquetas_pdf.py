@@ -0,0 +1,193 @@
+# etiquetas_pdf.py
+# Motor de etiquetas de inventario en hojas reales: grilla A4 (filas x columnas)
+# o rollo (una etiqueta por página). Cada código de barras se dibuja una sola
+# vez como Form XObject del PDF y luego se reutiliza en todas sus copias.
+import io
+import math
+import textwrap
+import time
+
+from reportlab.graphics.barcode import code128
+from reportlab.lib.colors import black
+from reportlab.lib.pagesizes import A4
+from reportlab.lib.units import mm
+from reportlab.pdfgen import canvas
+
+FUENTE_MIN = 6            # pt; por debajo la etiqueta ya no se lee
+BARRAS_MIN = 5 * mm
+RELLENO = 18              # rellenos arriba/abajo y aire entre texto y barras
+
+
+# ============================
+# Diseños de hoja
+# ============================
+def diseno_a4(filas=7, columnas=3, margen_mm=8, separacion_mm=2):
+    """Grilla sobre A4: el tamaño de etiqueta se deduce de filas y columnas."""
+    ancho_pag, alto_pag = A4
+    margen = margen_mm * mm
+    sep = separacion_mm * mm
+    return {
+        "pagina": (ancho_pag, alto_pag),
+        "filas": filas,
+        "columnas": columnas,
+        "ancho": (ancho_pag - 2 * margen - (columnas - 1) * sep) / columnas,
+        "alto": (alto_pag - 2 * margen - (filas - 1) * sep) / filas,
+        "margen": margen,
+        "separacion": sep,
+    }
+
+
+def diseno_rollo(ancho_mm=70, alto_mm=50):
+    """Rollo de impresora de etiquetas: cada página es una etiqueta."""
+    return {
+        "pagina": (ancho_mm * mm, alto_mm * mm),
+        "filas": 1,
+        "columnas": 1,
+        "ancho": ancho_mm * mm,
+        "alto": alto_mm * mm,
+        "margen": 0,
+        "separacion": 0,
+    }
+
+
+def alto_minimo(margen=10):
+    """Alto de celda (pt) en el que aún caben las 5 líneas con FUENTE_MIN y las barras mínimas."""
+    return 2 * margen + RELLENO + 5 * (FUENTE_MIN + 2) + BARRAS_MIN
+
+
+def alto_minimo_mm():
+    return math.ceil(alto_minimo() / mm)
+
+
+def filas_max_a4(margen_mm=8, separacion_mm=2):
+    """Máximo de filas en A4 cuya celda todavía cumple alto_minimo()."""
+    filas = 1
+    while diseno_a4(filas + 1, 1, margen_mm, separacion_mm)["alto"] >= alto_minimo():
+        filas += 1
+    return filas
+
+
+def _posiciones(diseno):
+    """Esquina inferior izquierda de cada celda, de arriba hacia abajo."""
+    _, alto_pag = diseno["pagina"]
+    for fila in range(diseno["filas"]):
+        for col in range(diseno["columnas"]):
+            x = diseno["margen"] + col * (diseno["ancho"] + diseno["separacion"])
+            y = alto_pag - diseno["margen"] - (fila + 1) * diseno["alto"] - fila * diseno["separacion"]
+            yield x, y
+
+
+# ============================
+# Dibujo
+# ============================
+def _form_codigo(c, formas, codigo, ancho_max, alto_barras):
+    """Nombre y ancho del Form XObject del código; se crea la primera vez."""
+    if codigo in formas:
+        return formas[codigo]
+    barcode = code128.Code128(codigo, barHeight=alto_barras, barWidth=1.2)
+    if barcode.width > ancho_max:
+        barcode = code128.Code128(codigo, barHeight=alto_barras, barWidth=1.2 * ancho_max / barcode.width)
+    nombre = f"cb{len(formas)}"
+    c.beginForm(nombre, 0, 0, barcode.width, barcode.height)
+    barcode.drawOn(c, 0, 0)
+    c.endForm()
+    formas[codigo] = (nombre, barcode.width)
+    return formas[codigo]
+
+
+def _medidas(ancho, alto):
+    """Márgen, tamaño de letra, interlineado y alto de barras para la celda.
+    El texto ocupa 5 líneas arriba; las barras usan el resto (máx. 15 mm).
+    Si la celda no alcanza para barras de BARRAS_MIN, se achica la letra
+    (hasta FUENTE_MIN en celdas de alto_minimo()) en vez de encimarse."""
+    margen = min(10, ancho * 0.05)
+    libre = alto - 2 * margen - RELLENO
+    fuente = min(9 if alto >= 45 * mm else 7, (libre - BARRAS_MIN) / 5 - 2)
+    paso = fuente + 2
+    return margen, fuente, paso, min(15 * mm, libre - 5 * paso)
+
+
+def _dibujar_etiqueta(c, formas, item, x, y, ancho, alto):
+    margen, fuente, paso, alto_barras = _medidas(ancho, alto)
+    c.setStrokeColor(black)
+    c.rect(x + margen, y + margen, ancho - 2 * margen, alto - 2 * margen)
+
+    codigo = str(item[6]).upper()
+    nombre, ancho_cb = _form_codigo(c, formas, codigo, ancho - 2 * margen - 8, alto_barras)
+    c.saveState()
+    c.translate(x + (ancho - ancho_cb) / 2, y + margen + 4)
+    c.doForm(nombre)
+    c.restoreState()
+
+    c.setFont("Helvetica-Bold", fuente)
+    x_text = x + margen + 4
+    y_text = y + alto - margen - paso - 2
+    ancho_texto = max(20, int((ancho - 2 * margen - 8) / (fuente * 0.55)))
+    for linea in textwrap.wrap(f"Descripción: {item[1]}", width=ancho_texto)[:2]:
+        c.drawString(x_text, y_text, linea)
+        y_text -= paso
+    c.drawString(x_text, y_text, f"Cantidad: {item[2]} | Costo: S/ {float(item[5] or 0):.2f}")
+    y_text -= paso
+    c.drawString(x_text, y_text, f"Bloque: {item[3]} | Ubicación: {item[4]}")
+    y_text -= paso
+    c.drawString(x_text, y_text, f"Código: {item[6]}")
+
+
+# ============================
+# API pública
+# ============================
+def generar_etiquetas(productos, diseno=None, destino=None, copias=1, al_avanzar=None):
+    """Dibuja las etiquetas hoja por hoja.
+    productos: iterable de filas de inventario (id, descripcion, cantidad,
+    bloque, ubicacion, costo, codigo); puede ser un generador.
+    destino: ruta de archivo o buffer; si es None se devuelve un BytesIO.
+    al_avanzar(etiquetas, hojas) se llama al cerrar cada hoja."""
+    diseno = diseno or diseno_rollo()
+    salida = destino if destino is not None else io.BytesIO()
+    c = canvas.Canvas(salida, pagesize=diseno["pagina"], pageCompression=1)
+    formas = {}
+    celdas = list(_posiciones(diseno))
+    total = hojas = 0
+    en_hoja = 0
+
+    for item in productos:
+        for _ in range(copias):
+            x, y = celdas[en_hoja]
+            _dibujar_etiqueta(c, formas, item, x, y, diseno["ancho"], diseno["alto"])
+            total += 1
+            en_hoja += 1
+            if en_hoja == len(celdas):
+                c.showPage()
+                hojas += 1
+                en_hoja = 0
+                if al_avanzar:
+                    al_avanzar(total, hojas)
+    if en_hoja or total == 0:
+        c.showPage()
+        hojas += 1
+    c.save()
+    if al_avanzar:
+        al_avanzar(total, hojas)
+    if destino is None:
+        salida.seek(0)
+    return salida
+
+
+def benchmark(n=10000, diseno=None, codigos_distintos=None):
+    """Etiquetas por segundo generando n etiquetas en memoria."""
+    codigos_distintos = codigos_distintos or n
+    productos = (
+        (i, f"Producto de prueba {i}", i % 500, f"B{i % 20}", f"U{i % 50}", 1.5, f"PROD{i % codigos_distintos:06d}")
+        for i in range(n)
+    )
+    inicio = time.perf_counter()
+    buffer = generar_etiquetas(productos, diseno or diseno_a4())
+    segundos = time.perf_counter() - inicio
+    return {"etiquetas": n, "segundos": round(segundos, 2),
+            "etiquetas_por_seg": round(n / segundos, 1), "bytes": buffer.getbuffer().nbytes}
+
+
+if __name__ == "__main__":
+    print("A4 3x7, códigos únicos:", benchmark(10000))
+    print("A4 3x7, 100 códigos:  ", benchmark(10000, codigos_distintos=100))
+    print("Rollo 70x50:          ", benchmark(10000, diseno_rollo()))
@@ -1,20 +1,22 @@
 # inventario.py
 import streamlit as st
 import sqlite3
+import conexion_db
+import correlativos
+import etiquetas_pdf
+import tareas_fondo
 from reportlab.pdfgen import canvas
 from reportlab.graphics.barcode import code128
 from reportlab.lib.pagesizes import A6
 from reportlab.lib.units import mm
-from reportlab.lib.colors import black
 import io
 import pandas as pd
 from datetime import datetime
 import altair as alt
-import textwrap
 
 # ---------- BASE DE DATOS ----------
 def init_db():
-    conn = sqlite3.connect("inventario.db")
+    conn = conexion_db.conectar("inventario.db")
     c = conn.cursor()
     c.execute("""
         CREATE TABLE IF NOT EXISTS inventario (
@@ -37,75 +39,197 @@ def init_db():
             fecha TEXT
         )
     """)
+    # Búsqueda por código sin distinguir mayúsculas usando índice
+    # (lower(codigo) = ? obligaba a recorrer toda la tabla)
+    c.execute("CREATE INDEX IF NOT EXISTS idx_inventario_codigo_nocase ON inventario(codigo COLLATE NOCASE)")
+    # Historial paginado por (fecha, id), con o sin filtro de código
+    c.execute("CREATE INDEX IF NOT EXISTS idx_movimientos_fecha ON movimientos(fecha, id)")
+    c.execute("CREATE INDEX IF NOT EXISTS idx_movimientos_codigo_fecha ON movimientos(codigo COLLATE NOCASE, fecha, id)")
+    # Resumen diario de movimientos para el dashboard
+    c.execute("""
+        CREATE TABLE IF NOT EXISTS movimientos_diarios (
+            dia TEXT,
+            codigo TEXT,
+            tipo TEXT,
+            descripcion TEXT,
+            cantidad INTEGER,
+            movimientos INTEGER,
+            PRIMARY KEY (dia, codigo, tipo)
+        ) WITHOUT ROWID
+    """)
     conn.commit()
     conn.close()
+    init_resumen_diario()
 
-def registrar_movimiento(codigo, descripcion, tipo, cantidad):
-    conn = sqlite3.connect("inventario.db")
-    c = conn.cursor()
-    fecha = datetime.now().strftime("%Y-%m-%d %H:%M:%S")
+def _resumen_listo(c):
     c.execute("""
+        SELECT COUNT(*) FROM sqlite_master
+        WHERE name IN ('movimientos_diarios', 'trg_movimientos_diarios_ins', 'trg_movimientos_diarios_del')
+    """)
+    return c.fetchone()[0] == 3
+
+def init_resumen_diario():
+    """Crea los triggers que mantienen movimientos_diarios en cada movimiento.
+    La primera vez reconstruye el resumen con el historial existente, en la
+    misma transacción que crea los triggers (no se cuenta nada dos veces).
+    Si ya existen basta una lectura: no se toma el bloqueo de escritura."""
+    conn = conexion_db.conectar("inventario.db")
+    listo = _resumen_listo(conn.cursor())
+    conn.close()
+    if listo:
+        return
+    with conexion_db.transaccion("inventario.db") as conn:
+        c = conn.cursor()
+        if _resumen_listo(c):
+            return  # otro proceso lo creó mientras esperábamos el bloqueo
+        c.execute("DROP TRIGGER IF EXISTS trg_movimientos_diarios_ins")
+        c.execute("DROP TRIGGER IF EXISTS trg_movimientos_diarios_del")
+        c.execute("DELETE FROM movimientos_diarios")
+        c.execute("""
+            INSERT INTO movimientos_diarios (dia, codigo, tipo, descripcion, cantidad, movimientos)
+            SELECT substr(fecha, 1, 10), codigo, tipo, MAX(descripcion), SUM(cantidad), COUNT(*)
+            FROM movimientos GROUP BY substr(fecha, 1, 10), codigo, tipo
+        """)
+        c.execute("""
+            CREATE TRIGGER trg_movimientos_diarios_ins AFTER INSERT ON movimientos
+            BEGIN
+                INSERT INTO movimientos_diarios (dia, codigo, tipo, descripcion, cantidad, movimientos)
+                VALUES (substr(NEW.fecha, 1, 10), NEW.codigo, NEW.tipo, NEW.descripcion, NEW.cantidad, 1)
+                ON CONFLICT (dia, codigo, tipo) DO UPDATE SET
+                    cantidad = cantidad + excluded.cantidad,
+                    movimientos = movimientos + 1,
+                    descripcion = excluded.descripcion;
+            END
+        """)
+        c.execute("""
+            CREATE TRIGGER trg_movimientos_diarios_del AFTER DELETE ON movimientos
+            BEGIN
+                UPDATE movimientos_diarios
+                SET cantidad = cantidad - OLD.cantidad, movimientos = movimientos - 1
+                WHERE dia = substr(OLD.fecha, 1, 10) AND codigo = OLD.codigo AND tipo = OLD.tipo;
+            END
+        """)
+
+def insertar_movimientos(c, filas):
+    """Inserta [(codigo, descripcion, tipo, cantidad)] con un solo executemany."""
+    fecha = datetime.now().strftime("%Y-%m-%d %H:%M:%S")
+    c.executemany("""
         INSERT INTO movimientos (codigo, descripcion, tipo, cantidad, fecha)
         VALUES (?, ?, ?, ?, ?)
-    """, (codigo, descripcion, tipo, cantidad, fecha))
-    conn.commit()
-    conn.close()
-
-def generar_codigo_automatico():
-    conn = sqlite3.connect("inventario.db")
-    c = conn.cursor()
-    c.execute("SELECT COUNT(*) FROM inventario")
-    total = c.fetchone()[0] + 1
-    conn.close()
-    return f"PROD{str(total).zfill(4)}"
+    """, [(codigo, descripcion, tipo, cantidad, fecha) for codigo, descripcion, tipo, cantidad in filas])
+
+def registrar_movimiento(codigo, descripcion, tipo, cantidad, c=None):
+    """Si se pasa el cursor `c`, el movimiento queda en la misma transacción."""
+    if c is None:
+        with conexion_db.transaccion("inventario.db") as conn:
+            insertar_movimientos(conn.cursor(), [(codigo, descripcion, tipo, cantidad)])
+        return
+    insertar_movimientos(c, [(codigo, descripcion, tipo, cantidad)])
+
+def generar_codigo_automatico(reservar=False):
+    """Código PROD####. Con reservar=True se asigna definitivamente."""
+    if reservar:
+        return correlativos.reservar("PROD")
+    return correlativos.siguiente("PROD")
 
 def agregar_item(descripcion, cantidad, bloque, ubicacion, costo, codigo):
-    conn = sqlite3.connect("inventario.db")
-    c = conn.cursor()
     try:
-        c.execute("""
-            INSERT INTO inventario (descripcion, cantidad, bloque, ubicacion, costo, codigo)
-            VALUES (?, ?, ?, ?, ?, ?)
-        """, (descripcion, cantidad, bloque, ubicacion, costo, codigo))
-        conn.commit()
-        registrar_movimiento(codigo, descripcion, "Ingreso", cantidad)
+        with conexion_db.transaccion("inventario.db") as conn:
+            c = conn.cursor()
+            c.execute("""
+                INSERT INTO inventario (descripcion, cantidad, bloque, ubicacion, costo, codigo)
+                VALUES (?, ?, ?, ?, ?, ?)
+            """, (descripcion, cantidad, bloque, ubicacion, costo, codigo))
+            registrar_movimiento(codigo, descripcion, "Ingreso", cantidad, c)
     except sqlite3.IntegrityError:
         st.warning("⚠️ Ya existe un producto con ese código.")
-    conn.close()
+
+def registrar_egresos(lineas, todo_o_nada=False):
+    """Egreso por lote en una sola transacción.
+    lineas: [(codigo, cantidad)]. El descuento es condicional
+    (UPDATE ... WHERE cantidad >= ?), así dos lectores no pueden gastar el
+    mismo stock. Devuelve una lista de resultados por línea con
+    ok / motivo y los datos del producto para el comprobante.
+    Con todo_o_nada=True, si una línea falla no se descuenta ninguna."""
+    resultados = []
+    movimientos = []
+    with conexion_db.transaccion("inventario.db") as conn:
+        c = conn.cursor()
+        for codigo, cantidad in lineas:
+            resultado = {"codigo": codigo, "cantidad": cantidad, "ok": False, "motivo": ""}
+            if not cantidad or cantidad <= 0:
+                resultado["motivo"] = "Cantidad inválida"
+                resultados.append(resultado)
+                continue
+            c.execute("""
+                UPDATE inventario SET cantidad = cantidad - ?
+                WHERE codigo = ? COLLATE NOCASE AND cantidad >= ?
+                RETURNING codigo, descripcion, cantidad, bloque, ubicacion, costo
+            """, (cantidad, codigo.strip(), cantidad))
+            fila = c.fetchone()
+            if fila:
+                resultado.update({
+                    "ok": True, "codigo": fila[0], "descripcion": fila[1], "stock_restante": fila[2],
+                    "bloque": fila[3], "ubicacion": fila[4], "costo": fila[5] or 0.0
+                })
+                movimientos.append((fila[0], fila[1], "Egreso", cantidad))
+            else:
+                c.execute("SELECT cantidad FROM inventario WHERE codigo = ? COLLATE NOCASE", (codigo.strip(),))
+                existe = c.fetchone()
+                resultado["motivo"] = f"Stock insuficiente ({existe[0]} disponibles)" if existe else "Producto no encontrado"
+            resultados.append(resultado)
+
+        if todo_o_nada and not all(r["ok"] for r in resultados):
+            conn.rollback()
+            for r in resultados:
+                if r["ok"]:
+                    r["ok"] = False
+                    r["motivo"] = "Lote revertido"
+                    r.pop("stock_restante", None)  # el UPDATE se deshizo: ese saldo nunca existió
+            return resultados
+        insertar_movimientos(c, movimientos)
+    return resultados
 
 def registrar_egreso(codigo, cantidad):
-    conn = sqlite3.connect("inventario.db")
-    c = conn.cursor()
-    c.execute("SELECT descripcion, cantidad, bloque, ubicacion, costo FROM inventario WHERE lower(codigo) = ?", (codigo.lower(),))
-    res = c.fetchone()
-    if res:
-        descripcion, cantidad_actual, bloque, ubicacion, costo = res
-        if cantidad <= cantidad_actual:
-            nueva = cantidad_actual - cantidad
-            c.execute("UPDATE inventario SET cantidad = ? WHERE lower(codigo) = ?", (nueva, codigo.lower()))
-            conn.commit()
-            conn.close()
-            registrar_movimiento(codigo, descripcion, "Egreso", cantidad)
-            pdf = generar_comprobante_egreso_pdf(codigo, descripcion, cantidad, bloque, ubicacion, costo)
-            st.download_button("📄 Descargar comprobante de egreso", data=pdf, file_name=f"egreso_{codigo}.pdf", mime="application/pdf")
-            st.success(f"✅ Egreso de {cantidad} unidades registrado")
-        else:
-            conn.close()
-            st.error("❌ No hay suficiente stock")
-    else:
-        conn.close()
+    resultado = registrar_egresos([(codigo, cantidad)])[0]
+    if resultado["ok"]:
+        pdf = generar_comprobante_egreso_pdf(resultado["codigo"], resultado["descripcion"], cantidad,
+                                             resultado["bloque"], resultado["ubicacion"], resultado["costo"])
+        st.download_button("📄 Descargar comprobante de egreso", data=pdf, file_name=f"egreso_{codigo}.pdf", mime="application/pdf")
+        st.success(f"✅ Egreso de {cantidad} unidades registrado")
+    elif resultado["motivo"] == "Producto no encontrado":
         st.warning("Producto no encontrado")
+    else:
+        st.error("❌ No hay suficiente stock")
 
 def buscar_por_codigo(codigo):
-    conn = sqlite3.connect("inventario.db")
+    conn = conexion_db.conectar("inventario.db")
     c = conn.cursor()
-    c.execute("SELECT * FROM inventario WHERE lower(codigo) = ?", (codigo.lower(),))
+    c.execute("SELECT * FROM inventario WHERE codigo = ? COLLATE NOCASE", (codigo.strip(),))
     item = c.fetchone()
     conn.close()
     return item
 
+def buscar_por_codigos(codigos):
+    """Búsqueda en ráfaga (p. ej. el buffer de un lector de códigos).
+    Devuelve {codigo_leido: fila o None} con una consulta por cada bloque
+    de 500 códigos sobre el índice NOCASE."""
+    leidos = [c.strip() for c in codigos if c and c.strip()]
+    unicos = list(dict.fromkeys(l.upper() for l in leidos))
+    encontrados = {}
+    conn = conexion_db.conectar("inventario.db")
+    c = conn.cursor()
+    for i in range(0, len(unicos), 500):
+        bloque = unicos[i:i + 500]
+        marcas = ",".join("?" * len(bloque))
+        c.execute(f"SELECT * FROM inventario WHERE codigo COLLATE NOCASE IN ({marcas})", bloque)
+        for fila in c.fetchall():
+            encontrados[fila[6].upper()] = fila
+    conn.close()
+    return {l: encontrados.get(l.upper()) for l in leidos}
+
 def obtener_todos():
-    conn = sqlite3.connect("inventario.db")
+    conn = conexion_db.conectar("inventario.db")
     c = conn.cursor()
     c.execute("SELECT * FROM inventario")
     items = c.fetchall()
@@ -113,19 +237,201 @@ def obtener_todos():
     return items
 
 def obtener_movimientos():
-    conn = sqlite3.connect("inventario.db")
+    conn = conexion_db.conectar("inventario.db")
     c = conn.cursor()
     c.execute("SELECT * FROM movimientos ORDER BY fecha DESC")
     data = c.fetchall()
     conn.close()
     return data
 
+def obtener_movimientos_pagina(limite=50, despues=None, codigo=None, tipo=None, desde=None, hasta=None):
+    """Página de movimientos (más recientes primero) con paginación por llave.
+    `despues` es el cursor (fecha, id) de la última fila de la página anterior.
+    Devuelve (filas, cursor_siguiente o None si no hay más)."""
+    condiciones, params = [], []
+    if codigo:
+        condiciones.append("codigo = ? COLLATE NOCASE")
+        params.append(codigo.strip())
+    if tipo:
+        condiciones.append("tipo = ?")
+        params.append(tipo)
+    if desde:
+        condiciones.append("fecha >= ?")
+        params.append(f"{desde} 00:00:00")
+    if hasta:
+        condiciones.append("fecha <= ?")
+        params.append(f"{hasta} 23:59:59")
+    if despues:
+        condiciones.append("(fecha, id) < (?, ?)")
+        params += list(despues)
+    where = f"WHERE {' AND '.join(condiciones)}" if condiciones else ""
+
+    conn = conexion_db.conectar("inventario.db")
+    c = conn.cursor()
+    c.execute(f"SELECT * FROM movimientos {where} ORDER BY fecha DESC, id DESC LIMIT ?", params + [limite + 1])
+    filas = c.fetchall()
+    conn.close()
+    if len(filas) > limite:
+        filas = filas[:limite]
+        return filas, (filas[-1][5], filas[-1][0])
+    return filas, None
+
+def obtener_productos_pagina(limite=50, despues=None, texto=None):
+    """Página de productos ordenados por id con paginación por llave.
+    `despues` es el id de la última fila de la página anterior; `texto`
+    filtra por inicio de código o por descripción.
+    Devuelve (filas, cursor_siguiente o None si no hay más)."""
+    condiciones, params = [], []
+    texto = (texto or "").strip()
+    if texto:
+        condiciones.append("(codigo LIKE ? COLLATE NOCASE OR descripcion LIKE ?)")
+        params += [f"{texto}%", f"%{texto}%"]
+    if despues:
+        condiciones.append("id > ?")
+        params.append(despues)
+    where = f"WHERE {' AND '.join(condiciones)}" if condiciones else ""
+
+    conn = conexion_db.conectar("inventario.db")
+    c = conn.cursor()
+    c.execute(f"SELECT * FROM inventario {where} ORDER BY id LIMIT ?", params + [limite + 1])
+    filas = c.fetchall()
+    conn.close()
+    if len(filas) > limite:
+        filas = filas[:limite]
+        return filas, filas[-1][0]
+    return filas, None
+
+def buscar_productos(texto, limite=20):
+    """Productos cuyo código empieza con `texto` o cuya descripción lo contiene.
+    Resultado acotado para selectores de búsqueda mientras se escribe."""
+    texto = (texto or "").strip()
+    if not texto:
+        return []
+    conn = conexion_db.conectar("inventario.db")
+    c = conn.cursor()
+    c.execute("""
+        SELECT * FROM inventario WHERE codigo LIKE ? COLLATE NOCASE
+        UNION
+        SELECT * FROM inventario WHERE descripcion LIKE ?
+        ORDER BY 7 LIMIT ?
+    """, (f"{texto}%", f"%{texto}%", limite))
+    filas = c.fetchall()
+    conn.close()
+    return filas
+
+# ---------- INDICADORES (agregados en SQL) ----------
+def _consulta_df(sql, params=()):
+    conn = conexion_db.conectar("inventario.db")
+    df = pd.read_sql_query(sql, conn, params=params)
+    conn.close()
+    return df
+
+def resumen_stock():
+    """(unidades en stock, valor total del inventario)."""
+    conn = conexion_db.conectar("inventario.db")
+    c = conn.cursor()
+    c.execute("SELECT COALESCE(SUM(cantidad), 0), COALESCE(SUM(cantidad * costo), 0) FROM inventario")
+    total = c.fetchone()
+    conn.close()
+    return total
+
+def movimientos_por_dia(desde, hasta):
+    """Ingresos/egresos por día y tipo entre dos fechas (inclusive), desde el resumen diario."""
+    return _consulta_df("""
+        SELECT dia AS Fecha, tipo AS Tipo, SUM(cantidad) AS Cantidad
+        FROM movimientos_diarios WHERE dia BETWEEN ? AND ?
+        GROUP BY dia, tipo ORDER BY dia
+    """, (str(desde), str(hasta)))
+
+def top_egresos(desde, hasta, n=5):
+    return _consulta_df("""
+        SELECT descripcion AS Descripción, SUM(cantidad) AS Cantidad
+        FROM movimientos_diarios WHERE tipo = 'Egreso' AND dia BETWEEN ? AND ?
+        GROUP BY descripcion ORDER BY Cantidad DESC LIMIT ?
+    """, (str(desde), str(hasta), n))
+
+def productos_bajo_stock(limite=5):
+    return _consulta_df("""
+        SELECT descripcion AS Descripción, cantidad AS Cantidad, codigo AS Código
+        FROM inventario WHERE cantidad <= ?
+    """, (limite,))
+
+def valor_por_bloque():
+    return _consulta_df("""
+        SELECT bloque AS Bloque, SUM(cantidad * costo) AS Valor
+        FROM inventario GROUP BY bloque
+    """)
+
+COLUMNAS_EXCEL = ['Descripción', 'Cantidad', 'Bloque', 'Ubicación', 'Costo', 'Código']
+
 def importar_desde_excel(file):
-    df = pd.read_excel(file)
-    for _, row in df.iterrows():
-        agregar_item(
-            row['Descripción'], int(row['Cantidad']), row['Bloque'], row['Ubicación'], float(row['Costo']), row['Código']
-        )
+    """Importación masiva: valida y deduplica en pandas y hace el upsert de
+    todos los productos y sus movimientos de Ingreso en una sola transacción.
+    Un código existente suma la cantidad importada y actualiza sus datos.
+    Devuelve {"insertados", "actualizados", "errores": [{fila, codigo, error}]}."""
+    reporte = {"insertados": 0, "actualizados": 0, "errores": []}
+    df = pd.read_excel(file, dtype={"Descripción": str, "Bloque": str, "Ubicación": str, "Código": str})
+    faltantes = [col for col in COLUMNAS_EXCEL if col not in df.columns]
+    if faltantes:
+        reporte["errores"].append({"fila": None, "codigo": None, "error": f"Faltan columnas: {', '.join(faltantes)}"})
+        return reporte
+
+    df = df[COLUMNAS_EXCEL].copy()
+    df["fila"] = df.index + 2  # fila de Excel (encabezado en la 1)
+    df["Código"] = df["Código"].fillna("").str.strip()
+    df["Descripción"] = df["Descripción"].fillna("").str.strip()
+    df["Bloque"] = df["Bloque"].fillna("").str.strip()
+    df["Ubicación"] = df["Ubicación"].fillna("").str.strip()
+    cantidad = pd.to_numeric(df["Cantidad"], errors="coerce")
+    costo = pd.to_numeric(df["Costo"], errors="coerce").fillna(0.0)
+
+    # Validaciones vectorizadas: la primera regla que falla es el error de la fila
+    reglas = [
+        (df["Código"] == "", "Código vacío"),
+        (cantidad.isna(), "Cantidad no numérica"),
+        (cantidad < 0, "Cantidad negativa"),
+        (cantidad.notna() & (cantidad % 1 != 0), "Cantidad no entera"),
+        (costo < 0, "Costo negativo"),
+        (df["Código"].str.upper().duplicated(keep="first") & (df["Código"] != ""), "Código duplicado en el archivo"),
+    ]
+    error = pd.Series("", index=df.index)
+    for mascara, mensaje in reglas:
+        error = error.mask((error == "") & mascara.fillna(False), mensaje)
+    invalidas = error != ""
+    reporte["errores"] = [
+        {"fila": int(f), "codigo": c or None, "error": e}
+        for f, c, e in zip(df.loc[invalidas, "fila"], df.loc[invalidas, "Código"], error[invalidas])
+    ]
+
+    validos = df[~invalidas].assign(Cantidad=cantidad[~invalidas].astype(int), Costo=costo[~invalidas])
+    if validos.empty:
+        return reporte
+
+    # Código ya registrado con otras mayúsculas -> se usa el almacenado
+    existentes = buscar_por_codigos(validos["Código"].tolist())
+    validos["Código"] = [existentes[c][6] if existentes.get(c) else c for c in validos["Código"]]
+    es_nuevo = [existentes.get(c) is None for c in df.loc[validos.index, "Código"]]
+
+    filas = list(zip(validos["Descripción"], validos["Cantidad"], validos["Bloque"],
+                     validos["Ubicación"], validos["Costo"].astype(float), validos["Código"]))
+    with conexion_db.transaccion("inventario.db") as conn:
+        c = conn.cursor()
+        c.executemany("""
+            INSERT INTO inventario (descripcion, cantidad, bloque, ubicacion, costo, codigo)
+            VALUES (?, ?, ?, ?, ?, ?)
+            ON CONFLICT(codigo) DO UPDATE SET
+                descripcion = excluded.descripcion,
+                cantidad = inventario.cantidad + excluded.cantidad,
+                bloque = excluded.bloque,
+                ubicacion = excluded.ubicacion,
+                costo = excluded.costo
+        """, filas)
+        insertar_movimientos(c, [(codigo, descripcion, "Ingreso", cant)
+                                 for descripcion, cant, _, _, _, codigo in filas if cant > 0])
+
+    reporte["insertados"] = sum(es_nuevo)
+    reporte["actualizados"] = len(filas) - reporte["insertados"]
+    return reporte
 
 def generar_excel_en_blanco():
     df = pd.DataFrame(columns=['Descripción', 'Cantidad', 'Bloque', 'Ubicación', 'Costo', 'Código'])
@@ -134,34 +440,39 @@ def generar_excel_en_blanco():
     buffer.seek(0)
     return buffer
 
+def exportar_dashboard_excel(fecha_inicio, fecha_fin, tendencia):
+    """Excel del dashboard (inventario, movimientos del período y resumen diario)."""
+    df_inv = pd.DataFrame(obtener_todos(), columns=["ID", "Descripción", "Cantidad", "Bloque", "Ubicación", "Costo", "Código"])
+    df_mov = _consulta_df("""
+        SELECT id AS ID, codigo AS Código, descripcion AS Descripción, tipo AS Tipo,
+               cantidad AS Cantidad, fecha AS Fecha
+        FROM movimientos WHERE substr(fecha, 1, 10) BETWEEN ? AND ? ORDER BY fecha DESC
+    """, (str(fecha_inicio), str(fecha_fin)))
+    excel_buffer = io.BytesIO()
+    with pd.ExcelWriter(excel_buffer, engine="xlsxwriter") as writer:
+        df_inv.to_excel(writer, sheet_name="Inventario", index=False)
+        df_mov.to_excel(writer, sheet_name="Movimientos", index=False)
+        tendencia.to_excel(writer, sheet_name="Resumen diario", index=False)
+    return excel_buffer.getvalue()
+
+def mostrar_reporte_importacion(tarea):
+    reporte = tarea["resultado"]
+    st.success(f"✅ {reporte['insertados']} productos nuevos, {reporte['actualizados']} actualizados")
+    if reporte["errores"]:
+        st.warning(f"⚠️ {len(reporte['errores'])} filas con errores no se importaron")
+        st.dataframe(pd.DataFrame(reporte["errores"]), use_container_width=True)
+
 # ---------- PDF ----------
-def generar_etiqueta_pdf_lote(productos, ancho_mm=70, alto_mm=50):
-    ancho = ancho_mm * mm
-    alto = alto_mm * mm
-    margen = 10
-    buffer = io.BytesIO()
-    c = canvas.Canvas(buffer, pagesize=(ancho, alto * len(productos)))
-    for i, item in enumerate(productos):
-        y_offset = alto * (len(productos) - i - 1)
-        c.setStrokeColor(black)
-        c.rect(margen, y_offset + margen, ancho - 2 * margen, alto - 2 * margen)
-        c.setFont("Helvetica-Bold", 9)
-        x_text = margen + 8
-        y_text = y_offset + alto - margen - 15
-        descripcion_envuelta = textwrap.wrap(f"Descripción: {item[1]}", width=50)
-        for linea in descripcion_envuelta:
-            c.drawString(x_text, y_text, linea)
-            y_text -= 12
-        c.drawString(x_text, y_text, f"Cantidad: {item[2]} | Costo: S/ {item[5]:.2f}")
-        y_text -= 12
-        c.drawString(x_text, y_text, f"Bloque: {item[3]} | Ubicación: {item[4]}")
-        y_text -= 12
-        c.drawString(x_text, y_text, f"Código: {item[6]}")
-        barcode = code128.Code128(item[6].upper(), barHeight=15 * mm, barWidth=1.2)
-        barcode.drawOn(c, (ancho - barcode.width) / 2, y_offset + margen + 10)
-    c.save()
-    buffer.seek(0)
-    return buffer
+def generar_etiqueta_pdf_lote(productos, ancho_mm=70, alto_mm=50, diseno=None):
+    """Etiquetas en rollo (una por página de ancho x alto) o en el diseño indicado
+    (ver etiquetas_pdf.diseno_a4)."""
+    return etiquetas_pdf.generar_etiquetas(productos, diseno or etiquetas_pdf.diseno_rollo(ancho_mm, alto_mm))
+
+def etiquetas_en_fondo(productos, diseno, copias=1, al_avanzar=None):
+    """Versión para tareas_fondo: informa el avance como fracción del total."""
+    total = max(1, len(productos) * copias)
+    avance = (lambda hechas, hojas: al_avanzar(hechas / total, f"{hechas} de {total} etiquetas ({hojas} hojas)")) if al_avanzar else None
+    return etiquetas_pdf.generar_etiquetas(productos, diseno, copias=copias, al_avanzar=avance).getvalue()
 
 def generar_comprobante_egreso_pdf(codigo, descripcion, cantidad, bloque, ubicacion, costo):
     buffer = io.BytesIO()
@@ -182,6 +493,31 @@ def generar_comprobante_egreso_pdf(codigo, descripcion, cantidad, bloque, ubicac
     buffer.seek(0)
     return buffer
 
+def generar_comprobante_egreso_lote(resultados):
+    """Un comprobante por página para las líneas registradas de registrar_egresos()."""
+    buffer = io.BytesIO()
+    c = canvas.Canvas(buffer, pagesize=A6)
+    fecha = datetime.now().strftime('%Y-%m-%d %H:%M:%S')
+    for r in resultados:
+        if not r["ok"]:
+            continue
+        c.setFont("Helvetica-Bold", 10)
+        c.drawString(10, 260, "🧾 Comprobante de Egreso")
+        c.setFont("Helvetica", 9)
+        c.drawString(10, 245, f"Código: {r['codigo']}")
+        c.drawString(10, 232, f"Descripción: {r['descripcion']}")
+        c.drawString(10, 219, f"Cantidad: {r['cantidad']}")
+        c.drawString(10, 206, f"Bloque: {r['bloque']}")
+        c.drawString(10, 193, f"Ubicación: {r['ubicacion']}")
+        c.drawString(10, 180, f"Costo: S/ {r['costo']:.2f}")
+        c.drawString(10, 167, f"Fecha: {fecha}")
+        barcode = code128.Code128(r["codigo"].upper(), barHeight=15 * mm, barWidth=0.4)
+        barcode.drawOn(c, 10, 110)
+        c.showPage()
+    c.save()
+    buffer.seek(0)
+    return buffer
+
 # ---------- UI PRINCIPAL ----------
 def mostrar_gestion_inventario():
     init_db()
@@ -206,6 +542,7 @@ def mostrar_gestion_inventario():
                 st.code(f"Código generado automáticamente: {codigo}")
                 generar = st.form_submit_button("Guardar y generar etiqueta")
             if generar and descripcion and cantidad and bloque and ubicacion and codigo:
+                codigo = generar_codigo_automatico(reservar=True)
                 agregar_item(descripcion, cantidad, bloque, ubicacion, costo, codigo)
                 pdf = generar_etiqueta_pdf_lote([(0, descripcion, cantidad, bloque, ubicacion, costo, codigo)])
                 st.success("✅ Producto guardado correctamente")
@@ -214,34 +551,72 @@ def mostrar_gestion_inventario():
         # === 📋 Inventario ===
         with tabs[1]:
             st.header("📋 Inventario actual")
-            data = obtener_todos()
+            filtro_inv = st.text_input("Filtrar por código o descripción", key="inv_filtro")
+
+            # Pila de cursores: cambiar el filtro vuelve a la primera página
+            if st.session_state.get("inv_filtro_prev") != filtro_inv:
+                st.session_state["inv_filtro_prev"] = filtro_inv
+                st.session_state["inv_cursores"] = [None]
+            cursores_inv = st.session_state["inv_cursores"]
+            data, siguiente_inv = obtener_productos_pagina(50, cursores_inv[-1], filtro_inv)
             if data:
                 df = pd.DataFrame(data, columns=["ID", "Descripción", "Cantidad", "Bloque", "Ubicación", "Costo", "Código"])
                 st.dataframe(df, use_container_width=True)
-                total_costo = df["Cantidad"] * df["Costo"]
-                st.metric("💰 Costo total del inventario", f"S/ {total_costo.sum():,.2f}")
-
-                seleccion = st.multiselect("Selecciona productos para imprimir etiquetas:", df["Código"].tolist())
+                col_p1, col_p2, col_p3 = st.columns([1, 2, 1])
+                if col_p1.button("⬅️ Anterior", disabled=len(cursores_inv) == 1, key="inv_anterior"):
+                    cursores_inv.pop()
+                    st.rerun()
+                col_p2.caption(f"Página {len(cursores_inv)}")
+                if col_p3.button("Siguiente ➡️", disabled=siguiente_inv is None, key="inv_siguiente"):
+                    cursores_inv.append(siguiente_inv)
+                    st.rerun()
+            elif filtro_inv:
+                st.info("Ningún producto coincide con el filtro.")
+            else:
+                st.info("No hay productos registrados aún.")
+            _, total_valor = resumen_stock()
+            st.metric("💰 Costo total del inventario", f"S/ {total_valor:,.2f}")
+
+            # Selector con búsqueda: solo se envían al navegador los resultados acotados
+            busqueda = st.text_input("🔎 Buscar producto para etiquetas (código o descripción)", key="buscar_etiquetas")
+            seleccion_prev = st.session_state.get("etiquetas_sel", [])
+            opciones = list(dict.fromkeys(seleccion_prev + [r[6] for r in buscar_productos(busqueda)]))
+            seleccion = st.multiselect("Selecciona productos para imprimir etiquetas:", opciones, default=seleccion_prev)
+            st.session_state["etiquetas_sel"] = seleccion
+            formato = st.radio("Formato de impresión", ["Rollo (una etiqueta por página)", "Hoja A4"], horizontal=True)
+            diseno = None
+            if formato == "Hoja A4":
+                col_a4a, col_a4b, col_a4c = st.columns(3)
+                columnas_a4 = col_a4a.number_input("Columnas", min_value=1, max_value=6, value=3)
+                filas_a4 = col_a4b.number_input("Filas", min_value=1, max_value=etiquetas_pdf.filas_max_a4(), value=7)
+                copias = col_a4c.number_input("Copias por producto", min_value=1, value=1)
+                diseno = etiquetas_pdf.diseno_a4(int(filas_a4), int(columnas_a4))
+            else:
                 ancho_mm = st.number_input("Ancho de etiqueta (mm)", value=105)
-                alto_mm = st.number_input("Alto de etiqueta (mm)", value=70)
+                alto_mm = st.number_input("Alto de etiqueta (mm)", min_value=etiquetas_pdf.alto_minimo_mm(), value=70)
+                copias = st.number_input("Copias por producto", min_value=1, value=1)
+                diseno = etiquetas_pdf.diseno_rollo(ancho_mm, alto_mm)
+
+            if st.button("📄 Generar PDF con etiquetas"):
+                seleccionados = [item for item in buscar_por_codigos(seleccion).values() if item]
+                if seleccionados:
+                    tareas_fondo.enviar_desde_ui(
+                        "tarea_etiquetas", etiquetas_en_fondo, seleccionados, diseno, int(copias),
+                        nombre="Etiquetas", archivo="etiquetas_seleccionadas.pdf", mime="application/pdf"
+                    )
+                else:
+                    st.warning("No se seleccionaron productos válidos.")
+            tareas_fondo.panel_tarea("tarea_etiquetas")
 
-                if st.button("📄 Generar PDF con etiquetas"):
-                    seleccionados = [item for item in data if item[6] in seleccion]
-                    if seleccionados:
-                        pdf = generar_etiqueta_pdf_lote(seleccionados, ancho_mm, alto_mm)
-                        st.download_button("📥 Descargar PDF", data=pdf, file_name="etiquetas_seleccionadas.pdf", mime="application/pdf")
-                    else:
-                        st.warning("No se seleccionaron productos válidos.")
+            st.markdown("### 📥 Importar desde Excel")
+            archivo = st.file_uploader("Seleccionar archivo Excel (.xlsx)", type=["xlsx"])
+            if archivo and st.button("📤 Importar productos"):
+                tareas_fondo.enviar_desde_ui(
+                    "tarea_importar", importar_desde_excel, io.BytesIO(archivo.getvalue()), nombre="Importación Excel"
+                )
+            tareas_fondo.panel_tarea("tarea_importar", al_listo=mostrar_reporte_importacion)
 
-                st.markdown("### 📥 Importar desde Excel")
-                archivo = st.file_uploader("Seleccionar archivo Excel (.xlsx)", type=["xlsx"])
-                if archivo and st.button("📤 Importar productos"):
-                    importar_desde_excel(archivo)
-                    st.success("✅ Productos importados correctamente")
-
-                st.download_button("📄 Descargar plantilla en blanco", data=generar_excel_en_blanco(), file_name="plantilla_inventario.xlsx", mime="application/vnd.openxmlformats-officedocument.spreadsheetml.sheet")
-            else:
-                st.info("No hay productos registrados aún.")
+            st.download_button("📄 Descargar plantilla en blanco", data=generar_excel_en_blanco(), file_name="plantilla_inventario.xlsx", mime="application/vnd.openxmlformats-officedocument.spreadsheetml.sheet")
 
         # === 🔍 Buscar / Egreso ===
         with tabs[2]:
@@ -261,6 +636,20 @@ def mostrar_gestion_inventario():
                 else:
                     st.warning("❌ Producto no encontrado")
 
+            with st.expander("📶 Escaneo en ráfaga (un código por línea)"):
+                rafaga = st.text_area("Códigos leídos", key="rafaga_codigos")
+                if st.button("➕ Agregar todos"):
+                    en_lista = {p[6] for p in st.session_state.productos_egreso}
+                    no_encontrados = []
+                    for leido, item in buscar_por_codigos(rafaga.splitlines()).items():
+                        if item is None:
+                            no_encontrados.append(leido)
+                        elif item[6] not in en_lista:
+                            st.session_state.productos_egreso.append(item)
+                            en_lista.add(item[6])
+                    if no_encontrados:
+                        st.warning(f"❌ No encontrados: {', '.join(no_encontrados)}")
+
             if st.session_state.productos_egreso:
                 st.subheader("🧾 Lista de productos por egresar")
                 cantidades = {}
@@ -269,70 +658,75 @@ def mostrar_gestion_inventario():
                     cantidades[item[6]] = st.number_input(f"Cantidad a egresar para {item[6]}", min_value=1, max_value=item[2], key=f"cant_{i}")
 
                 if st.button("✅ Registrar egreso de todos"):
-                    buffer = io.BytesIO()
-                    c = canvas.Canvas(buffer, pagesize=A6)
-                    for item in st.session_state.productos_egreso:
-                        cantidad = cantidades[item[6]]
-                        registrar_egreso(item[6], cantidad)
-                        c.setFont("Helvetica-Bold", 10)
-                        c.drawString(10, 260, "🧾 Comprobante de Egreso")
-                        c.setFont("Helvetica", 9)
-                        c.drawString(10, 245, f"Código: {item[6]}")
-                        c.drawString(10, 232, f"Descripción: {item[1]}")
-                        c.drawString(10, 219, f"Cantidad: {cantidad}")
-                        c.drawString(10, 206, f"Bloque: {item[3]}")
-                        c.drawString(10, 193, f"Ubicación: {item[4]}")
-                        c.drawString(10, 180, f"Costo: S/ {item[5]:.2f}")
-                        c.drawString(10, 167, f"Fecha: {datetime.now().strftime('%Y-%m-%d %H:%M:%S')}")
-                        barcode = code128.Code128(item[6].upper(), barHeight=15 * mm, barWidth=0.4)
-                        barcode.drawOn(c, 10, 110)
-                        c.showPage()
-                    c.save()
-                    buffer.seek(0)
-                    st.download_button("📄 Descargar comprobante PDF", data=buffer, file_name="egreso_multiple.pdf", mime="application/pdf")
-                    st.success("✅ Egreso registrado correctamente")
+                    resultados = registrar_egresos(
+                        [(item[6], cantidades[item[6]]) for item in st.session_state.productos_egreso]
+                    )
+                    registrados = [r for r in resultados if r["ok"]]
+                    fallidos = [r for r in resultados if not r["ok"]]
+                    if registrados:
+                        pdf = generar_comprobante_egreso_lote(registrados)
+                        st.download_button("📄 Descargar comprobante PDF", data=pdf, file_name="egreso_multiple.pdf", mime="application/pdf")
+                        st.success(f"✅ Egreso registrado para {len(registrados)} producto(s)")
+                    for r in fallidos:
+                        st.error(f"❌ {r['codigo']}: {r['motivo']}")
                     st.session_state.productos_egreso.clear()
 
         # === 🕓 Historial ===
         with tabs[3]:
             st.subheader("🕓 Historial de movimientos")
-            movs = obtener_movimientos()
+            col_h1, col_h2, col_h3, col_h4 = st.columns(4)
+            filtro_codigo = col_h1.text_input("Código", key="hist_codigo")
+            filtro_tipo = col_h2.selectbox("Tipo", ["Todos", "Ingreso", "Egreso"], key="hist_tipo")
+            filtro_desde = col_h3.date_input("Desde", value=None, key="hist_desde")
+            filtro_hasta = col_h4.date_input("Hasta", value=None, key="hist_hasta")
+            filtros = dict(
+                codigo=filtro_codigo or None,
+                tipo=None if filtro_tipo == "Todos" else filtro_tipo,
+                desde=filtro_desde, hasta=filtro_hasta
+            )
+
+            # Pila de cursores: cambiar un filtro vuelve a la primera página
+            if st.session_state.get("hist_filtros") != filtros:
+                st.session_state["hist_filtros"] = filtros
+                st.session_state["hist_cursores"] = [None]
+            cursores = st.session_state["hist_cursores"]
+            movs, siguiente = obtener_movimientos_pagina(50, cursores[-1], **filtros)
             if movs:
                 dfm = pd.DataFrame(movs, columns=["ID", "Código", "Descripción", "Tipo", "Cantidad", "Fecha"])
                 st.dataframe(dfm, use_container_width=True)
+                col_p1, col_p2, col_p3 = st.columns([1, 2, 1])
+                if col_p1.button("⬅️ Anterior", disabled=len(cursores) == 1):
+                    cursores.pop()
+                    st.rerun()
+                col_p2.caption(f"Página {len(cursores)}")
+                if col_p3.button("Siguiente ➡️", disabled=siguiente is None):
+                    cursores.append(siguiente)
+                    st.rerun()
             else:
                 st.info("No hay movimientos registrados todavía.")
 
         # === 📊 Dashboard ===
         with tabs[4]:
             st.subheader("📊 Dashboard de Indicadores de Inventario")
-            data = obtener_todos()
-            movimientos = obtener_movimientos()
-            if data and movimientos:
-                df_inv = pd.DataFrame(data, columns=["ID", "Descripción", "Cantidad", "Bloque", "Ubicación", "Costo", "Código"])
-                df_mov = pd.DataFrame(movimientos, columns=["ID", "Código", "Descripción", "Tipo", "Cantidad", "Fecha"])
-                df_mov["Fecha"] = pd.to_datetime(df_mov["Fecha"])
-
+            total_stock, total_valor = resumen_stock()
+            if total_stock or total_valor:
                 st.markdown("### 📆 Filtrar por período")
                 col_f1, col_f2 = st.columns(2)
                 fecha_inicio = col_f1.date_input("Desde", value=datetime.now().replace(day=1))
                 fecha_fin = col_f2.date_input("Hasta", value=datetime.now())
-                df_filtrado = df_mov[(df_mov["Fecha"] >= pd.to_datetime(fecha_inicio)) & (df_mov["Fecha"] <= pd.to_datetime(fecha_fin))]
 
-                total_stock = df_inv["Cantidad"].sum()
-                total_valor = (df_inv["Cantidad"] * df_inv["Costo"]).sum()
                 col1, col2 = st.columns(2)
                 col1.metric("📦 Total unidades en stock", f"{total_stock:,}")
                 col2.metric("💰 Valor total del inventario", f"S/ {total_valor:,.2f}")
 
-                ingresos = df_filtrado[df_filtrado["Tipo"] == "Ingreso"]["Cantidad"].sum()
-                egresos = df_filtrado[df_filtrado["Tipo"] == "Egreso"]["Cantidad"].sum()
+                tendencia = movimientos_por_dia(fecha_inicio, fecha_fin)
+                ingresos = int(tendencia.loc[tendencia["Tipo"] == "Ingreso", "Cantidad"].sum())
+                egresos = int(tendencia.loc[tendencia["Tipo"] == "Egreso", "Cantidad"].sum())
                 col3, col4 = st.columns(2)
                 col3.metric("📥 Ingresos en periodo", ingresos)
                 col4.metric("📤 Egresos en periodo", egresos)
 
                 st.markdown("### 📈 Tendencia de movimientos en el tiempo")
-                tendencia = df_filtrado.groupby([df_filtrado["Fecha"].dt.date, "Tipo"])["Cantidad"].sum().reset_index()
                 chart = alt.Chart(tendencia).mark_line(point=True).encode(
                     x='Fecha:T',
                     y='Cantidad:Q',
@@ -342,27 +736,27 @@ def mostrar_gestion_inventario():
                 st.altair_chart(chart, use_container_width=True)
 
                 st.markdown("### 🔝 Top 5 productos más egresados")
-                top_egresos = df_filtrado[df_filtrado["Tipo"] == "Egreso"].groupby("Descripción")["Cantidad"].sum().sort_values(ascending=False).head(5)
-                st.bar_chart(top_egresos)
+                st.bar_chart(top_egresos(fecha_inicio, fecha_fin).set_index("Descripción")["Cantidad"])
 
                 st.markdown("### ⚠️ Alerta de bajo stock")
-                bajo_stock = df_inv[df_inv["Cantidad"] <= 5]
+                bajo_stock = productos_bajo_stock(5)
                 if not bajo_stock.empty:
                     st.warning("Productos por debajo del nivel mínimo:")
-                    st.dataframe(bajo_stock[["Descripción", "Cantidad", "Código"]])
+                    st.dataframe(bajo_stock)
                 else:
                     st.success("✅ Todos los productos tienen stock suficiente.")
 
                 st.markdown("### 🧱 Valor por bloque")
-                valor_bloque = df_inv.groupby("Bloque").apply(lambda x: (x["Cantidad"] * x["Costo"]).sum())
-                st.bar_chart(valor_bloque)
+                st.bar_chart(valor_por_bloque().set_index("Bloque")["Valor"])
 
                 st.markdown("### 📤 Exportar dashboard")
-                excel_buffer = io.BytesIO()
-                with pd.ExcelWriter(excel_buffer, engine="xlsxwriter") as writer:
-                    df_inv.to_excel(writer, sheet_name="Inventario", index=False)
-                    df_mov.to_excel(writer, sheet_name="Movimientos", index=False)
-                excel_buffer.seek(0)
-                st.download_button("📥 Descargar Dashboard en Excel", data=excel_buffer, file_name="dashboard_inventario.xlsx", mime="application/vnd.openxmlformats-officedocument.spreadsheetml.sheet")
+                # El Excel se arma solo a pedido (antes se generaba en cada render)
+                if st.button("📊 Preparar Excel del período"):
+                    tareas_fondo.enviar_desde_ui(
+                        "tarea_dashboard_excel", exportar_dashboard_excel, fecha_inicio, fecha_fin, tendencia,
+                        nombre="Excel del dashboard", archivo="dashboard_inventario.xlsx",
+                        mime="application/vnd.openxmlformats-officedocument.spreadsheetml.sheet"
+                    )
+                tareas_fondo.panel_tarea("tarea_dashboard_excel")
             else:
                 st.info("No hay datos suficientes para mostrar el dashboard.")
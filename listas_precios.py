@@ -0,0 +1,170 @@
+# listas_precios.py
+# Listas de precios del cotizador con versiones y fecha de vigencia.
+# Cada versión es una copia completa de las tablas (mismo formato que
+# cotizador_motor.base_data) y nunca se modifica: un cambio de precios es una
+# versión nueva. Cada versión se compila una sola vez por proceso y las
+# cotizaciones guardan el id de la versión con la que se calcularon.
+import copy
+import functools
+import hashlib
+import json
+from datetime import date, datetime
+
+import conexion_db
+import cotizador_motor as motor
+
+DB_LISTAS = "listas_precios.db"
+
+
+# ============================
+# Conexión y esquema
+# ============================
+def get_conn():
+    return conexion_db.conectar(DB_LISTAS)
+
+
+def init_db():
+    conn = get_conn()
+    c = conn.cursor()
+    c.execute("""
+        CREATE TABLE IF NOT EXISTS versiones (
+            id INTEGER PRIMARY KEY AUTOINCREMENT,
+            vigente_desde TEXT NOT NULL,
+            creado TEXT,
+            usuario TEXT,
+            nota TEXT,
+            huella TEXT,
+            datos TEXT NOT NULL -- JSON
+        )
+    """)
+    c.execute("CREATE INDEX IF NOT EXISTS idx_versiones_vigencia ON versiones(vigente_desde, id)")
+    c.execute("SELECT COUNT(*) FROM versiones")
+    if c.fetchone()[0] == 0:
+        # Primera versión: la lista que estaba en el código, vigente desde siempre
+        datos = limpiar(motor.base_data)
+        c.execute("""
+            INSERT INTO versiones (vigente_desde, creado, usuario, nota, huella, datos)
+            VALUES (?, ?, ?, ?, ?, ?)
+        """, ("2000-01-01", datetime.now().isoformat(), "sistema",
+              "Lista inicial (base_data del cotizador)", huella(datos), json.dumps(datos, ensure_ascii=False)))
+    conn.commit()
+    conn.close()
+
+
+# ============================
+# Utilidades
+# ============================
+def limpiar(base):
+    """Copia de las tablas sin restos de Excel: en las secciones de
+    opción -> precio, los textos como "#¡REF!" quedan como None (sin precio)
+    y los precios se guardan como float, para que la huella no dependa de
+    si se escribió 25 o 25.0."""
+    base = copy.deepcopy(base)
+    for seccion in secciones_simples(base):
+        valores = base[seccion]
+        for opcion, precio in valores.items():
+            valores[opcion] = float(precio) if isinstance(precio, (int, float)) else None
+    return base
+
+
+def huella(datos):
+    texto = json.dumps(datos, sort_keys=True, ensure_ascii=False)
+    return hashlib.sha256(texto.encode("utf-8")).hexdigest()[:16]
+
+
+def secciones_simples(base):
+    """Secciones opción -> precio (las que se pueden editar como tabla)."""
+    return [s for s, v in base.items()
+            if isinstance(v, dict) and all(not isinstance(x, (dict, list)) for x in v.values())]
+
+
+# ============================
+# Consulta
+# ============================
+def vigente(fecha=None):
+    """Id de la versión vigente en `fecha` (hoy por defecto)."""
+    fecha = str(fecha or date.today())
+    conn = get_conn()
+    c = conn.cursor()
+    c.execute("""
+        SELECT id FROM versiones WHERE vigente_desde <= ?
+        ORDER BY vigente_desde DESC, id DESC LIMIT 1
+    """, (fecha,))
+    fila = c.fetchone()
+    if not fila:
+        c.execute("SELECT MIN(id) FROM versiones")
+        fila = c.fetchone()
+    conn.close()
+    return fila[0]
+
+
+def version_de(cotizacion):
+    """Versión con la que se calculó una cotización guardada. Las anteriores
+    a las listas versionadas usan la que estaba vigente en su fecha."""
+    if cotizacion and cotizacion.get("lista_precios"):
+        return int(cotizacion["lista_precios"])
+    return vigente(cotizacion.get("fecha") if cotizacion else None)
+
+
+def listar():
+    """[(id, vigente_desde, creado, usuario, nota)] de la más nueva a la más antigua."""
+    conn = get_conn()
+    c = conn.cursor()
+    c.execute("""
+        SELECT id, vigente_desde, creado, usuario, nota
+        FROM versiones ORDER BY vigente_desde DESC, id DESC
+    """)
+    filas = c.fetchall()
+    conn.close()
+    return filas
+
+
+@functools.lru_cache(maxsize=32)
+def _cargar(version):
+    conn = get_conn()
+    c = conn.cursor()
+    c.execute("SELECT datos FROM versiones WHERE id = ?", (version,))
+    fila = c.fetchone()
+    conn.close()
+    if not fila:
+        raise KeyError(f"Lista de precios {version} no existe")
+    base = json.loads(fila[0])
+    return base, motor.compilar(base)
+
+
+def base(version):
+    """Tablas de la versión (mismo formato que base_data). No modificar."""
+    return _cargar(version)[0]
+
+
+def tablas(version):
+    """Tablas compiladas de la versión, para cotizador_motor."""
+    return _cargar(version)[1]
+
+
+# ============================
+# Publicación
+# ============================
+def publicar(datos, vigente_desde=None, usuario=None, nota=None):
+    """Guarda una versión nueva y devuelve su id. Si es idéntica a la
+    versión vigente en esa fecha, no crea nada y devuelve la existente."""
+    datos = limpiar(datos)
+    vigente_desde = str(vigente_desde or date.today())
+    actual = vigente(vigente_desde)
+    if huella(base(actual)) == huella(datos):
+        return actual
+
+    conn = get_conn()
+    c = conn.cursor()
+    c.execute("""
+        INSERT INTO versiones (vigente_desde, creado, usuario, nota, huella, datos)
+        VALUES (?, ?, ?, ?, ?, ?)
+    """, (vigente_desde, datetime.now().isoformat(), usuario, nota, huella(datos),
+          json.dumps(datos, ensure_ascii=False)))
+    nuevo = c.lastrowid
+    conn.commit()
+    conn.close()
+    return nuevo
+
+
+init_db()
@@ -1,10 +1,11 @@
 import streamlit as st
 import sqlite3
+import conexion_db
 import bcrypt
-import json 
+import datos_cache
 # ---------- BASE DE DATOS ----------
 def init_db():
-    conn = sqlite3.connect('login_usuarios.db')
+    conn = conexion_db.conectar('login_usuarios.db')
     c = conn.cursor()
     c.execute('''
         CREATE TABLE IF NOT EXISTS usuarios (
@@ -19,7 +20,7 @@ def init_db():
     conn.close()
 
 def crear_usuario_por_defecto():
-    conn = sqlite3.connect('login_usuarios.db')
+    conn = conexion_db.conectar('login_usuarios.db')
     c = conn.cursor()
     c.execute("SELECT COUNT(*) FROM usuarios")
     if c.fetchone()[0] == 0:
@@ -34,7 +35,7 @@ def crear_usuario_por_defecto():
 
 
 def crear_usuario(username, password, rol, etapa):
-    conn = sqlite3.connect('login_usuarios.db')
+    conn = conexion_db.conectar('login_usuarios.db')
     c = conn.cursor()
     hashed_password = bcrypt.hashpw(password.encode(), bcrypt.gensalt())
     try:
@@ -48,7 +49,7 @@ def crear_usuario(username, password, rol, etapa):
         conn.close()
 
 def verificar_usuario(username, password):
-    conn = sqlite3.connect('login_usuarios.db')
+    conn = conexion_db.conectar('login_usuarios.db')
     c = conn.cursor()
     c.execute("SELECT password, rol, etapa FROM usuarios WHERE username=?", (username,))
     result = c.fetchone()
@@ -60,7 +61,7 @@ def verificar_usuario(username, password):
     return None, None
 
 def obtener_usuarios():
-    conn = sqlite3.connect('login_usuarios.db')
+    conn = conexion_db.conectar('login_usuarios.db')
     c = conn.cursor()
     c.execute("SELECT id, username, rol, etapa FROM usuarios")
     users = c.fetchall()
@@ -68,7 +69,7 @@ def obtener_usuarios():
     return users
 
 def actualizar_usuario(user_id, password=None, rol=None, etapa=None):
-    conn = sqlite3.connect('login_usuarios.db')
+    conn = conexion_db.conectar('login_usuarios.db')
     c = conn.cursor()
     if password:
         hashed_password = bcrypt.hashpw(password.encode(), bcrypt.gensalt())
@@ -81,7 +82,7 @@ def actualizar_usuario(user_id, password=None, rol=None, etapa=None):
     conn.close()
 
 def eliminar_usuario(user_id):
-    conn = sqlite3.connect('login_usuarios.db')
+    conn = conexion_db.conectar('login_usuarios.db')
     c = conn.cursor()
     c.execute("DELETE FROM usuarios WHERE id=?", (user_id,))
     conn.commit()
@@ -102,11 +103,7 @@ def gestion_usuario():
         
 
             # Leer etapas desde archivo JSON
-        try:
-            with open("data/etapas.json", "r", encoding="utf-8") as f:
-                etapas_config = json.load(f)
-        except FileNotFoundError:
-            etapas_config = []
+        etapas_config = datos_cache.leer_json("data/etapas.json", [])
 
         # Extraer solo los nombres de etapa
         nombres_etapas = [etapa["nombre"] for etapa in etapas_config] if etapas_config else []
@@ -1,5 +1,6 @@
 import streamlit as st
 import sqlite3
+import conexion_db
 import base64
 import os
 from datetime import datetime
@@ -12,7 +13,7 @@ os.makedirs(PLANOS_DIR, exist_ok=True)
 
 # --- Inicializar base de datos ---
 def init_db():
-    conn = sqlite3.connect(DB_NAME)
+    conn = conexion_db.conectar(DB_NAME)
     c = conn.cursor()
     c.execute("""
         CREATE TABLE IF NOT EXISTS planos (
@@ -31,7 +32,7 @@ def guardar_plano(nombre, archivo):
     with open(ruta, "wb") as f:
         f.write(archivo)
 
-    conn = sqlite3.connect(DB_NAME)
+    conn = conexion_db.conectar(DB_NAME)
     c = conn.cursor()
     try:
         c.execute("INSERT INTO planos (nombre, fecha, ruta) VALUES (?, ?, ?)",
@@ -42,7 +43,7 @@ def guardar_plano(nombre, archivo):
     conn.close()
 
 def obtener_planos():
-    conn = sqlite3.connect(DB_NAME)
+    conn = conexion_db.conectar(DB_NAME)
     c = conn.cursor()
     c.execute("SELECT id, nombre, fecha, ruta FROM planos ORDER BY fecha DESC")
     data = c.fetchall()
@@ -50,7 +51,7 @@ def obtener_planos():
     return data
 
 def obtener_plano_por_id(plano_id):
-    conn = sqlite3.connect(DB_NAME)
+    conn = conexion_db.conectar(DB_NAME)
     c = conn.cursor()
     c.execute("SELECT ruta FROM planos WHERE id=?", (plano_id,))
     data = c.fetchone()
@@ -62,7 +63,7 @@ def eliminar_plano(plano_id):
     if ruta and os.path.exists(ruta):
         os.remove(ruta)
 
-    conn = sqlite3.connect(DB_NAME)
+    conn = conexion_db.conectar(DB_NAME)
     c = conn.cursor()
     c.execute("DELETE FROM planos WHERE id=?", (plano_id,))
     conn.commit()
@@ -0,0 +1,190 @@
+# maestros.py
+# Directorio de datos maestros: clientes (clientes.json) y proveedores
+# (tabla proveedores de compras.db). Se cargan una vez por proceso, se
+# recargan solo cuando el archivo o la base cambian, y se consultan con
+# búsqueda por prefijo / aproximada para que los selectores muestren pocas
+# opciones en lugar de la lista completa.
+import bisect
+import difflib
+import os
+import sqlite3
+import threading
+import unicodedata
+
+import streamlit as st
+
+import conexion_db
+import datos_cache
+
+CLIENTES_FILE = "clientes.json"
+DB_COMPRAS = "compras.db"
+
+_lock = threading.Lock()
+# tipo -> (firma de la fuente, índice)
+_cache = {}
+
+
+# ============================
+# Índice
+# ============================
+def normalizar(texto):
+    """Minúsculas y sin tildes, para comparar nombres."""
+    texto = unicodedata.normalize("NFKD", str(texto or "")).encode("ascii", "ignore").decode()
+    return " ".join(texto.lower().split())
+
+
+def _indexar(registros, campo):
+    por_nombre = {}
+    for r in registros:
+        nombre = str(r.get(campo) or "").strip()
+        if nombre:
+            por_nombre.setdefault(nombre, dict(r))
+    claves = sorted((normalizar(n), n) for n in por_nombre)
+    return {
+        "por_nombre": por_nombre,
+        "claves": claves,                       # ordenadas para bisect
+        "normalizados": [k for k, _ in claves],
+    }
+
+
+def _firma_archivo(ruta):
+    """(mtime, tamaño) del archivo y de su WAL: cambia con cualquier escritura."""
+    firma = []
+    for archivo in (ruta, f"{ruta}-wal"):
+        try:
+            info = os.stat(archivo)
+            firma.append((info.st_mtime_ns, info.st_size))
+        except OSError:
+            firma.append(None)
+    return tuple(firma)
+
+
+def _cargar_clientes():
+    return _indexar(datos_cache.leer_json(CLIENTES_FILE, ()) or (), "nombre")
+
+
+def _cargar_proveedores():
+    if not os.path.exists(DB_COMPRAS):
+        return _indexar([], "proveedor")
+    conn = conexion_db.conectar(DB_COMPRAS)
+    conn.row_factory = sqlite3.Row
+    try:
+        filas = [dict(r) for r in conn.execute("SELECT * FROM proveedores ORDER BY proveedor ASC")]
+    except sqlite3.OperationalError:
+        filas = []  # tabla aún no creada
+    finally:
+        conn.close()
+    return _indexar(filas, "proveedor")
+
+
+FUENTES = {
+    "clientes": (CLIENTES_FILE, _cargar_clientes),
+    "proveedores": (DB_COMPRAS, _cargar_proveedores),
+}
+
+
+def _indice(tipo):
+    ruta, cargar = FUENTES[tipo]
+    firma = _firma_archivo(ruta)
+    with _lock:
+        entrada = _cache.get(tipo)
+        if entrada and entrada[0] == firma:
+            return entrada[1]
+    indice = cargar()
+    with _lock:
+        _cache[tipo] = (firma, indice)
+    return indice
+
+
+def invalidar(tipo=None):
+    """Fuerza la recarga (al guardar un cliente o proveedor)."""
+    with _lock:
+        if tipo is None:
+            _cache.clear()
+        else:
+            _cache.pop(tipo, None)
+
+
+# ============================
+# API pública
+# ============================
+def buscar(tipo, texto, limite=20):
+    """Nombres que coinciden con `texto`: primero los que empiezan así,
+    luego los que tienen una palabra que empieza así, luego los que lo
+    contienen y al final los parecidos (errores de tipeo)."""
+    indice = _indice(tipo)
+    claves = indice["claves"]
+    consulta = normalizar(texto)
+    if not consulta:
+        return [n for _, n in claves[:limite]]
+
+    resultado = []
+    vistos = set()
+
+    def agregar(nombre):
+        if nombre not in vistos:
+            vistos.add(nombre)
+            resultado.append(nombre)
+
+    i = bisect.bisect_left(indice["normalizados"], consulta)
+    while i < len(claves) and claves[i][0].startswith(consulta) and len(resultado) < limite:
+        agregar(claves[i][1])
+        i += 1
+    for norm, nombre in claves:
+        if len(resultado) >= limite:
+            return resultado
+        if any(p.startswith(consulta) for p in norm.split()):
+            agregar(nombre)
+    for norm, nombre in claves:
+        if len(resultado) >= limite:
+            return resultado
+        if consulta in norm:
+            agregar(nombre)
+    if len(resultado) < limite:
+        por_norm = dict(claves)
+        for norm in difflib.get_close_matches(consulta, indice["normalizados"], n=limite, cutoff=0.6):
+            agregar(por_norm[norm])
+    return resultado[:limite]
+
+
+def obtener(tipo, nombre):
+    """Registro completo por nombre exacto (copia) o None."""
+    registro = _indice(tipo)["por_nombre"].get(nombre)
+    return dict(registro) if registro else None
+
+
+def total(tipo):
+    return len(_indice(tipo)["claves"])
+
+
+def buscar_clientes(texto, limite=20):
+    return buscar("clientes", texto, limite)
+
+
+def buscar_proveedores(texto, limite=20):
+    return buscar("proveedores", texto, limite)
+
+
+def cliente(nombre):
+    return obtener("clientes", nombre)
+
+
+def proveedor(nombre):
+    return obtener("proveedores", nombre)
+
+
+# ============================
+# UI
+# ============================
+def selector(tipo, etiqueta, clave, seleccion=None, vacio=None, limite=20):
+    """Buscador + selectbox con los `limite` mejores resultados.
+    `seleccion` (p. ej. al editar) siempre figura entre las opciones;
+    `vacio` agrega una primera opción neutra ("-- Selecciona --", "Todos")."""
+    texto = st.text_input(f"🔎 Buscar {etiqueta.lower()}", key=f"{clave}_buscar")
+    opciones = buscar(tipo, texto, limite)
+    if seleccion and seleccion not in opciones:
+        opciones = [seleccion] + opciones
+    if vacio is not None:
+        opciones = [vacio] + opciones
+    indice = opciones.index(seleccion) if seleccion in opciones else 0
+    return st.selectbox(etiqueta, opciones, index=indice, key=clave) if opciones else None
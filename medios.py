@@ -0,0 +1,178 @@
+# medios.py
+# Ingreso de fotos (evidencias, inspecciones TPM, SMED, 5S).
+# Cada foto se guarda una sola vez por contenido (hash SHA-256): un maestro
+# JPEG con el lado mayor acotado y una miniatura WebP para las galerías.
+# La ruta se conoce apenas se sube la foto; la recodificación corre en un
+# pool de hilos y mientras tanto se sirve el archivo original pendiente.
+import glob
+import hashlib
+import io
+import os
+import threading
+from concurrent.futures import ThreadPoolExecutor
+
+from PIL import Image, ImageOps
+
+CARPETA_MEDIOS = "files/medios"
+MAX_LADO = 1920           # maestro: lado mayor en px
+CALIDAD_MAESTRO = 85
+LADO_MINIATURA = 320
+CALIDAD_MINIATURA = 70
+MAX_HILOS = 2
+
+_lock = threading.Lock()
+_en_curso = {}            # hash -> Future
+_pool = None
+
+
+def _ejecutor():
+    global _pool
+    with _lock:
+        if _pool is None:
+            _pool = ThreadPoolExecutor(max_workers=MAX_HILOS, thread_name_prefix="medios")
+        return _pool
+
+
+# ============================
+# Rutas
+# ============================
+def huella(datos):
+    return hashlib.sha256(datos).hexdigest()[:32]
+
+
+def _carpeta(h):
+    return os.path.join(CARPETA_MEDIOS, h[:2])
+
+
+def ruta_maestro(h):
+    return os.path.join(_carpeta(h), f"{h}.jpg")
+
+
+def ruta_miniatura(h):
+    return os.path.join(_carpeta(h), f"{h}_min.webp")
+
+
+def _ruta_pendiente(h, formato=None):
+    """Original subido, hasta que se termine de recodificar. Conserva su
+    extensión (jpeg, png...) para poder mostrarse mientras tanto."""
+    if formato:
+        return os.path.join(_carpeta(h), f"{h}_original.{formato.lower()}")
+    return next(iter(glob.glob(os.path.join(_carpeta(h), f"{h}_original.*"))), None)
+
+
+def _huella_de_ruta(ruta):
+    """Hash si la ruta es un maestro de este módulo, si no None."""
+    nombre = os.path.basename(str(ruta or ""))
+    h = nombre[:-4] if nombre.endswith(".jpg") else ""
+    return h if len(h) == 32 and os.path.dirname(os.path.normpath(ruta)) == os.path.normpath(_carpeta(h)) else None
+
+
+# ============================
+# Codificación
+# ============================
+def _escribir(img, destino, formato, calidad):
+    temporal = f"{destino}.tmp"
+    img.save(temporal, formato, quality=calidad)
+    os.replace(temporal, destino)
+
+
+def _a_rgb(img):
+    if img.mode in ("RGBA", "LA", "P"):
+        img = img.convert("RGBA")
+        fondo = Image.new("RGB", img.size, "white")
+        fondo.paste(img, mask=img.getchannel("A"))
+        return fondo
+    return img.convert("RGB")
+
+
+def _codificar(origen, maestro, miniatura):
+    with Image.open(origen) as img:
+        img = _a_rgb(ImageOps.exif_transpose(img))
+        if maestro:
+            grande = img.copy()
+            grande.thumbnail((MAX_LADO, MAX_LADO))
+            _escribir(grande, maestro, "JPEG", CALIDAD_MAESTRO)
+        img.thumbnail((LADO_MINIATURA, LADO_MINIATURA))
+        _escribir(img, miniatura, "WEBP", CALIDAD_MINIATURA)
+
+
+def _procesar(h):
+    pendiente = _ruta_pendiente(h)
+    try:
+        _codificar(pendiente, ruta_maestro(h), ruta_miniatura(h))
+        os.remove(pendiente)
+    finally:
+        with _lock:
+            _en_curso.pop(h, None)
+
+
+# ============================
+# API pública
+# ============================
+def guardar(archivo, esperar=False):
+    """Guarda una foto (UploadedFile, bytes o ruta) y devuelve la ruta de su
+    maestro. Si la misma foto ya existe no se vuelve a procesar.
+    Lanza PIL.UnidentifiedImageError si el archivo no es una imagen.
+    Con esperar=False la recodificación queda en segundo plano."""
+    if isinstance(archivo, (bytes, bytearray)):
+        datos = bytes(archivo)
+    elif isinstance(archivo, (str, os.PathLike)):
+        with open(archivo, "rb") as f:
+            datos = f.read()
+    else:
+        datos = archivo.getvalue()
+
+    with Image.open(io.BytesIO(datos)) as img:
+        formato = img.format or "img"  # solo lee la cabecera: falla aquí si no es una imagen
+
+    h = huella(datos)
+    maestro = ruta_maestro(h)
+    pool = _ejecutor()
+    with _lock:
+        futuro = _en_curso.get(h)
+        if futuro is None and not os.path.exists(maestro):
+            os.makedirs(_carpeta(h), exist_ok=True)
+            with open(_ruta_pendiente(h, formato), "wb") as f:
+                f.write(datos)
+            futuro = _en_curso[h] = pool.submit(_procesar, h)
+    if futuro is not None and esperar:
+        futuro.result()
+    return maestro
+
+
+def ruta_para_mostrar(ruta, miniatura=True):
+    """Archivo a mostrar para una foto guardada (None si no existe).
+    Maestros de este módulo: la miniatura o el maestro; si aún se están
+    procesando, el original pendiente. Fotos anteriores al pipeline: la
+    ruta tal cual, y su miniatura se genera en segundo plano para la próxima vez."""
+    if not ruta or not isinstance(ruta, (str, os.PathLike)):
+        return None  # sin foto (None / NaN en los DataFrames)
+    h = _huella_de_ruta(ruta)
+    if h:
+        candidatos = ([ruta_miniatura(h)] if miniatura else []) + [ruta_maestro(h), _ruta_pendiente(h)]
+        return next((c for c in candidatos if c and os.path.exists(c)), None)
+
+    if not os.path.exists(ruta):
+        return None
+    if not miniatura:
+        return ruta
+    info = os.stat(ruta)
+    clave = huella(f"{os.path.abspath(ruta)}|{info.st_mtime_ns}|{info.st_size}".encode("utf-8"))
+    destino = os.path.join(CARPETA_MEDIOS, "legado", f"{clave}_min.webp")
+    if os.path.exists(destino):
+        return destino
+    pool = _ejecutor()
+    with _lock:
+        if clave not in _en_curso:
+            os.makedirs(os.path.dirname(destino), exist_ok=True)
+            _en_curso[clave] = pool.submit(_miniatura_legado, clave, ruta, destino)
+    return ruta
+
+
+def _miniatura_legado(clave, ruta, destino):
+    try:
+        _codificar(ruta, None, destino)
+    finally:
+        with _lock:
+            _en_curso.pop(clave, None)
+
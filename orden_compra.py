@@ -1,6 +1,12 @@
 import os
 import json
 import sqlite3
+import conexion_db
+import tareas_fondo
+import cache_pdf
+import ordenes_items
+import correlativos
+import maestros
 import streamlit as st
 import pandas as pd
 from datetime import date, datetime
@@ -16,7 +22,6 @@ def mostrar_orden_compra():
     # ----------------------
     DB_ORDENES = "ordenes_compra.db"
     DB_CONFIG = "configuracion.db"
-    DB_COMPRAS = "compras.db"
     CODIGOS_FILE = "codigos_autorizacion.json"
 
     # ----------------------
@@ -38,7 +43,7 @@ def mostrar_orden_compra():
     # Utilidades de BD
     # ----------------------
     def ensure_db():
-        conn = sqlite3.connect(DB_ORDENES)
+        conn = conexion_db.conectar(DB_ORDENES)
         c = conn.cursor()
         c.execute("""
             CREATE TABLE IF NOT EXISTS ordenes_compra (
@@ -67,9 +72,10 @@ def mostrar_orden_compra():
         """)
         conn.commit()
         conn.close()
+        ordenes_items.init_items("OC")
 
     def get_config_empresa():
-        conn = sqlite3.connect(DB_CONFIG)
+        conn = conexion_db.conectar(DB_CONFIG)
         c = conn.cursor()
         c.execute("SELECT empresa, ruc, direccion FROM configuracion ORDER BY id DESC LIMIT 1")
         row = c.fetchone()
@@ -78,40 +84,12 @@ def mostrar_orden_compra():
             return {"empresa": row[0], "ruc": row[1], "direccion": row[2]}
         return {"empresa": "", "ruc": "", "direccion": ""}
 
-    def get_proveedores():
-        conn = sqlite3.connect(DB_COMPRAS)
-        conn.row_factory = sqlite3.Row
-        c = conn.cursor()
-        c.execute("SELECT * FROM proveedores ORDER BY proveedor ASC")
-        rows = c.fetchall()
-        conn.close()
-        return [dict(r) for r in rows]
-
-    def get_proveedor_by_name(name):
-        conn = sqlite3.connect(DB_COMPRAS)
-        conn.row_factory = sqlite3.Row
-        c = conn.cursor()
-        c.execute("SELECT * FROM proveedores WHERE proveedor = ?", (name,))
-        row = c.fetchone()
-        conn.close()
-        return dict(row) if row else None
-
     def next_order_number():
-        conn = sqlite3.connect(DB_ORDENES)
-        c = conn.cursor()
-        c.execute("SELECT numero_oc FROM ordenes_compra ORDER BY id DESC LIMIT 1")
-        row = c.fetchone()
-        conn.close()
-        if not row or not row[0]:
-            return "0001"
-        try:
-            n = int(row[0])
-            return f"{n+1:04d}"
-        except:
-            return "0001"
+        # Solo para mostrar; el número definitivo se reserva al guardar
+        return correlativos.siguiente("OC")
 
     def save_order(data, edit_id=None):
-        conn = sqlite3.connect(DB_ORDENES)
+        conn = conexion_db.conectar(DB_ORDENES)
         c = conn.cursor()
         if edit_id:
             c.execute("""
@@ -124,11 +102,13 @@ def mostrar_orden_compra():
             """, (
                 data["numero_oc"], data["fecha"], data["empresa"], data["ruc_empresa"], data["direccion_empresa"],
                 data["proveedor"], data["ruc_proveedor"], data["direccion_proveedor"], data["telefono_proveedor"],
-                data["contacto_proveedor"], data["moneda"], data["cond_pago"], json.dumps(data["items"]),
+                data["contacto_proveedor"], data["moneda"], data["cond_pago"], None,
                 data["subtotal"], data["igv"], data["total"], data["fecha_entrega"], data["lugar_entrega"],
                 data["estado"], data.get("firma_gerente",""), edit_id
             ))
         else:
+            # Reserva atómica: dos usuarios guardando a la vez no repiten número
+            data["numero_oc"] = correlativos.reservar("OC")
             c.execute("""
                 INSERT INTO ordenes_compra (
                     numero_oc, fecha, empresa, ruc_empresa, direccion_empresa, proveedor, ruc_proveedor,
@@ -138,15 +118,23 @@ def mostrar_orden_compra():
             """, (
                 data["numero_oc"], data["fecha"], data["empresa"], data["ruc_empresa"], data["direccion_empresa"],
                 data["proveedor"], data["ruc_proveedor"], data["direccion_proveedor"], data["telefono_proveedor"],
-                data["contacto_proveedor"], data["moneda"], data["cond_pago"], json.dumps(data["items"]),
+                data["contacto_proveedor"], data["moneda"], data["cond_pago"], None,
                 data["subtotal"], data["igv"], data["total"], data["fecha_entrega"], data["lugar_entrega"],
                 data["estado"], data.get("firma_gerente","")
             ))
+        orden_id = edit_id or c.lastrowid
+        claves = ordenes_items.claves_precio(c, "OC", orden_id) if edit_id else set()
+        ordenes_items.guardar_items(c, "OC", orden_id, data["items"])
+        ordenes_items.recalcular_totales(c, "OC", orden_id)
+        if data["estado"] == "aprobada" or claves:
+            # Solo se tocan los pares (ítem, proveedor) de esta orden
+            ordenes_items.actualizar_precios(c, "OC", claves | ordenes_items.claves_precio(c, "OC", orden_id))
         conn.commit()
         conn.close()
+        return data["numero_oc"]
 
     def load_order(order_id):
-        conn = sqlite3.connect(DB_ORDENES)
+        conn = conexion_db.conectar(DB_ORDENES)
         conn.row_factory = sqlite3.Row
         c = conn.cursor()
         c.execute("SELECT * FROM ordenes_compra WHERE id=?", (order_id,))
@@ -155,16 +143,7 @@ def mostrar_orden_compra():
         return dict(row) if row else None
 
     def list_orders(estado=None):
-        conn = sqlite3.connect(DB_ORDENES)
-        conn.row_factory = sqlite3.Row
-        c = conn.cursor()
-        if estado:
-            c.execute("SELECT * FROM ordenes_compra WHERE estado=? ORDER BY id DESC", (estado,))
-        else:
-            c.execute("SELECT * FROM ordenes_compra ORDER BY id DESC")
-        rows = c.fetchall()
-        conn.close()
-        return [dict(r) for r in rows]
+        return ordenes_items.listar_ordenes("OC", estado)
 
     # ----------------------
     # PDF
@@ -226,7 +205,7 @@ def mostrar_orden_compra():
         story.append(Spacer(1, 8))
 
         # Items
-        items = json.loads(order["items"]) if isinstance(order["items"], str) else order["items"]
+        items = order["items"] if isinstance(order.get("items"), list) else ordenes_items.leer_items("OC", order["id"])
         items_data = [["ITEM", "DESCRIPCIÓN", "CANTIDAD", "PRECIO UNITARIO", "SUB TOTAL"]]
         for i, it in enumerate(items, 1):
             items_data.append([
@@ -290,6 +269,7 @@ def mostrar_orden_compra():
         story.append(Paragraph(nota, styles["Normal"]))
 
         doc.build(story)
+        return path_pdf
 
     # ----------------------
     # UI - Streamlit
@@ -304,8 +284,6 @@ def mostrar_orden_compra():
         st.session_state["editing_id"] = None
 
     empresa_cfg = get_config_empresa()
-    proveedores = get_proveedores()
-    proveedor_names = ["-- Selecciona --"] + [p["proveedor"] for p in proveedores]
 
     col_form, col_right = st.columns([2,1], gap="large")
 
@@ -321,25 +299,41 @@ def mostrar_orden_compra():
                 "N° OC": o["numero_oc"],
                 "Fecha": o["fecha"],
                 "Proveedor": o["proveedor"],
+                "Ítems": o["n_items"],
                 "Total": o["total"],
                 "Estado": o["estado"]
             } for o in orders])
             st.dataframe(df_hist, use_container_width=True, hide_index=True)
+            with st.expander("🔎 Buscar por ítem"):
+                texto_item = st.text_input("Descripción del ítem", key="buscar_item_OC")
+                solo_pendientes = st.checkbox("Solo órdenes pendientes", key="item_pendientes_OC")
+                if texto_item:
+                    encontrados = ordenes_items.compras_por_item("OC", texto_item, "pendiente" if solo_pendientes else None)
+                    df_items = pd.DataFrame(encontrados, columns=["N° OC", "Fecha", "Proveedor", "Estado", "Ítems", "Cantidad", "Monto"])
+                    st.dataframe(df_items, use_container_width=True, hide_index=True)
+                    st.caption(f"Cantidad total: {df_items['Cantidad'].sum():,.2f} | Monto sin IGV: {df_items['Monto'].sum():,.2f}")
             # Botones por fila
             for o in orders:
                 c1, c2, c3 = st.columns(3)
                 with c1:
                     if st.button(f"📝 Editar {o['numero_oc']}", key=f"edit_{o['id']}"):
                         st.session_state["editing_id"] = o["id"]
-                        st.session_state["items"] = json.loads(o["items"]) if isinstance(o["items"], str) else o["items"]
+                        st.session_state["items"] = ordenes_items.leer_items("OC", o["id"])
                         st.rerun()
                 with c2:
-                    if st.button(f"📄 PDF {o['numero_oc']}", key=f"pdf_{o['id']}"):
-                        file_name = f"OC_{o['numero_oc']}_{o['proveedor'].replace(' ','_')}.pdf"
-                        export_pdf(o, file_name)
-                        st.success(f"PDF generado: {file_name}")
-                        with open(file_name, "rb") as f:
-                            st.download_button("⬇️ Descargar PDF", data=f, file_name=file_name, mime="application/pdf", key=f"dl_{o['id']}")
+                    file_name = f"OC_{o['numero_oc']}_{o['proveedor'].replace(' ','_')}.pdf"
+                    if cache_pdf.en_cache("OC", o["id"], o):
+                        # La orden no cambió desde la última vez: se sirve el PDF guardado,
+                        # leído recién al hacer clic (no en cada recarga de la lista)
+                        st.session_state.pop(f"tarea_pdf_{o['id']}", None)
+                        st.download_button(f"⬇️ PDF {o['numero_oc']}", data=lambda o=o: cache_pdf.obtener("OC", o["id"], o, export_pdf),
+                                           file_name=file_name, mime="application/pdf", key=f"dl_{o['id']}")
+                    elif st.button(f"📄 PDF {o['numero_oc']}", key=f"pdf_{o['id']}"):
+                        tareas_fondo.enviar_desde_ui(
+                            f"tarea_pdf_{o['id']}", cache_pdf.obtener, "OC", o["id"], o, export_pdf,
+                            nombre=f"PDF {o['numero_oc']}", archivo=file_name, mime="application/pdf"
+                        )
+                    tareas_fondo.panel_tarea(f"tarea_pdf_{o['id']}")
                 with c3:
                     st.write(f"Estado: **{o['estado']}**")
         else:
@@ -359,7 +353,7 @@ def mostrar_orden_compra():
             for o in pendientes:
                 if st.button(f"✅ Aprobar / Editar {o['numero_oc']}", key=f"ap_{o['id']}"):
                     st.session_state["editing_id"] = o["id"]
-                    st.session_state["items"] = json.loads(o["items"]) if isinstance(o["items"], str) else o["items"]
+                    st.session_state["items"] = ordenes_items.leer_items("OC", o["id"])
                     st.rerun()
         else:
             st.success("No hay órdenes pendientes.")
@@ -383,15 +377,11 @@ def mostrar_orden_compra():
 
         st.markdown("---")
         st.markdown("**Proveedor**")
-        default_idx = 0
-        if editing_order:
-            prov_sel_name = editing_order["proveedor"]
-            default_idx = proveedor_names.index(prov_sel_name) if prov_sel_name in proveedor_names else 0
-        prov_name = st.selectbox("Proveedor", proveedor_names, index=default_idx)
-
-        prov_data = None
-        if prov_name and prov_name != "-- Selecciona --":
-            prov_data = get_proveedor_by_name(prov_name)
+        prov_name = maestros.selector(
+            "proveedores", "Proveedor", "oc_proveedor",
+            seleccion=editing_order["proveedor"] if editing_order else None, vacio="-- Selecciona --"
+        )
+        prov_data = maestros.proveedor(prov_name)
 
         ruc_proveedor = st.text_input("RUC Proveedor", value=(editing_order["ruc_proveedor"] if editing_order else (prov_data["ruc"] if prov_data else "")), disabled=True)
         direccion_proveedor = st.text_area("Dirección Proveedor", value=(editing_order["direccion_proveedor"] if editing_order else (prov_data["direccion"] if prov_data else "")), height=70, disabled=True)
@@ -405,7 +395,7 @@ def mostrar_orden_compra():
 
         # Inicializar items si el editor lo necesita
         if editing_order and not st.session_state["items"]:
-            st.session_state["items"] = json.loads(editing_order["items"]) if isinstance(editing_order["items"], str) else editing_order["items"]
+            st.session_state["items"] = ordenes_items.leer_items("OC", editing_order["id"])
 
         # Botón para agregar ítem
         if st.button("➕ Agregar ítem"):
@@ -422,6 +412,12 @@ def mostrar_orden_compra():
                 punit = c3.number_input("Precio Unitario", min_value=0.0, value=float(item.get("precio_unitario",0.0)), step=0.1, format="%.2f", key=f"punit_{idx}")
                 if c4.button("🗑️ Eliminar", key=f"del_{idx}"):
                     to_delete.append(idx)
+                sugerencias = ordenes_items.sugerir_precios("OC", desc, prov_name)
+                if sugerencias:
+                    st.caption("💡 " + " · ".join(
+                        f"{prov}: último {ultimo:,.2f} ({fecha}), prom. {prom:,.2f}, mín {minimo:,.2f} / máx {maximo:,.2f}"
+                        for prov, ultimo, fecha, prom, minimo, maximo, _ in sugerencias
+                    ))
                 # actualizar en session
                 st.session_state["items"][idx] = {"descripcion": desc, "cantidad": cant, "precio_unitario": punit}
                 subtotal += cant * punit
@@ -488,8 +484,8 @@ def mostrar_orden_compra():
                     "estado": "pendiente",
                     "firma_gerente": ""
                 }
-                save_order(data, edit_id=st.session_state["editing_id"])
-                st.success("Orden guardada como pendiente.")
+                numero_guardado = save_order(data, edit_id=st.session_state["editing_id"])
+                st.success(f"Orden N° {numero_guardado} guardada como pendiente.")
                 st.session_state["items"] = []
                 st.session_state["editing_id"] = None
                 st.rerun()
@@ -522,8 +518,8 @@ def mostrar_orden_compra():
                         "estado": "aprobada",
                         "firma_gerente": firma_out
                     }
-                    save_order(data, edit_id=st.session_state["editing_id"])
-                    st.success("Orden aprobada y guardada.")
+                    numero_guardado = save_order(data, edit_id=st.session_state["editing_id"])
+                    st.success(f"Orden N° {numero_guardado} aprobada y guardada.")
                     st.session_state["items"] = []
                     st.session_state["editing_id"] = None
                     st.rerun()
@@ -1,19 +1,19 @@
 # compras.py
 import streamlit as st
-import sqlite3
+import conexion_db
 import os
 from datetime import datetime
 from PIL import Image
 import pandas as pd
-import sqlite3
 from streamlit_echarts import st_echarts
 import orden_compra
+import maestros
 
 
 DB_COMPRAS = "compras.db"
 
 def init_db():
-    conn = sqlite3.connect(DB_COMPRAS)
+    conn = conexion_db.conectar(DB_COMPRAS)
     c = conn.cursor()
 
     # Tabla proveedores
@@ -182,7 +182,7 @@ def mostrar_modulo_compras():
                     if codigo_autorizacion != "159":
                         st.error("❌ Código de autorización incorrecto.")
                     else:
-                        conn = sqlite3.connect(DB_COMPRAS)
+                        conn = conexion_db.conectar(DB_COMPRAS)
                         c = conn.cursor()
                         c.execute("""
                             INSERT INTO proveedores (
@@ -200,13 +200,14 @@ def mostrar_modulo_compras():
                         ))
                         conn.commit()
                         conn.close()
+                        maestros.invalidar("proveedores")
                         st.success("Proveedor guardado correctamente ✅")
 
         # ======== COLUMNA DERECHA: HISTORIAL Y KPIs ========
         with col2:
             st.subheader("📜 Historial de Proveedores")
             
-            conn = sqlite3.connect(DB_COMPRAS)
+            conn = conexion_db.conectar(DB_COMPRAS)
             df = pd.read_sql_query("SELECT * FROM proveedores", conn)
             conn.close()
 
@@ -272,7 +273,7 @@ def mostrar_modulo_compras():
 
     # --- TAB 3 ---
     with tab3:
-        conn = sqlite3.connect(DB_COMPRAS)
+        conn = conexion_db.conectar(DB_COMPRAS)
         c = conn.cursor()
         c.execute("SELECT id, proveedor_id, fecha, estado FROM ordenes_compra")
         ordenes = c.fetchall()
@@ -291,7 +292,7 @@ def mostrar_recepcion_materiales():
 
     tipo = st.selectbox("Seleccionar tipo de orden", ["Orden de Compra", "Orden de Servicio"])
 
-    conn = sqlite3.connect(DB_COMPRAS)
+    conn = conexion_db.conectar(DB_COMPRAS)
     c = conn.cursor()
     if tipo == "Orden de Compra":
         c.execute("SELECT id FROM ordenes_compra")
@@ -313,7 +314,7 @@ def mostrar_recepcion_materiales():
         nombre_firma = st.text_input("Nombre del receptor")
 
         if st.button("Registrar recepción"):
-            conn = sqlite3.connect(DB_COMPRAS)
+            conn = conexion_db.conectar(DB_COMPRAS)
             c = conn.cursor()
             c.execute("""
                 INSERT INTO recepcion (tipo, orden_id, fecha, checklist, foto, firma, nombre_firma)
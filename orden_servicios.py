@@ -1,6 +1,6 @@
 # servicios.py
 import streamlit as st
-import sqlite3
+import conexion_db
 import pandas as pd
 from streamlit_echarts import st_echarts
 from datetime import datetime
@@ -9,7 +9,7 @@ DB_SERVICIOS = "orden_servicios.db"
 
 # ---------------------- BASE DE DATOS ----------------------
 def init_db():
-    conn = sqlite3.connect(DB_SERVICIOS)
+    conn = conexion_db.conectar(DB_SERVICIOS)
     c = conn.cursor()
 
     # Tabla proveedores de servicios
@@ -91,7 +91,7 @@ def mostrar_modulo_servicios():
                     if codigo_autorizacion != "159":
                         st.error("❌ Código de autorización incorrecto.")
                     else:
-                        conn = sqlite3.connect(DB_SERVICIOS)
+                        conn = conexion_db.conectar(DB_SERVICIOS)
                         c = conn.cursor()
                         c.execute("""
                             INSERT INTO proveedores_servicio (
@@ -110,7 +110,7 @@ def mostrar_modulo_servicios():
         with col2:
             st.subheader("📜 Historial de Proveedores")
             
-            conn = sqlite3.connect(DB_SERVICIOS)
+            conn = conexion_db.conectar(DB_SERVICIOS)
             df = pd.read_sql_query("SELECT * FROM proveedores_servicio", conn)
             conn.close()
 
@@ -180,7 +180,7 @@ def mostrar_modulo_servicios():
     # ---------------- TAB 2: Estado de Órdenes ----------------
     with tab2:
         st.subheader("📂 Estado de Órdenes de Servicio")
-        conn = sqlite3.connect(DB_SERVICIOS)
+        conn = conexion_db.conectar(DB_SERVICIOS)
         df = pd.read_sql_query("""
             SELECT os.id, ps.proveedor, os.nro_orden, os.fecha, os.servicio_detalle, os.estado
             FROM ordenes_servicio os
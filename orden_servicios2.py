@@ -2,6 +2,12 @@
 import os
 import json
 import sqlite3
+import conexion_db
+import tareas_fondo
+import cache_pdf
+import ordenes_items
+import correlativos
+import maestros
 import streamlit as st
 import pandas as pd
 from datetime import date, datetime
@@ -16,7 +22,6 @@ def mostrar_orden_servicio():
     # ----------------------
     DB_ORDENES = "orden_servicios.db"
     DB_CONFIG = "configuracion.db"
-    DB_COMPRAS = "compras.db"
     CODIGOS_FILE = "codigos_autorizacion.json"
 
     # ----------------------
@@ -38,7 +43,7 @@ def mostrar_orden_servicio():
     # Utilidades de BD
     # ----------------------
     def ensure_db():
-        conn = sqlite3.connect(DB_ORDENES)
+        conn = conexion_db.conectar(DB_ORDENES)
         c = conn.cursor()
         c.execute("""
             CREATE TABLE IF NOT EXISTS ordenes_servicio (
@@ -74,9 +79,10 @@ def mostrar_orden_servicio():
 
         conn.commit()
         conn.close()
+        ordenes_items.init_items("OS")
 
     def get_config_empresa():
-        conn = sqlite3.connect(DB_CONFIG)
+        conn = conexion_db.conectar(DB_CONFIG)
         c = conn.cursor()
         c.execute("SELECT empresa, ruc, direccion FROM configuracion ORDER BY id DESC LIMIT 1")
         row = c.fetchone()
@@ -85,40 +91,12 @@ def mostrar_orden_servicio():
             return {"empresa": row[0], "ruc": row[1], "direccion": row[2]}
         return {"empresa": "", "ruc": "", "direccion": ""}
 
-    def get_proveedores():
-        conn = sqlite3.connect(DB_COMPRAS)
-        conn.row_factory = sqlite3.Row
-        c = conn.cursor()
-        c.execute("SELECT * FROM proveedores ORDER BY proveedor ASC")
-        rows = c.fetchall()
-        conn.close()
-        return [dict(r) for r in rows]
-
-    def get_proveedor_by_name(name):
-        conn = sqlite3.connect(DB_COMPRAS)
-        conn.row_factory = sqlite3.Row
-        c = conn.cursor()
-        c.execute("SELECT * FROM proveedores WHERE proveedor = ?", (name,))
-        row = c.fetchone()
-        conn.close()
-        return dict(row) if row else None
-
     def next_order_number():
-        conn = sqlite3.connect(DB_ORDENES)
-        c = conn.cursor()
-        c.execute("SELECT numero_os FROM ordenes_servicio ORDER BY id DESC LIMIT 1")
-        row = c.fetchone()
-        conn.close()
-        if not row or not row[0]:
-            return "0001"
-        try:
-            n = int(row[0])
-            return f"{n+1:04d}"
-        except:
-            return "0001"
+        # Solo para mostrar; el número definitivo se reserva al guardar
+        return correlativos.siguiente("OS")
 
     def save_order(data, edit_id=None):
-        conn = sqlite3.connect(DB_ORDENES)
+        conn = conexion_db.conectar(DB_ORDENES)
         c = conn.cursor()
         if edit_id:
             c.execute("""
@@ -131,11 +109,13 @@ def mostrar_orden_servicio():
             """, (
                 data["numero_os"], data["fecha"], data["empresa"], data["ruc_empresa"], data["direccion_empresa"],
                 data["proveedor"], data["ruc_proveedor"], data["direccion_proveedor"], data["telefono_proveedor"],
-                data["contacto_proveedor"], data["moneda"], data["cond_pago"], json.dumps(data["items"]),
+                data["contacto_proveedor"], data["moneda"], data["cond_pago"], None,
                 data["subtotal"], data["igv"], data["total"], data["fecha_entrega"], data["lugar_entrega"],
                 data["estado"], data.get("firma_gerente",""), edit_id
             ))
         else:
+            # Reserva atómica: dos usuarios guardando a la vez no repiten número
+            data["numero_os"] = correlativos.reservar("OS")
             c.execute("""
                 INSERT INTO ordenes_servicio (
                     numero_os, fecha, empresa, ruc_empresa, direccion_empresa, proveedor, ruc_proveedor,
@@ -145,15 +125,19 @@ def mostrar_orden_servicio():
             """, (
                 data["numero_os"], data["fecha"], data["empresa"], data["ruc_empresa"], data["direccion_empresa"],
                 data["proveedor"], data["ruc_proveedor"], data["direccion_proveedor"], data["telefono_proveedor"],
-                data["contacto_proveedor"], data["moneda"], data["cond_pago"], json.dumps(data["items"]),
+                data["contacto_proveedor"], data["moneda"], data["cond_pago"], None,
                 data["subtotal"], data["igv"], data["total"], data["fecha_entrega"], data["lugar_entrega"],
                 data["estado"], data.get("firma_gerente","")
             ))
+        orden_id = edit_id or c.lastrowid
+        ordenes_items.guardar_items(c, "OS", orden_id, data["items"])
+        ordenes_items.recalcular_totales(c, "OS", orden_id)
         conn.commit()
         conn.close()
+        return data["numero_os"]
 
     def load_order(order_id):
-        conn = sqlite3.connect(DB_ORDENES)
+        conn = conexion_db.conectar(DB_ORDENES)
         conn.row_factory = sqlite3.Row
         c = conn.cursor()
         c.execute("SELECT * FROM ordenes_servicio WHERE id=?", (order_id,))
@@ -162,16 +146,7 @@ def mostrar_orden_servicio():
         return dict(row) if row else None
 
     def list_orders(estado=None):
-        conn = sqlite3.connect(DB_ORDENES)
-        conn.row_factory = sqlite3.Row
-        c = conn.cursor()
-        if estado:
-            c.execute("SELECT * FROM ordenes_servicio WHERE estado=? ORDER BY id DESC", (estado,))
-        else:
-            c.execute("SELECT * FROM ordenes_servicio ORDER BY id DESC")
-        rows = c.fetchall()
-        conn.close()
-        return [dict(r) for r in rows]
+        return ordenes_items.listar_ordenes("OS", estado)
 
     # ----------------------
     # PDF
@@ -220,7 +195,7 @@ def mostrar_orden_servicio():
         story.append(Spacer(1, 8))
 
         # Items con Número de OP
-        items = json.loads(order["items"]) if isinstance(order["items"], str) else order["items"]
+        items = order["items"] if isinstance(order.get("items"), list) else ordenes_items.leer_items("OS", order["id"])
         items_data = [["ITEM", "N° OP", "DESCRIPCIÓN", "CANTIDAD", "PRECIO UNITARIO", "SUB TOTAL"]]
         for i, it in enumerate(items, 1):
             cantidad = float(it.get('cantidad', 0) or 0)
@@ -285,6 +260,7 @@ def mostrar_orden_servicio():
         story.append(Paragraph(nota, styles["Normal"]))
 
         doc.build(story)
+        return path_pdf
 
     # ----------------------
     # UI - Streamlit
@@ -298,8 +274,6 @@ def mostrar_orden_servicio():
         st.session_state["editing_id"] = None
 
     empresa_cfg = get_config_empresa()
-    proveedores = get_proveedores()
-    proveedor_names = ["-- Selecciona --"] + [p["proveedor"] for p in proveedores]
 
     col_form, col_right = st.columns([2,1], gap="large")
 
@@ -315,10 +289,19 @@ def mostrar_orden_servicio():
                 "N° OS": o["numero_os"],
                 "Fecha": o["fecha"],
                 "Proveedor": o["proveedor"],
+                "Ítems": o["n_items"],
                 "Total": o["total"],
                 "Estado": o["estado"]
             } for o in orders])
             st.dataframe(df_hist, use_container_width=True, hide_index=True)
+            with st.expander("🔎 Buscar por ítem"):
+                texto_item = st.text_input("Descripción del ítem", key="buscar_item_OS")
+                solo_pendientes = st.checkbox("Solo órdenes pendientes", key="item_pendientes_OS")
+                if texto_item:
+                    encontrados = ordenes_items.compras_por_item("OS", texto_item, "pendiente" if solo_pendientes else None)
+                    df_items = pd.DataFrame(encontrados, columns=["N° OS", "Fecha", "Proveedor", "Estado", "Ítems", "Cantidad", "Monto"])
+                    st.dataframe(df_items, use_container_width=True, hide_index=True)
+                    st.caption(f"Cantidad total: {df_items['Cantidad'].sum():,.2f} | Monto sin IGV: {df_items['Monto'].sum():,.2f}")
 
             # Acciones por fila
             for o in orders:
@@ -326,15 +309,22 @@ def mostrar_orden_servicio():
                 with c1:
                     if st.button(f"📝 Editar {o['numero_os']}", key=f"edit_{o['id']}"):
                         st.session_state["editing_id"] = o["id"]
-                        st.session_state["items"] = json.loads(o["items"]) if isinstance(o["items"], str) else o["items"]
+                        st.session_state["items"] = ordenes_items.leer_items("OS", o["id"])
                         st.rerun()
                 with c2:
-                    if st.button(f"📄 PDF {o['numero_os']}", key=f"pdf_{o['id']}"):
-                        file_name = f"OS_{o['numero_os']}_{o['proveedor'].replace(' ','_')}.pdf"
-                        export_pdf(o, file_name)
-                        st.success(f"PDF generado: {file_name}")
-                        with open(file_name, "rb") as f:
-                            st.download_button("⬇️ Descargar PDF", data=f, file_name=file_name, mime="application/pdf", key=f"dl_{o['id']}")
+                    file_name = f"OS_{o['numero_os']}_{o['proveedor'].replace(' ','_')}.pdf"
+                    if cache_pdf.en_cache("OS", o["id"], o):
+                        # La orden no cambió desde la última vez: se sirve el PDF guardado,
+                        # leído recién al hacer clic (no en cada recarga de la lista)
+                        st.session_state.pop(f"tarea_pdf_{o['id']}", None)
+                        st.download_button(f"⬇️ PDF {o['numero_os']}", data=lambda o=o: cache_pdf.obtener("OS", o["id"], o, export_pdf),
+                                           file_name=file_name, mime="application/pdf", key=f"dl_{o['id']}")
+                    elif st.button(f"📄 PDF {o['numero_os']}", key=f"pdf_{o['id']}"):
+                        tareas_fondo.enviar_desde_ui(
+                            f"tarea_pdf_{o['id']}", cache_pdf.obtener, "OS", o["id"], o, export_pdf,
+                            nombre=f"PDF {o['numero_os']}", archivo=file_name, mime="application/pdf"
+                        )
+                    tareas_fondo.panel_tarea(f"tarea_pdf_{o['id']}")
                 with c3:
                     st.write(f"Estado: **{o['estado']}**")
         else:
@@ -354,7 +344,7 @@ def mostrar_orden_servicio():
             for o in pendientes:
                 if st.button(f"✅ Aprobar / Editar {o['numero_os']}", key=f"ap_{o['id']}"):
                     st.session_state["editing_id"] = o["id"]
-                    st.session_state["items"] = json.loads(o["items"]) if isinstance(o["items"], str) else o["items"]
+                    st.session_state["items"] = ordenes_items.leer_items("OS", o["id"])
                     st.rerun()
         else:
             st.success("No hay órdenes pendientes.")
@@ -383,15 +373,11 @@ def mostrar_orden_servicio():
 
         st.markdown("---")
         st.markdown("**Proveedor**")
-        default_idx = 0
-        if editing_order:
-            prov_sel_name = editing_order["proveedor"]
-            default_idx = proveedor_names.index(prov_sel_name) if prov_sel_name in proveedor_names else 0
-        prov_name = st.selectbox("Proveedor", proveedor_names, index=default_idx, key="proveedor_orden")
-
-        prov_data = None
-        if prov_name and prov_name != "-- Selecciona --":
-            prov_data = get_proveedor_by_name(prov_name)
+        prov_name = maestros.selector(
+            "proveedores", "Proveedor", "proveedor_orden",
+            seleccion=editing_order["proveedor"] if editing_order else None, vacio="-- Selecciona --"
+        )
+        prov_data = maestros.proveedor(prov_name)
 
         ruc_proveedor = st.text_input("RUC Proveedor", value=(editing_order["ruc_proveedor"] if editing_order else (prov_data["ruc"] if prov_data else "")), disabled=True,key="_input")
         direccion_proveedor = st.text_area("Dirección Proveedor", value=(editing_order["direccion_proveedor"] if editing_order else (prov_data["direccion"] if prov_data else "")), height=70, disabled=True, key="ra_input")
@@ -406,7 +392,7 @@ def mostrar_orden_servicio():
 
         # Inicializar items si el editor lo necesita
         if editing_order and not st.session_state["items"]:
-            st.session_state["items"] = json.loads(editing_order["items"]) if isinstance(editing_order["items"], str) else editing_order["items"]
+            st.session_state["items"] = ordenes_items.leer_items("OS", editing_order["id"])
 
         # Botón para agregar ítem - AHORA con N° OP primero
         if st.button("➕ Agregar ítem", key="agregar_item"):
@@ -503,8 +489,8 @@ def mostrar_orden_servicio():
                 "estado": "pendiente",
                 "firma_gerente": ""
             }
-            save_order(data, edit_id=st.session_state["editing_id"])
-            st.success("Orden guardada como pendiente.")
+            numero_guardado = save_order(data, edit_id=st.session_state["editing_id"])
+            st.success(f"Orden N° {numero_guardado} guardada como pendiente.")
             st.session_state["items"] = []
             st.session_state["editing_id"] = None
             st.rerun()
@@ -537,8 +523,8 @@ def mostrar_orden_servicio():
                     "estado": "aprobada",
                     "firma_gerente": firma_out
                 }
-                save_order(data, edit_id=st.session_state["editing_id"])
-                st.success("Orden aprobada y guardada.")
+                numero_guardado = save_order(data, edit_id=st.session_state["editing_id"])
+                st.success(f"Orden N° {numero_guardado} aprobada y guardada.")
                 st.session_state["items"] = []
                 st.session_state["editing_id"] = None
                 st.rerun()
@@ -0,0 +1,303 @@
+# ordenes_items.py
+# Ítems de Órdenes de Compra (OC) y de Servicio (OS) en tabla propia.
+# Antes cada orden guardaba sus ítems como JSON en la columna `items`;
+# ahora cada ítem es una fila indexada, los totales salen de SQL y se
+# puede consultar qué se compró sin decodificar todas las órdenes.
+import json
+import sqlite3
+
+import conexion_db
+
+# tipo -> (base de datos, tabla de órdenes, tabla de ítems, columna del número)
+TABLAS = {
+    "OC": ("ordenes_compra.db", "ordenes_compra", "oc_items", "numero_oc"),
+    "OS": ("orden_servicios.db", "ordenes_servicio", "os_items", "numero_os"),
+}
+
+IGV = 0.18
+
+# Historial de precios materializado: (ítem, proveedor) -> último, promedio, mín, máx
+TABLAS_PRECIOS = {"OC": "oc_precios", "OS": "os_precios"}
+
+
+# ============================
+# Conexión y esquema
+# ============================
+def get_conn(tipo):
+    conn = conexion_db.conectar(TABLAS[tipo][0])
+    conn.execute("PRAGMA foreign_keys = ON;")
+    return conn
+
+
+def init_items(tipo):
+    """Crea la tabla de ítems y sus índices y migra los JSON pendientes."""
+    _, ordenes, items, _ = TABLAS[tipo]
+    conn = get_conn(tipo)
+    c = conn.cursor()
+    c.execute(f"""
+        CREATE TABLE IF NOT EXISTS {items} (
+            id INTEGER PRIMARY KEY AUTOINCREMENT,
+            orden_id INTEGER NOT NULL REFERENCES {ordenes}(id) ON DELETE CASCADE,
+            linea INTEGER NOT NULL,
+            numero_op TEXT,
+            descripcion TEXT,
+            cantidad REAL NOT NULL DEFAULT 0,
+            precio_unitario REAL NOT NULL DEFAULT 0
+        )
+    """)
+    c.execute(f"CREATE UNIQUE INDEX IF NOT EXISTS idx_{items}_orden ON {items}(orden_id, linea)")
+    c.execute(f"CREATE INDEX IF NOT EXISTS idx_{items}_descripcion ON {items}(descripcion COLLATE NOCASE)")
+    c.execute(f"CREATE INDEX IF NOT EXISTS idx_{items}_op ON {items}(numero_op)")
+    c.execute(f"PRAGMA table_info({ordenes})")
+    if "proveedor" in [col[1] for col in c.fetchall()]:  # la tabla antigua de orden_servicios.py no la tiene
+        c.execute(f"CREATE INDEX IF NOT EXISTS idx_{ordenes}_proveedor ON {ordenes}(proveedor, estado)")
+    precios = TABLAS_PRECIOS[tipo]
+    c.execute("SELECT 1 FROM sqlite_master WHERE type = 'table' AND name = ?", (precios,))
+    precios_nueva = c.fetchone() is None
+    c.execute(f"""
+        CREATE TABLE IF NOT EXISTS {precios} (
+            item TEXT NOT NULL COLLATE NOCASE,
+            proveedor TEXT NOT NULL,
+            ultimo_precio REAL,
+            ultima_fecha TEXT,
+            promedio REAL,
+            minimo REAL,
+            maximo REAL,
+            compras INTEGER,
+            PRIMARY KEY (item, proveedor)
+        ) WITHOUT ROWID
+    """)
+    conn.commit()
+    conn.close()
+
+    migrar_json(tipo)
+    if precios_nueva:
+        reconstruir_precios(tipo)
+
+
+def migrar_json(tipo):
+    """Pasa a filas los ítems que aún están como JSON en la columna `items`
+    y deja esa columna en NULL; las órdenes ya migradas no se vuelven a leer."""
+    _, ordenes, _, _ = TABLAS[tipo]
+    conn = get_conn(tipo)
+    c = conn.cursor()
+    c.execute(f"PRAGMA table_info({ordenes})")
+    if "items" not in [col[1] for col in c.fetchall()]:
+        conn.close()
+        return 0
+
+    c.execute(f"SELECT id, items FROM {ordenes} WHERE items IS NOT NULL")
+    pendientes = c.fetchall()
+    for orden_id, texto in pendientes:
+        try:
+            lista = json.loads(texto) if texto else []
+        except ValueError:
+            continue  # JSON dañado: se deja intacto para revisarlo a mano
+        guardar_items(c, tipo, orden_id, lista)
+        c.execute(f"UPDATE {ordenes} SET items = NULL WHERE id = ?", (orden_id,))
+    conn.commit()
+    conn.close()
+    return len(pendientes)
+
+
+# ============================
+# Lectura y escritura
+# ============================
+def guardar_items(c, tipo, orden_id, lista):
+    """Reemplaza los ítems de la orden dentro de la transacción del cursor c."""
+    items = TABLAS[tipo][2]
+    c.execute(f"DELETE FROM {items} WHERE orden_id = ?", (orden_id,))
+    c.executemany(f"""
+        INSERT INTO {items} (orden_id, linea, numero_op, descripcion, cantidad, precio_unitario)
+        VALUES (?, ?, ?, ?, ?, ?)
+    """, [
+        (orden_id, linea, it.get("numero_op"), (it.get("descripcion") or "").strip(),
+         float(it.get("cantidad", 0) or 0), float(it.get("precio_unitario", 0) or 0))
+        for linea, it in enumerate(lista, 1)
+    ])
+
+
+def recalcular_totales(c, tipo, orden_id):
+    """Subtotal, IGV y total de la orden a partir de sus ítems."""
+    _, ordenes, items, _ = TABLAS[tipo]
+    c.execute(f"""
+        UPDATE {ordenes}
+        SET subtotal = t.subtotal, igv = ROUND(t.subtotal * {IGV}, 2), total = ROUND(t.subtotal * {1 + IGV}, 2)
+        FROM (SELECT COALESCE(SUM(cantidad * precio_unitario), 0) AS subtotal
+              FROM {items} WHERE orden_id = ?) AS t
+        WHERE id = ?
+    """, (orden_id, orden_id))
+
+
+def leer_items(tipo, orden_id):
+    """Ítems de la orden en el mismo formato de dict que usaba el JSON."""
+    items = TABLAS[tipo][2]
+    conn = get_conn(tipo)
+    c = conn.cursor()
+    c.execute(f"""
+        SELECT numero_op, descripcion, cantidad, precio_unitario
+        FROM {items} WHERE orden_id = ? ORDER BY linea
+    """, (orden_id,))
+    filas = c.fetchall()
+    conn.close()
+    resultado = []
+    for numero_op, descripcion, cantidad, precio in filas:
+        item = {"descripcion": descripcion, "cantidad": cantidad, "precio_unitario": precio}
+        if tipo == "OS":
+            item = {"numero_op": numero_op or "", **item}
+        resultado.append(item)
+    return resultado
+
+
+def listar_ordenes(tipo, estado=None):
+    """Órdenes con el resumen de sus ítems calculado en SQL.
+    `items_huella` resume el contenido de los ítems (sirve como clave de caché)."""
+    _, ordenes, items, _ = TABLAS[tipo]
+    conn = get_conn(tipo)
+    conn.row_factory = sqlite3.Row
+    c = conn.cursor()
+    filtro = "WHERE o.estado = ?" if estado else ""
+    c.execute(f"""
+        SELECT o.*,
+               COUNT(i.id) AS n_items,
+               ROUND(COALESCE(SUM(i.cantidad * i.precio_unitario), 0), 2) AS subtotal_items,
+               group_concat(i.linea || '|' || COALESCE(i.numero_op, '') || '|' || i.descripcion
+                            || '|' || i.cantidad || '|' || i.precio_unitario, char(10)) AS items_huella
+        FROM {ordenes} o
+        LEFT JOIN {items} i ON i.orden_id = o.id
+        {filtro}
+        GROUP BY o.id
+        ORDER BY o.id DESC
+    """, (estado,) if estado else ())
+    filas = [dict(r) for r in c.fetchall()]
+    conn.close()
+    return filas
+
+
+# ============================
+# Historial de precios
+# ============================
+def claves_precio(c, tipo, orden_id):
+    """Pares (ítem, proveedor) de la orden, para refrescar solo esas filas."""
+    _, ordenes, items, _ = TABLAS[tipo]
+    c.execute(f"""
+        SELECT DISTINCT trim(i.descripcion), o.proveedor
+        FROM {items} i JOIN {ordenes} o ON o.id = i.orden_id
+        WHERE i.orden_id = ? AND trim(i.descripcion) != ''
+    """, (orden_id,))
+    return set(c.fetchall())
+
+
+def actualizar_precios(c, tipo, claves):
+    """Recalcula el historial de los pares (ítem, proveedor) indicados
+    a partir de las órdenes aprobadas; cada par es una búsqueda indexada."""
+    _, ordenes, items, _ = TABLAS[tipo]
+    precios = TABLAS_PRECIOS[tipo]
+    for item, proveedor in claves:
+        c.execute(f"""
+            SELECT i.precio_unitario, o.fecha, AVG(i.precio_unitario) OVER (), MIN(i.precio_unitario) OVER (),
+                   MAX(i.precio_unitario) OVER (), COUNT(*) OVER ()
+            FROM {items} i JOIN {ordenes} o ON o.id = i.orden_id
+            WHERE i.descripcion = ? COLLATE NOCASE AND o.proveedor = ? AND o.estado = 'aprobada'
+            ORDER BY o.fecha DESC, o.id DESC
+            LIMIT 1
+        """, (item, proveedor))
+        fila = c.fetchone()
+        if fila is None:
+            c.execute(f"DELETE FROM {precios} WHERE item = ? AND proveedor = ?", (item, proveedor))
+            continue
+        ultimo, fecha, promedio, minimo, maximo, compras = fila
+        c.execute(f"""
+            INSERT INTO {precios} (item, proveedor, ultimo_precio, ultima_fecha, promedio, minimo, maximo, compras)
+            VALUES (?, ?, ?, ?, ?, ?, ?, ?)
+            ON CONFLICT(item, proveedor) DO UPDATE SET
+                ultimo_precio = excluded.ultimo_precio, ultima_fecha = excluded.ultima_fecha,
+                promedio = excluded.promedio, minimo = excluded.minimo,
+                maximo = excluded.maximo, compras = excluded.compras
+        """, (item, proveedor, ultimo, fecha, round(promedio, 4), minimo, maximo, compras))
+
+
+def reconstruir_precios(tipo):
+    """Rehace todo el historial de precios (solo la primera vez o a pedido)."""
+    _, ordenes, items, _ = TABLAS[tipo]
+    conn = get_conn(tipo)
+    c = conn.cursor()
+    try:
+        c.execute(f"""
+            SELECT DISTINCT trim(i.descripcion), o.proveedor
+            FROM {items} i JOIN {ordenes} o ON o.id = i.orden_id
+            WHERE o.estado = 'aprobada' AND trim(i.descripcion) != ''
+        """)
+    except sqlite3.OperationalError:
+        conn.close()
+        return  # tabla de órdenes con esquema antiguo (sin proveedor)
+    claves = set(c.fetchall())
+    c.execute(f"DELETE FROM {TABLAS_PRECIOS[tipo]}")
+    actualizar_precios(c, tipo, claves)
+    conn.commit()
+    conn.close()
+
+
+def sugerir_precios(tipo, item, proveedor=None, limite=4):
+    """Historial del ítem: primero el del proveedor indicado, luego los demás
+    por fecha. Devuelve [(proveedor, ultimo, fecha, promedio, minimo, maximo, compras)]."""
+    if not item or not item.strip():
+        return []
+    conn = get_conn(tipo)
+    c = conn.cursor()
+    c.execute(f"""
+        SELECT proveedor, ultimo_precio, ultima_fecha, promedio, minimo, maximo, compras
+        FROM {TABLAS_PRECIOS[tipo]}
+        WHERE item = ?
+        ORDER BY proveedor = ? DESC, ultima_fecha DESC
+        LIMIT ?
+    """, (item.strip(), proveedor or "", limite))
+    filas = c.fetchall()
+    conn.close()
+    return filas
+
+
+# ============================
+# Consultas por ítem
+# ============================
+def compras_por_item(tipo, texto, estado=None):
+    """Órdenes que contienen ítems cuya descripción incluye `texto`,
+    con la cantidad y el monto de esos ítems."""
+    _, ordenes, items, col_numero = TABLAS[tipo]
+    conn = get_conn(tipo)
+    c = conn.cursor()
+    filtro = "AND o.estado = ?" if estado else ""
+    c.execute(f"""
+        SELECT o.{col_numero}, o.fecha, o.proveedor, o.estado,
+               group_concat(DISTINCT i.descripcion) AS items,
+               SUM(i.cantidad) AS cantidad,
+               ROUND(SUM(i.cantidad * i.precio_unitario), 2) AS monto
+        FROM {items} i
+        JOIN {ordenes} o ON o.id = i.orden_id
+        WHERE i.descripcion LIKE ? {filtro}
+        GROUP BY o.id
+        ORDER BY o.id DESC
+    """, (f"%{texto}%", estado) if estado else (f"%{texto}%",))
+    filas = c.fetchall()
+    conn.close()
+    return filas
+
+
+def totales_por_proveedor(tipo, estado=None):
+    """Monto sin IGV por proveedor, sumado desde los ítems."""
+    _, ordenes, items, _ = TABLAS[tipo]
+    conn = get_conn(tipo)
+    c = conn.cursor()
+    filtro = "WHERE o.estado = ?" if estado else ""
+    c.execute(f"""
+        SELECT o.proveedor, COUNT(DISTINCT o.id) AS ordenes,
+               ROUND(SUM(i.cantidad * i.precio_unitario), 2) AS monto
+        FROM {ordenes} o
+        JOIN {items} i ON i.orden_id = o.id
+        {filtro}
+        GROUP BY o.proveedor
+        ORDER BY monto DESC
+    """, (estado,) if estado else ())
+    filas = c.fetchall()
+    conn.close()
+    return filas
@@ -0,0 +1,80 @@
+# precarga.py
+# Precarga real de cachés al iniciar la sesión (reemplaza la barra de progreso
+# simulada de app.py). Cada paso se mide por separado para ver qué cuesta.
+import time
+
+import datos_cache
+import maestros
+import produccion_repositorio as repo_ops
+import produccion_eventos as eventos
+
+ETAPAS_FILE = "data/etapas.json"
+USUARIOS_FILE = "data/usuarios.json"  # rol y etapa asignada que lee el Kanban
+
+
+# -----------------------
+# Pasos
+# -----------------------
+def cargar_etapas(usuario):
+    return f"{len(datos_cache.leer_json(ETAPAS_FILE, []))} etapas"
+
+
+def cargar_indice_ops(usuario):
+    ops = repo_ops.cargar_ops()
+    # Construye la caché de eventos y el índice (op, etapa) de la trazabilidad
+    con_eventos = eventos.ops_con_eventos()
+    return f"{len(ops)} OPs, {len(con_eventos)} con trazabilidad"
+
+
+def cargar_tablas_cotizador(usuario):
+    import listas_precios
+    version = listas_precios.vigente()
+    tablas = listas_precios.tablas(version)  # compila la lista vigente una vez por proceso
+    return (f"{len(tablas['opciones'])} tablas (lista v{version}), "
+            f"{len(tablas['impresion'])} precios de impresión, {maestros.total('clientes')} clientes")
+
+
+def cargar_permisos(usuario):
+    # Deja en caché el archivo que produccion.get_permisos_usuario lee en cada render
+    usuarios = datos_cache.leer_json(USUARIOS_FILE, {})
+    etapa = usuarios.get(usuario, {}).get("etapa_asignada")
+    return f"{len(usuarios)} usuarios, etapa asignada {etapa or '-'}"
+
+
+# Orden de ejecución; otros módulos pueden agregar pasos con registrar_paso()
+PASOS = [
+    ("Etapas de producción", cargar_etapas),
+    ("Índice de OPs", cargar_indice_ops),
+    ("Tablas de precios del cotizador", cargar_tablas_cotizador),
+    ("Permisos de usuario", cargar_permisos),
+]
+
+
+def registrar_paso(nombre, funcion):
+    PASOS.append((nombre, funcion))
+
+
+def ejecutar(usuario, al_avanzar=None):
+    """Ejecuta los pasos en orden y devuelve [{paso, ms, detalle, error}].
+    `al_avanzar(indice, total, nombre)` se llama antes de cada paso.
+    Un paso que falla no detiene a los demás."""
+    resultados = []
+    total = len(PASOS)
+    for i, (nombre, funcion) in enumerate(PASOS):
+        if al_avanzar:
+            al_avanzar(i, total, nombre)
+        inicio = time.perf_counter()
+        detalle, error = "", None
+        try:
+            detalle = funcion(usuario) or ""
+        except Exception as e:
+            error = str(e)
+        resultados.append({
+            "paso": nombre,
+            "ms": round((time.perf_counter() - inicio) * 1000, 1),
+            "detalle": detalle,
+            "error": error
+        })
+    if al_avanzar:
+        al_avanzar(total, total, "Listo")
+    return resultados
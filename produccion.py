@@ -1,57 +1,33 @@
 import streamlit as st
-import json
-import os
 from datetime import datetime
-import uuid
 import shutil  # para guardar archivos
 from pathlib import Path
 import time
 import plotly.graph_objects as go
 import random
+import produccion_repositorio as repo_ops
+import produccion_eventos as eventos
+import datos_cache
+import medios
 ETAPAS_FILE = "data/etapas.json"
-OPS_FILE = "data/ordenes_produccion.json"
-TRAZABILIDAD_FILE = "data/trazabilidad.json"
 USUARIOS_FILE = "data/usuarios.json"
 ALERTAS_FILE = "data/alertas_pendientes.json"
-EVIDENCIA_DIR = "evidencias"
 IMAGENES_DIR = Path("files/imagenes_op")  # Usamos pathlib para mayor compatibilidad
 
 def cargar_etapas():
-    if os.path.exists(ETAPAS_FILE):
-        with open(ETAPAS_FILE, "r", encoding="utf-8") as f: 
-            return json.load(f)
-    return []
+    return datos_cache.leer_json(ETAPAS_FILE, [])
 
 def cargar_ops():
-    if os.path.exists(OPS_FILE):
-        with open(OPS_FILE, "r", encoding="utf-8") as f:
-            return json.load(f)
-    return []
-
-def guardar_ops(ops):
-    os.makedirs(os.path.dirname(OPS_FILE), exist_ok=True)
-    with open(OPS_FILE, "w", encoding="utf-8") as f:
-        json.dump(ops, f, indent=4, ensure_ascii=False)
+    return repo_ops.cargar_ops()
 
 def guardar_trazabilidad(data):
-    os.makedirs(os.path.dirname(TRAZABILIDAD_FILE), exist_ok=True)
-    if os.path.exists(TRAZABILIDAD_FILE):
-        with open(TRAZABILIDAD_FILE, "r", encoding="utf-8") as f:
-            historial = json.load(f)
-    else:
-        historial = []
-    historial.append(data)
-    with open(TRAZABILIDAD_FILE, "w", encoding="utf-8") as f:
-        json.dump(historial, f, indent=4, ensure_ascii=False)
+    eventos.registrar_evento(data)
 
 def get_usuario_actual():
     return st.session_state.get("usuario", None)
 
 def cargar_usuario_info():
-    if os.path.exists(USUARIOS_FILE):
-        with open(USUARIOS_FILE, "r", encoding="utf-8") as f:
-            return json.load(f)
-    return {}
+    return datos_cache.leer_json(USUARIOS_FILE, {})
 
 def get_permisos_usuario(usuario):
     usuarios = cargar_usuario_info()
@@ -63,16 +39,53 @@ def chunk_list(lst, n):
         yield lst[i:i+n]
 
 def guardar_evidencia(archivo, numero_op, etapa):
+    """Ruta de la foto ya reducida (medios); la misma foto no se duplica."""
     if archivo:
-        os.makedirs(EVIDENCIA_DIR, exist_ok=True)
-        extension = os.path.splitext(archivo.name)[1]
-        nombre_archivo = f"{numero_op}_{etapa}_{uuid.uuid4().hex}{extension}"
-        ruta_archivo = os.path.join(EVIDENCIA_DIR, nombre_archivo)
-        with open(ruta_archivo, "wb") as f:
-            f.write(archivo.read())
-        return nombre_archivo
+        return medios.guardar(archivo)
     return None
 
+OPS_POR_PAGINA = 8  # tarjetas por columna y página
+
+
+def agrupar_por_etapa(ops):
+    """{etapa: [ops]} en una sola pasada, en el orden en que vienen."""
+    por_etapa = {}
+    for op in ops:
+        por_etapa.setdefault(op["estado_actual"], []).append(op)
+    return por_etapa
+
+
+def icono_alerta(op):
+    return {"red": "🔴", "orange": "🟡"}.get(op.get("color_alerta"), "🟢")
+
+
+def columna_etapa(etapa, ops_en_etapa):
+    """Tarjetas compactas (un botón por OP) con paginación propia."""
+    nombre = etapa["nombre"]
+    st.markdown(f"<h6 style='text-align: center;'>{nombre}➡️ ({len(ops_en_etapa)})</h6>", unsafe_allow_html=True)
+
+    paginas = max((len(ops_en_etapa) - 1) // OPS_POR_PAGINA + 1, 1)
+    clave_pag = f"kanban_pag_{nombre}"
+    pagina = min(st.session_state.get(clave_pag, 0), paginas - 1)
+    inicio = pagina * OPS_POR_PAGINA
+
+    for op in ops_en_etapa[inicio:inicio + OPS_POR_PAGINA]:
+        if st.button(f"{icono_alerta(op)} {op['numero_op']} - {op['producto']}", key=f"abrir_{op['numero_op']}",
+                     help=f"Cliente: {op['cliente']} · Cantidad: {op['cantidad']}", use_container_width=True):
+            st.session_state["kanban_op_abierta"] = op["numero_op"]
+            st.rerun()
+
+    if paginas > 1:
+        col_a, col_p, col_s = st.columns([1, 2, 1])
+        if col_a.button("⬅️", key=f"{clave_pag}_ant", disabled=pagina == 0):
+            st.session_state[clave_pag] = pagina - 1
+            st.rerun()
+        col_p.caption(f"{pagina + 1}/{paginas}")
+        if col_s.button("➡️", key=f"{clave_pag}_sig", disabled=pagina == paginas - 1):
+            st.session_state[clave_pag] = pagina + 1
+            st.rerun()
+
+
 def tablero_kanban():
     st.subheader("📊 Control de  Producción")
 
@@ -92,6 +105,28 @@ def tablero_kanban():
         return
     rol, etapa_asignada = get_permisos_usuario(usuario)
 
+    # Solo la OP abierta arma su formulario de acciones
+    abierta = st.session_state.get("kanban_op_abierta")
+    if abierta:
+        op = repo_ops.obtener_op(abierta)
+        if op is None:
+            # Eliminada o dividida por otro usuario
+            st.session_state.pop("kanban_op_abierta", None)
+        else:
+            with st.container(border=True):
+                col_t, col_x = st.columns([5, 1])
+                col_t.markdown(f"#### {icono_alerta(op)} OP: {op['numero_op']} - {op['producto']}")
+                if col_x.button("✖ Cerrar", key="kanban_cerrar"):
+                    st.session_state.pop("kanban_op_abierta", None)
+                    st.rerun()
+                panel_op(op, etapas, usuario)
+
+    buscar = st.text_input("🔎 Buscar OP, producto o cliente", key="kanban_buscar").strip().lower()
+    if buscar:
+        ops = [op for op in ops
+               if buscar in f"{op['numero_op']} {op['producto']} {op['cliente']}".lower()]
+    por_etapa = agrupar_por_etapa(ops)
+
     max_cols = 4
     filas_etapas = list(chunk_list(etapas, max_cols))
 
@@ -99,311 +134,279 @@ def tablero_kanban():
         columnas = st.columns(len(fila_etapas))
         for i, etapa in enumerate(fila_etapas):
             with columnas[i]:
-                st.markdown(f"<h6 style='text-align: center;'>{etapa['nombre']}➡️</h6>", unsafe_allow_html=True)
-                ops_en_etapa = [op for op in ops if op["estado_actual"] == etapa["nombre"]]
-
-                for op in ops_en_etapa:
-                    # Determinar ícono y color del estado
-                    color_fondo = "🟢"
-                    if "color_alerta" in op:
-                        if op["color_alerta"] == "red":
-                            color_fondo = "🔴"
-                        elif op["color_alerta"] == "orange":
-                            color_fondo = "🟡"
-
-                    # Construir expander con ícono de estado
-                    with st.expander(f"{color_fondo} OP: {op['numero_op']} - {op['producto']}"):
-                        
-                        st.markdown(f"**Cliente:** {op['cliente']}")
-                        st.markdown(f"**Cantidad:** {op['cantidad']}")
-
-
-                        
-                        # Obtener el nombre del archivo de imagen registrado en la OP
-                        imagen_op = op.get("imagen_op")
-
-                        if imagen_op:
-                            ruta_imagen = IMAGENES_DIR / Path(imagen_op).name  # Componemos ruta usando pathlib
-
-                            if ruta_imagen.exists():
-                                if st.button(f"🔍 Visualizar OP", key=f"ver_imagen_{op['numero_op']}"):
-                                    tab1, tab2 = st.tabs(["Detalles OP", "Imagen OP"])
-
-                                    with tab1:
-                                        # Aquí pones todos los detalles de la OP que quieras mostrar
-                                        st.markdown(f"- **Cliente:** {op.get('cliente', '-')}")
-                                        st.markdown(f"- **Producto:** {op.get('producto', '-')}")
-                                        st.markdown(f"- **Cantidad:** {op.get('cantidad', '-')}")
-                                        st.markdown(f"- **Fecha de entrega:** {op.get('fecha_entrega', '-')}")
-                                        st.markdown(f"- **Etapas:** {', '.join(op.get('etapas', []))}")
-
-                                    with tab2:
-                                        st.image(str(ruta_imagen), caption=f"OP: {op['numero_op']} - Imagen asociada", use_container_width=True)
-                            else:
-                                st.warning(f"⚠️ La imagen asociada no se encontró en: {ruta_imagen}")
-                        else:
-                            st.info("🖼️ Esta OP no tiene imagen registrada.")
-
-                        mostrar_alerta = st.checkbox("📢 Reportar alerta", key=f"ver_alerta_{op['numero_op']}")
-
-                        if mostrar_alerta:
-                            st.markdown("**Tipo de alerta**")
-                            notif_maquina = st.checkbox("Report. máquina malograda (TPM)", key=f"notif_maquina_{op['numero_op']}")
-                            notif_descanso = st.checkbox("Paro Almuerzo (1h) (Gestión Visual / TPM)", key=f"notif_descanso_{op['numero_op']}")
-                            notif_material = st.checkbox("Reabastecimiento-material (Just-In-Time)", key=f"notif_material_{op['numero_op']}")
-                            notif_op_fisica = st.checkbox("No tiene OP física (Gestión Visual)", key=f"notif_op_fisica_{op['numero_op']}")
-
-                            st.markdown("**Subir Evidencia**")
-                            evidencia = st.file_uploader("Foto (opcional)", type=["png", "jpg", "jpeg"], key=f"foto_{op['numero_op']}")
-                            comentario = st.text_area("Comentario breve", key=f"comentario_{op['numero_op']}")
-
-                            # Evaluación de alertas (no modificado)
-                            tipo_alerta = None
-                            color_alerta = None
-                            if notif_maquina:
-                                tipo_alerta = "Máquina malograda"
-                                color_alerta = "red"
-                            elif notif_material or notif_op_fisica:
-                                tipo_alerta = "Falta de material o sin OP física"
-                                color_alerta = "orange"
-
-                            if tipo_alerta:
-                                if st.button(f"🚨 Enviar alerta de: {tipo_alerta}", key=f"alerta_{op['numero_op']}"):
-                                    now = datetime.now().isoformat()
-                                    etapa_actual = op["estado_actual"]
-                                    nombre_foto = guardar_evidencia(evidencia, op["numero_op"], etapa_actual)
-
-                                    alerta = {
-                                        "numero_op": op["numero_op"],
-                                        "cliente": op["cliente"],
-                                        "producto": op["producto"],
-                                        "fecha": now,
-                                        "usuario": usuario,
-                                        "etapa": etapa_actual,
-                                        "tipo_alerta": tipo_alerta,
-                                        "color": color_alerta,
-                                        "comentario": comentario,
-                                        "foto_nombre": nombre_foto
-                                    }
-
-                                    os.makedirs(os.path.dirname(ALERTAS_FILE), exist_ok=True)
-                                    if os.path.exists(ALERTAS_FILE):
-                                        with open(ALERTAS_FILE, "r", encoding="utf-8") as f:
-                                            alertas = json.load(f)
-                                    else:
-                                        alertas = []
-                                    alertas.append(alerta)
-                                    with open(ALERTAS_FILE, "w", encoding="utf-8") as f:
-                                        json.dump(alertas, f, indent=4, ensure_ascii=False)
-
-                                    op["color_alerta"] = color_alerta
-                                    guardar_ops(ops)
-
-                                    guardar_trazabilidad({
-                                        "op": op["numero_op"],
-                                        "fecha": now,
-                                        "usuario": usuario,
-                                        "etapa_anterior": etapa_actual,
-                                        "etapa_nueva": etapa_actual,
-                                        "tipo_alerta": tipo_alerta,
-                                        "comentario": comentario,
-                                        "foto_nombre": nombre_foto
-                                    })
-
-                                    st.success(f"🚨 Alerta registrada en etapa: {etapa_actual}")
-                                    st.rerun()
-
-
-                        # Checkbox para eliminar OP
-                        eliminar_op = st.checkbox("🗑️ Eliminar esta OP", key=f"eliminar_{op['numero_op']}")
-
-                        if eliminar_op:
-                            if etapa_actual == "En Cola":
-                                # Eliminar completamente
-                                ops = [o for o in ops if o["numero_op"] != op["numero_op"]]
-                                guardar_ops(ops)
-                                st.success(f"✅ OP {op['numero_op']} eliminada completamente.")
-                                st.rerun()
-                            elif etapa_actual == etapas[-1]["nombre"]:  # Última etapa
-                                st.info(f"🗓️ La OP {op['numero_op']} está en la última etapa y se limpiará automáticamente el fin de semana.")
-                            else:
-                                st.warning(f"⚠️ Solo se pueden eliminar OPs que estén en 'En Cola' o la última etapa.")
-
-                        
-                        if st.checkbox("➕ Dividir OP", key=f"dividir_{op['numero_op']}"):
-                            num_subops = st.number_input("¿En cuántas partes quieres dividir esta OP?", min_value=2, max_value=10, step=1, key=f"n_partes_{op['numero_op']}")
-
-                            cantidades = []
-                            total_distribuido = 0
-                            for i in range(num_subops):
-                                cantidad_subop = st.number_input(
-                                    f"Cantidad para sub-OP {i+1}",
-                                    min_value=0,
-                                    key=f"cantidad_subop_{op['numero_op']}_{i}"
-                                )
-                                cantidades.append(cantidad_subop)
-                                total_distribuido += cantidad_subop
-
-                            cantidad_original = op.get("cantidad", 0)
-                            diferencia = cantidad_original - total_distribuido
-
-                            if diferencia < 0:
-                                st.error(f"La suma de las cantidades excede la cantidad original de {cantidad_original}")
-                            elif diferencia > 0:
-                                st.warning(f"Aún faltan distribuir {diferencia} unidades")
-                            else:
-                                if st.button("✅ Confirmar y crear sub-OPs", key=f"btn_confirmar_{op['numero_op']}"):
-                                    nuevas_ops = []
-                                    sufijos = "ABCDEFGHIJKLMNOPQRSTUVWXYZ"
-                                    for i in range(num_subops):
-                                        nueva_op = op.copy()
-                                        nueva_op["numero_op"] = f"{op['numero_op']}-{sufijos[i]}"
-                                        nueva_op["cantidad"] = cantidades[i]
-                                        nueva_op["estado_actual"] = op["estado_actual"]
-                                        nuevas_ops.append(nueva_op)
-
-                                    # Eliminar la OP original y agregar las nuevas
-                                    ops = [o for o in ops if o["numero_op"] != op["numero_op"]]
-                                    ops.extend(nuevas_ops)
-
-                                    guardar_ops(ops)
-
-                                    # Registrar en trazabilidad
-                                    for subop in nuevas_ops:
-                                        guardar_trazabilidad({
-                                            "op": subop["numero_op"],
-                                            "fecha": datetime.now().isoformat(),
-                                            "usuario": usuario,
-                                            "etapa_anterior": op["estado_actual"],
-                                            "etapa_nueva": op["estado_actual"],
-                                            "tipo_alerta": "Subdivisión de OP",
-                                            "comentario": f"Creada como parte de subdivisión de {op['numero_op']}"
-                                        })
-
-                                    st.success(f"✔️ OP dividida exitosamente en {num_subops} sub-OPs.")
-                                    st.rerun()
-                        etapa_actual = op["estado_actual"]
-                        if etapa_actual in op["etapas"]:
-                            indice_etapa = op["etapas"].index(etapa_actual)
-                        else:
-                            st.error(f"Error: La etapa '{etapa_actual}' no está en las etapas de OP {op['numero_op']}.")
-                            continue
-
-                        puede_avanzar = indice_etapa < len(op["etapas"]) - 1
-                        siguiente_etapa = op["etapas"][indice_etapa + 1] if puede_avanzar else None
-
-                        if puede_avanzar:
-                            datos = {
-                                "cantidad_inicial": op.get("cantidad", 0),
-                                "tiempo_inicio": None,
-                                "tiempo_fin": None,
-                                "tiempo_total": None,
-                                "personas": None
-                            }
-
-                            numero_op = op["numero_op"]
-                            mostrar_formulario = st.checkbox("📝 Registrar datos de etapa", key=f"check_formulario_{numero_op}")
-
-                            if mostrar_formulario:
-                                st.write("📊 Registro de Cantidades")
-                                st.info(f"Cantidad inicial: **{datos['cantidad_inicial']}** unidades")
-
-                                mt_utilizada = st.number_input("Cantidad de materia prima utilizada (MT)", min_value=0, key=f"mt_{numero_op}")
-                                merma = st.number_input("Cantidad de merma", min_value=0, key=f"merma_{numero_op}")
-
-                                cantidad_final = mt_utilizada - merma
-                                st.success(f"Cantidad final: **{cantidad_final}** unidades")
-
-                                mostrar_tiempos = st.checkbox("⏱️ Registrar tiempos VSM", key=f"check_tiempos_{numero_op}")
-                                if mostrar_tiempos:
-                                    st.subheader("📈 Tiempos VSM")
-                                    col1, col2, col3 = st.columns(3)
-                                    with col1:
-                                        setup_time = st.number_input("Setup Time (min)", min_value=0, key=f"setup_{numero_op}",help="Tiempo de preparación antes de comenzar la producción"  )
-                                    with col2:
-                                        cycle_time = st.number_input("Cycle Time por unidad (seg)", min_value=0, key=f"cycle_{numero_op}",help="Tiempo de ciclo necesario para producir una unidad" )
-                                    with col3:
-                                        idle_time = st.number_input("Idle Time (min)", min_value=0, key=f"idle_{numero_op}", help="Tiempo en el que la máquina o recurso está inactivo" )
-                                mostrar_crono = st.checkbox("🕒 Iniciar proceso con cronómetro", key=f"check_crono_{numero_op}")
-                                if mostrar_crono:
-                                    if st.button("▶️ Iniciar proceso", key=f"iniciar_{numero_op}"):
-                                        datos["tiempo_inicio"] = time.time()
-                                        st.success("Proceso iniciado...")
-
-                                    if st.button("⏹ Finalizar proceso", key=f"fin_{numero_op}"):
-                                        datos["tiempo_fin"] = time.time()
-                                        if datos["tiempo_inicio"]:
-                                            tiempo_total = round((datos["tiempo_fin"] - datos["tiempo_inicio"]) / 60, 2)
-                                            datos["tiempo_total"] = tiempo_total
-                                            st.success(f"⏱️ Tiempo total: {tiempo_total} minutos")
-                                        else:
-                                            st.warning("Debes iniciar primero el proceso.")
-
-                                mostrar_personas = st.checkbox("👥 Registrar número de personas", key=f"check_personas_{numero_op}")
-                                if mostrar_personas:
-                                    personas = st.number_input("Número de personas involucradas", min_value=1, key=f"personas_{numero_op}")
-                                    datos["personas"] = personas
-
-                                st.write("📄 Resumen de etapa")
-                                st.write(f"- Cantidad inicial: {datos['cantidad_inicial']}")
-                                st.write(f"- MT utilizada: {mt_utilizada}")
-                                st.write(f"- Merma: {merma}")
-                                st.write(f"- Cantidad final: {cantidad_final}")
-                                if mostrar_tiempos:
-                                    st.write(f"- Setup Time: {setup_time} min")
-                                    st.write(f"- Cycle Time: {cycle_time} seg")
-                                    st.write(f"- Idle Time: {idle_time} min")
-                                if datos["tiempo_total"]:
-                                    st.write(f"- Tiempo total proceso: {datos['tiempo_total']} min")
-                                if mostrar_personas:
-                                    st.write(f"- Personas involucradas: {datos['personas']}")
-
-                                if st.button("📤 Enviar a siguiente etapa", key=f"btn_avanzar_{numero_op}"):
-                                    op["estado_actual"] = siguiente_etapa
-                                    op["cantidad"] = cantidad_final
-                                    guardar_ops(ops)
-                                    guardar_trazabilidad({
-                                        "op": numero_op,
-                                        "fecha": datetime.now().isoformat(),
-                                        "usuario": usuario,
-                                        "etapa_anterior": etapa_actual,
-                                        "etapa_nueva": siguiente_etapa,
-                                        "mt_utilizada": mt_utilizada,
-                                        "merma": merma,
-                                        "cantidad_final": cantidad_final,
-                                        "setup_time": setup_time if mostrar_tiempos else None,
-                                        "cycle_time": cycle_time if mostrar_tiempos else None,
-                                        "idle_time": idle_time if mostrar_tiempos else None,
-                                        "tiempo_total": datos["tiempo_total"],
-                                        "personas": datos["personas"]
-                                    })
-                                    st.success(f"✅ OP {numero_op} enviada a etapa: {siguiente_etapa}")
-                                    st.rerun()
-                        else:
-                            st.success("✅ Esta OP ha completado todas sus etapas.")
-
-                        st.markdown("</div>", unsafe_allow_html=True)
-
-                        
-
-
-
-OPS_FILE = "data/ordenes_produccion.json"
-TRAZABILIDAD_FILE = "data/trazabilidad.json"
+                columna_etapa(etapa, por_etapa.get(etapa["nombre"], []))
 
-def visualizar_trazabilidad_sankey():
-    st.subheader("🔎 Visualización de Flujo de Producción (Sankey)")
 
-    # Validación de archivos
-    if not os.path.exists(OPS_FILE) or not os.path.exists(TRAZABILIDAD_FILE):
-        st.info("📂 No hay datos suficientes para graficar.")
+def panel_op(op, etapas, usuario):
+    """Detalle y acciones de una OP: alertas, eliminar, dividir y avanzar."""
+    st.markdown(f"**Cliente:** {op['cliente']}")
+    st.markdown(f"**Cantidad:** {op['cantidad']}")
+
+
+
+    # Obtener el nombre del archivo de imagen registrado en la OP
+    imagen_op = op.get("imagen_op")
+
+    if imagen_op:
+        ruta_imagen = IMAGENES_DIR / Path(imagen_op).name  # Componemos ruta usando pathlib
+
+        if ruta_imagen.exists():
+            if st.button(f"🔍 Visualizar OP", key=f"ver_imagen_{op['numero_op']}"):
+                tab1, tab2 = st.tabs(["Detalles OP", "Imagen OP"])
+
+                with tab1:
+                    # Aquí pones todos los detalles de la OP que quieras mostrar
+                    st.markdown(f"- **Cliente:** {op.get('cliente', '-')}")
+                    st.markdown(f"- **Producto:** {op.get('producto', '-')}")
+                    st.markdown(f"- **Cantidad:** {op.get('cantidad', '-')}")
+                    st.markdown(f"- **Fecha de entrega:** {op.get('fecha_entrega', '-')}")
+                    st.markdown(f"- **Etapas:** {', '.join(op.get('etapas', []))}")
+
+                with tab2:
+                    st.image(str(ruta_imagen), caption=f"OP: {op['numero_op']} - Imagen asociada", use_container_width=True)
+        else:
+            st.warning(f"⚠️ La imagen asociada no se encontró en: {ruta_imagen}")
+    else:
+        st.info("🖼️ Esta OP no tiene imagen registrada.")
+
+    mostrar_alerta = st.checkbox("📢 Reportar alerta", key=f"ver_alerta_{op['numero_op']}")
+
+    if mostrar_alerta:
+        st.markdown("**Tipo de alerta**")
+        notif_maquina = st.checkbox("Report. máquina malograda (TPM)", key=f"notif_maquina_{op['numero_op']}")
+        notif_descanso = st.checkbox("Paro Almuerzo (1h) (Gestión Visual / TPM)", key=f"notif_descanso_{op['numero_op']}")
+        notif_material = st.checkbox("Reabastecimiento-material (Just-In-Time)", key=f"notif_material_{op['numero_op']}")
+        notif_op_fisica = st.checkbox("No tiene OP física (Gestión Visual)", key=f"notif_op_fisica_{op['numero_op']}")
+
+        st.markdown("**Subir Evidencia**")
+        evidencia = st.file_uploader("Foto (opcional)", type=["png", "jpg", "jpeg"], key=f"foto_{op['numero_op']}")
+        comentario = st.text_area("Comentario breve", key=f"comentario_{op['numero_op']}")
+
+        # Evaluación de alertas (no modificado)
+        tipo_alerta = None
+        color_alerta = None
+        if notif_maquina:
+            tipo_alerta = "Máquina malograda"
+            color_alerta = "red"
+        elif notif_material or notif_op_fisica:
+            tipo_alerta = "Falta de material o sin OP física"
+            color_alerta = "orange"
+
+        if tipo_alerta:
+            if st.button(f"🚨 Enviar alerta de: {tipo_alerta}", key=f"alerta_{op['numero_op']}"):
+                now = datetime.now().isoformat()
+                etapa_actual = op["estado_actual"]
+                nombre_foto = guardar_evidencia(evidencia, op["numero_op"], etapa_actual)
+
+                alerta = {
+                    "numero_op": op["numero_op"],
+                    "cliente": op["cliente"],
+                    "producto": op["producto"],
+                    "fecha": now,
+                    "usuario": usuario,
+                    "etapa": etapa_actual,
+                    "tipo_alerta": tipo_alerta,
+                    "color": color_alerta,
+                    "comentario": comentario,
+                    "foto_nombre": nombre_foto
+                }
+
+                alertas = datos_cache.leer_json_editable(ALERTAS_FILE, [])
+                alertas.append(alerta)
+                datos_cache.guardar_json(ALERTAS_FILE, alertas)
+
+                op["color_alerta"] = color_alerta
+                repo_ops.actualizar_op(op["numero_op"], color_alerta=color_alerta)
+
+                guardar_trazabilidad({
+                    "op": op["numero_op"],
+                    "fecha": now,
+                    "usuario": usuario,
+                    "etapa_anterior": etapa_actual,
+                    "etapa_nueva": etapa_actual,
+                    "tipo_alerta": tipo_alerta,
+                    "comentario": comentario,
+                    "foto_nombre": nombre_foto
+                })
+
+                st.success(f"🚨 Alerta registrada en etapa: {etapa_actual}")
+                st.rerun()
+
+
+    # Checkbox para eliminar OP
+    eliminar_op = st.checkbox("🗑️ Eliminar esta OP", key=f"eliminar_{op['numero_op']}")
+
+    if eliminar_op:
+        etapa_actual = op["estado_actual"]
+        if etapa_actual == "En Cola":
+            # Eliminar completamente
+            repo_ops.eliminar_op(op["numero_op"])
+            st.success(f"✅ OP {op['numero_op']} eliminada completamente.")
+            st.rerun()
+        elif etapa_actual == etapas[-1]["nombre"]:  # Última etapa
+            st.info(f"🗓️ La OP {op['numero_op']} está en la última etapa y se limpiará automáticamente el fin de semana.")
+        else:
+            st.warning(f"⚠️ Solo se pueden eliminar OPs que estén en 'En Cola' o la última etapa.")
+
+
+    if st.checkbox("➕ Dividir OP", key=f"dividir_{op['numero_op']}"):
+        num_subops = st.number_input("¿En cuántas partes quieres dividir esta OP?", min_value=2, max_value=10, step=1, key=f"n_partes_{op['numero_op']}")
+
+        cantidades = []
+        total_distribuido = 0
+        for i in range(num_subops):
+            cantidad_subop = st.number_input(
+                f"Cantidad para sub-OP {i+1}",
+                min_value=0,
+                key=f"cantidad_subop_{op['numero_op']}_{i}"
+            )
+            cantidades.append(cantidad_subop)
+            total_distribuido += cantidad_subop
+
+        cantidad_original = op.get("cantidad", 0)
+        diferencia = cantidad_original - total_distribuido
+
+        if diferencia < 0:
+            st.error(f"La suma de las cantidades excede la cantidad original de {cantidad_original}")
+        elif diferencia > 0:
+            st.warning(f"Aún faltan distribuir {diferencia} unidades")
+        else:
+            if st.button("✅ Confirmar y crear sub-OPs", key=f"btn_confirmar_{op['numero_op']}"):
+                nuevas_ops = []
+                sufijos = "ABCDEFGHIJKLMNOPQRSTUVWXYZ"
+                for i in range(num_subops):
+                    nueva_op = op.copy()
+                    nueva_op["numero_op"] = f"{op['numero_op']}-{sufijos[i]}"
+                    nueva_op["cantidad"] = cantidades[i]
+                    nueva_op["estado_actual"] = op["estado_actual"]
+                    nuevas_ops.append(nueva_op)
+
+                # Eliminar la OP original y agregar las nuevas (una sola transacción)
+                if not repo_ops.dividir_op(op["numero_op"], nuevas_ops):
+                    st.error("⚠️ No se pudo dividir la OP: ya fue modificada o existe una sub-OP con ese número.")
+                    st.stop()
+
+                # Registrar en trazabilidad
+                for subop in nuevas_ops:
+                    guardar_trazabilidad({
+                        "op": subop["numero_op"],
+                        "fecha": datetime.now().isoformat(),
+                        "usuario": usuario,
+                        "etapa_anterior": op["estado_actual"],
+                        "etapa_nueva": op["estado_actual"],
+                        "tipo_alerta": "Subdivisión de OP",
+                        "comentario": f"Creada como parte de subdivisión de {op['numero_op']}"
+                    })
+
+                st.success(f"✔️ OP dividida exitosamente en {num_subops} sub-OPs.")
+                st.rerun()
+    etapa_actual = op["estado_actual"]
+    if etapa_actual in op["etapas"]:
+        indice_etapa = op["etapas"].index(etapa_actual)
+    else:
+        st.error(f"Error: La etapa '{etapa_actual}' no está en las etapas de OP {op['numero_op']}.")
         return
 
-    with open(OPS_FILE, "r", encoding="utf-8") as f:
-        ordenes = json.load(f)
+    puede_avanzar = indice_etapa < len(op["etapas"]) - 1
+    siguiente_etapa = op["etapas"][indice_etapa + 1] if puede_avanzar else None
+
+    if puede_avanzar:
+        datos = {
+            "cantidad_inicial": op.get("cantidad", 0),
+            "tiempo_inicio": None,
+            "tiempo_fin": None,
+            "tiempo_total": None,
+            "personas": None
+        }
+
+        numero_op = op["numero_op"]
+        mostrar_formulario = st.checkbox("📝 Registrar datos de etapa", key=f"check_formulario_{numero_op}")
+
+        if mostrar_formulario:
+            st.write("📊 Registro de Cantidades")
+            st.info(f"Cantidad inicial: **{datos['cantidad_inicial']}** unidades")
+
+            mt_utilizada = st.number_input("Cantidad de materia prima utilizada (MT)", min_value=0, key=f"mt_{numero_op}")
+            merma = st.number_input("Cantidad de merma", min_value=0, key=f"merma_{numero_op}")
+
+            cantidad_final = mt_utilizada - merma
+            st.success(f"Cantidad final: **{cantidad_final}** unidades")
+
+            mostrar_tiempos = st.checkbox("⏱️ Registrar tiempos VSM", key=f"check_tiempos_{numero_op}")
+            if mostrar_tiempos:
+                st.subheader("📈 Tiempos VSM")
+                col1, col2, col3 = st.columns(3)
+                with col1:
+                    setup_time = st.number_input("Setup Time (min)", min_value=0, key=f"setup_{numero_op}",help="Tiempo de preparación antes de comenzar la producción"  )
+                with col2:
+                    cycle_time = st.number_input("Cycle Time por unidad (seg)", min_value=0, key=f"cycle_{numero_op}",help="Tiempo de ciclo necesario para producir una unidad" )
+                with col3:
+                    idle_time = st.number_input("Idle Time (min)", min_value=0, key=f"idle_{numero_op}", help="Tiempo en el que la máquina o recurso está inactivo" )
+            mostrar_crono = st.checkbox("🕒 Iniciar proceso con cronómetro", key=f"check_crono_{numero_op}")
+            if mostrar_crono:
+                if st.button("▶️ Iniciar proceso", key=f"iniciar_{numero_op}"):
+                    datos["tiempo_inicio"] = time.time()
+                    st.success("Proceso iniciado...")
+
+                if st.button("⏹ Finalizar proceso", key=f"fin_{numero_op}"):
+                    datos["tiempo_fin"] = time.time()
+                    if datos["tiempo_inicio"]:
+                        tiempo_total = round((datos["tiempo_fin"] - datos["tiempo_inicio"]) / 60, 2)
+                        datos["tiempo_total"] = tiempo_total
+                        st.success(f"⏱️ Tiempo total: {tiempo_total} minutos")
+                    else:
+                        st.warning("Debes iniciar primero el proceso.")
+
+            mostrar_personas = st.checkbox("👥 Registrar número de personas", key=f"check_personas_{numero_op}")
+            if mostrar_personas:
+                personas = st.number_input("Número de personas involucradas", min_value=1, key=f"personas_{numero_op}")
+                datos["personas"] = personas
+
+            st.write("📄 Resumen de etapa")
+            st.write(f"- Cantidad inicial: {datos['cantidad_inicial']}")
+            st.write(f"- MT utilizada: {mt_utilizada}")
+            st.write(f"- Merma: {merma}")
+            st.write(f"- Cantidad final: {cantidad_final}")
+            if mostrar_tiempos:
+                st.write(f"- Setup Time: {setup_time} min")
+                st.write(f"- Cycle Time: {cycle_time} seg")
+                st.write(f"- Idle Time: {idle_time} min")
+            if datos["tiempo_total"]:
+                st.write(f"- Tiempo total proceso: {datos['tiempo_total']} min")
+            if mostrar_personas:
+                st.write(f"- Personas involucradas: {datos['personas']}")
+
+            if st.button("📤 Enviar a siguiente etapa", key=f"btn_avanzar_{numero_op}"):
+                if not repo_ops.avanzar_etapa(numero_op, etapa_actual, siguiente_etapa, cantidad_final):
+                    st.warning(f"⚠️ La OP {numero_op} ya fue movida por otro usuario. Actualizando tablero...")
+                    st.rerun()
+                guardar_trazabilidad({
+                    "op": numero_op,
+                    "fecha": datetime.now().isoformat(),
+                    "usuario": usuario,
+                    "etapa_anterior": etapa_actual,
+                    "etapa_nueva": siguiente_etapa,
+                    "mt_utilizada": mt_utilizada,
+                    "merma": merma,
+                    "cantidad_final": cantidad_final,
+                    "setup_time": setup_time if mostrar_tiempos else None,
+                    "cycle_time": cycle_time if mostrar_tiempos else None,
+                    "idle_time": idle_time if mostrar_tiempos else None,
+                    "tiempo_total": datos["tiempo_total"],
+                    "personas": datos["personas"]
+                })
+                st.success(f"✅ OP {numero_op} enviada a etapa: {siguiente_etapa}")
+                st.rerun()
+    else:
+        st.success("✅ Esta OP ha completado todas sus etapas.")
+
+
+
+def visualizar_trazabilidad_sankey():
+    st.subheader("🔎 Visualización de Flujo de Producción (Sankey)")
 
-    with open(TRAZABILIDAD_FILE, "r", encoding="utf-8") as f:
-        historial = json.load(f)
+    ordenes = repo_ops.cargar_ops()
+    historial = eventos.leer_eventos()
 
     if not ordenes or not historial:
         st.info("📂 No hay registros de OPs o trazabilidad.")
@@ -2,6 +2,7 @@ import streamlit as st
 import pandas as pd
 import os
 from datetime import datetime
+import medios
 
 # Rutas para guardar datos
 DATA_DIR = "data"
@@ -84,16 +85,11 @@ def modulo_implementacion():
 
     if st.button("Guardar implementación"):
         df = cargar_datos(IMPLEMENTACION_FILE, ["Fecha", "Área", "Responsable", "Etapa", "Checklist", "Evidencia"])
-        ev_file = evidencia.name if evidencia else ""
+        ev_file = medios.guardar(evidencia) if evidencia else ""
         df.loc[len(df)] = [fecha.strftime("%Y-%m-%d"), area, responsable, etapa, checklist, ev_file]
 
         guardar_datos(df, IMPLEMENTACION_FILE)
 
-        if evidencia:
-            os.makedirs("evidencias", exist_ok=True)
-            with open(os.path.join("evidencias", evidencia.name), "wb") as f:
-                f.write(evidencia.read())
-
         st.success("Implementación registrada.")
 
     if os.path.exists(IMPLEMENTACION_FILE):
@@ -113,16 +109,11 @@ def modulo_auditoria():
 
     if st.button("Guardar auditoría"):
         df = cargar_datos(AUDITORIAS_FILE, ["Fecha", "Área", "Auditor", "Hallazgos", "Puntaje", "Evidencia"])
-        ev_file = evidencia.name if evidencia else ""
+        ev_file = medios.guardar(evidencia) if evidencia else ""
         df.loc[len(df)] = [fecha.strftime("%Y-%m-%d"), area, responsable, hallazgos, puntaje, ev_file]
 
         guardar_datos(df, AUDITORIAS_FILE)
 
-        if evidencia:
-            os.makedirs("auditorias", exist_ok=True)
-            with open(os.path.join("auditorias", evidencia.name), "wb") as f:
-                f.write(evidencia.read())
-
         st.success("Auditoría registrada.")
 
     if os.path.exists(AUDITORIAS_FILE):
@@ -1,46 +1,47 @@
 import streamlit as st
-import json
 import os
 from datetime import datetime, date
 from PIL import Image
 import fitz  # PyMuPDF para convertir PDF a imagen
+import produccion_repositorio as repo_ops
+import datos_cache
+import tareas_fondo
 
 ETAPAS_FILE = "data/etapas.json"
-OPS_FILE = "data/ordenes_produccion.json"
 IMAGENES_DIR = "files/imagenes_op"
 
 os.makedirs(IMAGENES_DIR, exist_ok=True)
 
 def cargar_etapas():
-    if os.path.exists(ETAPAS_FILE):
-        with open(ETAPAS_FILE, "r") as f:
-            return json.load(f)
-    return []
-
-def cargar_ops():
-    if os.path.exists(OPS_FILE):
-        with open(OPS_FILE, "r") as f:
-            return json.load(f)
-    return []
-
-def guardar_ops(ops):
-    with open(OPS_FILE, "w") as f:
-        json.dump(ops, f, indent=4)
-
-def guardar_pdf_como_imagen(pdf_file, nombre_archivo_imagen):
-    try:
-        doc = fitz.open(stream=pdf_file.read(), filetype="pdf")
-        page = doc.load_page(0)  # primera página
-        pix = page.get_pixmap(dpi=150)
-        ruta_imagen = os.path.join(IMAGENES_DIR, nombre_archivo_imagen)
-        pix.save(ruta_imagen)
-        return ruta_imagen
-    except Exception as e:
-        st.error(f"Error al convertir PDF con fitz: {e}")
-    return None
+    return datos_cache.leer_json(ETAPAS_FILE, [])
+
+def rasterizar_pdf(pdf_bytes, ruta_imagen, dpi=150):
+    """Primera página del PDF a PNG. Corre en el pool de procesos, así que
+    solo recibe bytes y rutas. Escribe a un temporal y lo renombra para que
+    el Kanban nunca lea una imagen a medias."""
+    doc = fitz.open(stream=pdf_bytes, filetype="pdf")
+    pix = doc.load_page(0).get_pixmap(dpi=dpi)  # primera página
+    temporal = ruta_imagen + ".tmp"
+    pix.save(temporal, output="png")
+    doc.close()
+    os.replace(temporal, ruta_imagen)
+    return ruta_imagen
+
+def guardar_pdf_como_imagen(pdf_file, nombre_archivo_imagen, numero_op):
+    """Encola la conversión de la OP ya creada. El proceso hijo solo
+    rasteriza; la ruta se registra en la OP desde este proceso cuando la
+    imagen existe. Devuelve False si la cola la rechazó."""
+    ruta_imagen = os.path.join(IMAGENES_DIR, nombre_archivo_imagen)
+    tareas_fondo.enviar_desde_ui(
+        "tarea_imagen_op", rasterizar_pdf, pdf_file.getvalue(), ruta_imagen,
+        nombre=f"Imagen {nombre_archivo_imagen}", en_proceso=True,
+        al_terminar=lambda ruta: repo_ops.actualizar_op(numero_op, imagen_op=ruta)
+    )
+    return st.session_state.get("tarea_imagen_op") is not None
 
 def crear_op():
     st.subheader("🆕 Crear Orden de Producción (OP)")
+    tareas_fondo.panel_tarea("tarea_imagen_op")
 
     etapas_disponibles = cargar_etapas()
     nombres_etapas_disponibles = [e["nombre"] for e in etapas_disponibles]
@@ -99,16 +100,10 @@ def crear_op():
                 st.warning("Por favor, completa todos los campos.")
                 return
 
-            ops = cargar_ops()
-            if any(op["numero_op"] == numero_op for op in ops):
+            if repo_ops.existe_op(numero_op):
                 st.error("Ya existe una OP con ese número.")
                 return
 
-            imagen_path = None
-            if archivo_pdf:
-                nombre_img = f"{numero_op}_{producto.replace(' ', '_')}.png"
-                imagen_path = guardar_pdf_como_imagen(archivo_pdf, nombre_img)
-
             now = datetime.now().isoformat()
             nueva_op = {
                 "numero_op": numero_op,
@@ -128,10 +123,16 @@ def crear_op():
                         "observacion": None
                     }
                 ],
-                "imagen_op": imagen_path
+                "imagen_op": None  # se registra cuando la imagen existe
             }
 
-            ops.append(nueva_op)
-            guardar_ops(ops)
+            if not repo_ops.insertar_op(nueva_op):
+                st.error("Ya existe una OP con ese número.")
+                return
             st.success(f"✅ OP {numero_op} creada correctamente.")
+            if archivo_pdf:
+                nombre_img = f"{numero_op}_{producto.replace(' ', '_')}.png"
+                st.session_state.pop("tarea_imagen_op", None)
+                if not guardar_pdf_como_imagen(archivo_pdf, nombre_img, numero_op):
+                    return  # deja a la vista el aviso de la cola
             st.rerun()
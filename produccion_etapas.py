@@ -1,21 +1,17 @@
 import streamlit as st
-import json
 import os
 import pandas as pd
+import datos_cache
 
 # Guardar en carpeta 'data'
 RUTA_ETAPAS = os.path.join("data", "etapas.json")
 
 def cargar_etapas():
-    if os.path.exists(RUTA_ETAPAS):
-        with open(RUTA_ETAPAS, "r", encoding="utf-8") as f:
-            return json.load(f)
-    return []
+    # Copia editable: este módulo modifica la lista y la vuelve a guardar
+    return datos_cache.leer_json_editable(RUTA_ETAPAS, [])
 
 def guardar_etapas(etapas):
-    os.makedirs("data", exist_ok=True)  # Asegura que la carpeta exista
-    with open(RUTA_ETAPAS, "w", encoding="utf-8") as f:
-        json.dump(etapas, f, indent=4, ensure_ascii=False)
+    datos_cache.guardar_json(RUTA_ETAPAS, etapas)
 
 def nombre_unico(etapas, nombre, idx_editar=None):
     for idx, etapa in enumerate(etapas):
@@ -0,0 +1,227 @@
+# produccion_eventos.py
+# Bitácora de trazabilidad de producción: solo se agregan eventos (append-only).
+# Cada mes tiene su propio segmento JSON Lines en data/trazabilidad/AAAA-MM.jsonl,
+# así registrar un cambio de etapa cuesta una escritura de una línea y no
+# la reescritura de todo el historial.
+import json
+import os
+import threading
+from collections import defaultdict
+from datetime import datetime
+
+EVENTOS_DIR = os.path.join("data", "trazabilidad")
+TRAZABILIDAD_JSON = os.path.join("data", "trazabilidad.json")  # formato anterior
+MARCA_MIGRACION = os.path.join(EVENTOS_DIR, ".migrado")
+
+CAMPOS_ETAPA = ("etapa_nueva", "etapa", "etapa_anterior")
+
+_lock = threading.Lock()
+# Caché del proceso: posición leída de cada segmento, eventos ya parseados
+# e índice (op, etapa normalizada) -> evento más reciente
+_cache = {
+    "offsets": {},
+    "eventos": [],
+    "por_op": defaultdict(list),
+    "ultima_por_etapa": {}
+}
+
+
+# -----------------------
+# Segmentos
+# -----------------------
+def _segmento(fecha):
+    """'2025-08-07T17:29:07' -> '2025-08'. Sin fecha válida se usa el mes actual."""
+    if fecha and len(str(fecha)) >= 7 and str(fecha)[4] == "-":
+        return str(fecha)[:7]
+    return datetime.now().strftime("%Y-%m")
+
+
+def _ruta_segmento(segmento):
+    return os.path.join(EVENTOS_DIR, f"{segmento}.jsonl")
+
+
+def listar_segmentos(desde=None, hasta=None):
+    """Segmentos existentes (AAAA-MM) ordenados, opcionalmente acotados por fecha."""
+    if not os.path.isdir(EVENTOS_DIR):
+        return []
+    segmentos = sorted(n[:-6] for n in os.listdir(EVENTOS_DIR) if n.endswith(".jsonl"))
+    if desde:
+        segmentos = [s for s in segmentos if s >= _segmento(desde)]
+    if hasta:
+        segmentos = [s for s in segmentos if s <= _segmento(hasta)]
+    return segmentos
+
+
+def _clave_op(op):
+    return str(op if op is not None else "").strip()
+
+
+def normalizar_etapa(etapa):
+    return str(etapa).strip().lower()
+
+
+def parse_fecha(traza):
+    f = traza.get("fecha") or traza.get("timestamp") or traza.get("fecha_inicio")
+    if not f:
+        return None
+    try:
+        return datetime.fromisoformat(f)
+    except Exception:
+        try:
+            return datetime.strptime(f, "%Y-%m-%dT%H:%M:%S.%f")
+        except Exception:
+            return None
+
+
+def actualizar_indice(indice, evento):
+    """Registra `evento` como el más reciente de cada etapa que menciona
+    (etapa_nueva, etapa o etapa_anterior) si su fecha es posterior a la guardada."""
+    fecha = parse_fecha(evento) or datetime.min
+    op = _clave_op(evento.get("op"))
+    for campo in CAMPOS_ETAPA:
+        valor = evento.get(campo)
+        if not valor:
+            continue
+        clave = (op, normalizar_etapa(valor))
+        actual = indice.get(clave)
+        if actual is None or fecha > actual[0]:
+            indice[clave] = (fecha, evento)
+
+
+def indexar_ultimas(eventos):
+    """Construye un índice (op, etapa normalizada) -> (fecha, evento) desde una lista."""
+    indice = {}
+    for evento in eventos:
+        actualizar_indice(indice, evento)
+    return indice
+
+
+# -----------------------
+# Escritura
+# -----------------------
+def _escribir_lineas(segmento, eventos):
+    os.makedirs(EVENTOS_DIR, exist_ok=True)
+    lineas = "".join(json.dumps(e, ensure_ascii=False) + "\n" for e in eventos)
+    with open(_ruta_segmento(segmento), "a", encoding="utf-8") as f:
+        f.write(lineas)
+
+
+def registrar_evento(evento):
+    """Agrega un evento al segmento del mes de su fecha."""
+    migrar_desde_json()
+    if not evento.get("fecha"):
+        evento = dict(evento, fecha=datetime.now().isoformat())
+    _escribir_lineas(_segmento(evento["fecha"]), [evento])
+
+
+def migrar_desde_json():
+    """Reparte una sola vez data/trazabilidad.json en segmentos mensuales.
+    El archivo original no se modifica."""
+    if os.path.exists(MARCA_MIGRACION):
+        return 0
+    with _lock:
+        if os.path.exists(MARCA_MIGRACION):
+            return 0
+        historial = []
+        if os.path.exists(TRAZABILIDAD_JSON):
+            with open(TRAZABILIDAD_JSON, "r", encoding="utf-8") as f:
+                historial = json.load(f) or []
+            if not isinstance(historial, list):
+                historial = [historial]
+
+        por_segmento = defaultdict(list)
+        for evento in historial:
+            por_segmento[_segmento(evento.get("fecha"))].append(evento)
+        for segmento in sorted(por_segmento):
+            _escribir_lineas(segmento, por_segmento[segmento])
+
+        os.makedirs(EVENTOS_DIR, exist_ok=True)
+        with open(MARCA_MIGRACION, "w", encoding="utf-8") as f:
+            f.write(datetime.now().isoformat())
+        return len(historial)
+
+
+# -----------------------
+# Lectura incremental
+# -----------------------
+def _reiniciar_cache():
+    _cache["offsets"] = {}
+    _cache["eventos"] = []
+    _cache["por_op"] = defaultdict(list)
+    _cache["ultima_por_etapa"] = {}
+
+
+def _leer_nuevos(segmento):
+    """Lee solo los bytes agregados al segmento desde la última lectura."""
+    ruta = _ruta_segmento(segmento)
+    offset = _cache["offsets"].get(segmento, 0)
+    with open(ruta, "rb") as f:
+        f.seek(offset)
+        bloque = f.read()
+    # Ignorar una última línea incompleta (otro proceso escribiendo)
+    fin = bloque.rfind(b"\n") + 1
+    nuevos = []
+    for linea in bloque[:fin].splitlines():
+        if not linea.strip():
+            continue
+        try:
+            nuevos.append(json.loads(linea))
+        except json.JSONDecodeError:
+            continue
+    _cache["offsets"][segmento] = offset + fin
+    return nuevos
+
+
+def _refrescar():
+    migrar_desde_json()
+    with _lock:
+        segmentos = listar_segmentos()
+        # Si un segmento se acortó o desapareció, se reconstruye la caché
+        for segmento, offset in _cache["offsets"].items():
+            ruta = _ruta_segmento(segmento)
+            if not os.path.exists(ruta) or os.path.getsize(ruta) < offset:
+                _reiniciar_cache()
+                break
+
+        for segmento in segmentos:
+            if os.path.getsize(_ruta_segmento(segmento)) == _cache["offsets"].get(segmento, 0):
+                continue
+            for evento in _leer_nuevos(segmento):
+                _cache["eventos"].append(evento)
+                _cache["por_op"][_clave_op(evento.get("op"))].append(evento)
+                actualizar_indice(_cache["ultima_por_etapa"], evento)
+
+
+def leer_eventos(ops=None, desde=None, hasta=None):
+    """Devuelve eventos (copias) filtrados por OP y/o rango de fechas ISO.
+    Es la API común de lectura para trazabilidad, Sankey y VSM."""
+    _refrescar()
+    if ops is not None:
+        claves = [_clave_op(o) for o in ops]
+        eventos = [e for clave in claves for e in _cache["por_op"].get(clave, [])]
+    else:
+        eventos = _cache["eventos"]
+    if desde or hasta:
+        eventos = [e for e in eventos
+                   if (not desde or str(e.get("fecha", "")) >= str(desde))
+                   and (not hasta or str(e.get("fecha", "")) <= str(hasta))]
+    return [dict(e) for e in eventos]
+
+
+def eventos_por_op(op):
+    """Eventos de una sola OP sin recorrer el historial completo."""
+    return leer_eventos(ops=[op])
+
+
+def ops_con_eventos():
+    """Números de OP que tienen al menos un evento registrado."""
+    _refrescar()
+    return sorted(k for k, v in _cache["por_op"].items() if v)
+
+
+def ultima_traza(op, etapa):
+    """Evento más reciente (copia) de la OP en la etapa indicada, o None.
+    Consulta O(1) sobre el índice que se mantiene al leer eventos nuevos."""
+    _refrescar()
+    encontrado = _cache["ultima_por_etapa"].get((_clave_op(op), normalizar_etapa(etapa)))
+    return dict(encontrado[1]) if encontrado else None
@@ -0,0 +1,314 @@
+# produccion_repositorio.py
+# Repositorio de Órdenes de Producción (OP) sobre SQLite.
+# Reemplaza la lectura/escritura completa de data/ordenes_produccion.json:
+# cada acción del Kanban actualiza solo la fila de la OP afectada.
+import sqlite3
+import conexion_db
+import json
+import os
+from datetime import datetime
+
+DB_OPS = "produccion_ops.db"
+OPS_JSON = os.path.join("data", "ordenes_produccion.json")
+
+# Columnas de la tabla principal que se pueden actualizar fila a fila
+CAMPOS_OP = [
+    "cliente", "producto", "cantidad", "fecha_entrega", "dias_restantes",
+    "estado_actual", "color_alerta", "imagen_op", "planificacion"
+]
+
+
+# ============================
+# Conexión y esquema
+# ============================
+def get_conn():
+    conn = conexion_db.conectar(DB_OPS)
+    conn.execute("PRAGMA foreign_keys = ON;")
+    return conn
+
+
+def init_db():
+    conn = get_conn()
+    c = conn.cursor()
+    c.execute("""
+        CREATE TABLE IF NOT EXISTS ordenes_produccion (
+            id INTEGER PRIMARY KEY AUTOINCREMENT,
+            numero_op TEXT NOT NULL,
+            cliente TEXT,
+            producto TEXT,
+            cantidad INTEGER,
+            fecha_entrega TEXT,
+            dias_restantes INTEGER,
+            estado_actual TEXT,
+            color_alerta TEXT,
+            imagen_op TEXT,
+            planificacion TEXT -- JSON
+        )
+    """)
+    c.execute("""
+        CREATE TABLE IF NOT EXISTS op_etapas (
+            op_id INTEGER NOT NULL REFERENCES ordenes_produccion(id) ON DELETE CASCADE,
+            posicion INTEGER NOT NULL,
+            etapa TEXT NOT NULL,
+            PRIMARY KEY (op_id, posicion)
+        )
+    """)
+    c.execute("""
+        CREATE TABLE IF NOT EXISTS op_historial (
+            id INTEGER PRIMARY KEY AUTOINCREMENT,
+            op_id INTEGER NOT NULL REFERENCES ordenes_produccion(id) ON DELETE CASCADE,
+            etapa TEXT,
+            inicio TEXT,
+            fin TEXT,
+            observacion TEXT
+        )
+    """)
+    c.execute("""
+        CREATE TABLE IF NOT EXISTS meta (
+            clave TEXT PRIMARY KEY,
+            valor TEXT
+        )
+    """)
+    c.execute("CREATE UNIQUE INDEX IF NOT EXISTS idx_op_numero ON ordenes_produccion(numero_op)")
+    c.execute("CREATE INDEX IF NOT EXISTS idx_op_estado ON ordenes_produccion(estado_actual)")
+    c.execute("CREATE INDEX IF NOT EXISTS idx_historial_op ON op_historial(op_id)")
+    conn.commit()
+    conn.close()
+
+    migrar_desde_json()
+
+
+def migrar_desde_json():
+    """Importa una sola vez las OPs de data/ordenes_produccion.json.
+    El archivo JSON no se modifica; la marca queda registrada en la tabla meta."""
+    conn = get_conn()
+    c = conn.cursor()
+    c.execute("SELECT valor FROM meta WHERE clave = 'migracion_json'")
+    if c.fetchone():
+        conn.close()
+        return 0
+
+    ops = []
+    if os.path.exists(OPS_JSON):
+        with open(OPS_JSON, "r", encoding="utf-8") as f:
+            ops = json.load(f) or []
+
+    migradas = 0
+    for op in ops:
+        c.execute("SELECT 1 FROM ordenes_produccion WHERE numero_op = ?", (str(op.get("numero_op", "")),))
+        if c.fetchone():
+            continue
+        _insertar(c, op)
+        migradas += 1
+
+    c.execute("INSERT INTO meta (clave, valor) VALUES ('migracion_json', ?)",
+              (datetime.now().isoformat(),))
+    conn.commit()
+    conn.close()
+    return migradas
+
+
+# ============================
+# Utilidades internas
+# ============================
+def _insertar(c, op):
+    c.execute("""
+        INSERT INTO ordenes_produccion (
+            numero_op, cliente, producto, cantidad, fecha_entrega, dias_restantes,
+            estado_actual, color_alerta, imagen_op, planificacion
+        ) VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?)
+    """, (
+        str(op["numero_op"]), op.get("cliente"), op.get("producto"), op.get("cantidad"),
+        op.get("fecha_entrega"), op.get("dias_restantes"), op.get("estado_actual"),
+        op.get("color_alerta"), op.get("imagen_op"),
+        json.dumps(op.get("planificacion") or {}, ensure_ascii=False)
+    ))
+    op_id = c.lastrowid
+    c.executemany("INSERT INTO op_etapas (op_id, posicion, etapa) VALUES (?, ?, ?)",
+                  [(op_id, i, etapa) for i, etapa in enumerate(op.get("etapas") or [])])
+    c.executemany("""
+        INSERT INTO op_historial (op_id, etapa, inicio, fin, observacion) VALUES (?, ?, ?, ?, ?)
+    """, [(op_id, h.get("etapa"), h.get("inicio"), h.get("fin"), h.get("observacion"))
+          for h in op.get("historial") or []])
+    return op_id
+
+
+def _fila_a_op(row, etapas, historial):
+    op = {
+        "numero_op": row["numero_op"],
+        "cliente": row["cliente"],
+        "producto": row["producto"],
+        "cantidad": row["cantidad"],
+        "fecha_entrega": row["fecha_entrega"],
+        "dias_restantes": row["dias_restantes"],
+        "etapas": etapas,
+        "estado_actual": row["estado_actual"],
+        "planificacion": json.loads(row["planificacion"]) if row["planificacion"] else {},
+        "historial": historial,
+        "imagen_op": row["imagen_op"]
+    }
+    if row["color_alerta"]:
+        op["color_alerta"] = row["color_alerta"]
+    return op
+
+
+def _cargar(c, where="", params=()):
+    c.execute(f"SELECT * FROM ordenes_produccion {where} ORDER BY id", params)
+    rows = c.fetchall()
+    if not rows:
+        return []
+    ids = [r["id"] for r in rows]
+    marcas = ",".join("?" * len(ids))
+
+    etapas = {i: [] for i in ids}
+    c.execute(f"SELECT op_id, etapa FROM op_etapas WHERE op_id IN ({marcas}) ORDER BY op_id, posicion", ids)
+    for r in c.fetchall():
+        etapas[r["op_id"]].append(r["etapa"])
+
+    historial = {i: [] for i in ids}
+    c.execute(f"""
+        SELECT op_id, etapa, inicio, fin, observacion FROM op_historial
+        WHERE op_id IN ({marcas}) ORDER BY id
+    """, ids)
+    for r in c.fetchall():
+        historial[r["op_id"]].append({
+            "etapa": r["etapa"], "inicio": r["inicio"], "fin": r["fin"], "observacion": r["observacion"]
+        })
+
+    return [_fila_a_op(r, etapas[r["id"]], historial[r["id"]]) for r in rows]
+
+
+# ============================
+# API pública
+# ============================
+def cargar_ops(estado=None):
+    """Devuelve las OPs con la misma forma que tenía ordenes_produccion.json.
+    Si se indica `estado`, filtra por estado_actual usando el índice."""
+    conn = get_conn()
+    conn.row_factory = sqlite3.Row
+    c = conn.cursor()
+    if estado is not None:
+        ops = _cargar(c, "WHERE estado_actual = ?", (estado,))
+    else:
+        ops = _cargar(c)
+    conn.close()
+    return ops
+
+
+def obtener_op(numero_op):
+    conn = get_conn()
+    conn.row_factory = sqlite3.Row
+    c = conn.cursor()
+    ops = _cargar(c, "WHERE numero_op = ?", (str(numero_op),))
+    conn.close()
+    return ops[0] if ops else None
+
+
+def existe_op(numero_op):
+    conn = get_conn()
+    c = conn.cursor()
+    c.execute("SELECT 1 FROM ordenes_produccion WHERE numero_op = ?", (str(numero_op),))
+    existe = c.fetchone() is not None
+    conn.close()
+    return existe
+
+
+def insertar_op(op):
+    """Inserta una OP nueva. Devuelve False si el número ya existe."""
+    conn = get_conn()
+    c = conn.cursor()
+    try:
+        _insertar(c, op)
+        conn.commit()
+        return True
+    except sqlite3.IntegrityError:
+        conn.rollback()
+        return False
+    finally:
+        conn.close()
+
+
+def actualizar_op(numero_op, **campos):
+    """UPDATE de una sola fila con los campos indicados (ver CAMPOS_OP)."""
+    campos = {k: v for k, v in campos.items() if k in CAMPOS_OP}
+    if not campos:
+        return False
+    if "planificacion" in campos:
+        campos["planificacion"] = json.dumps(campos["planificacion"] or {}, ensure_ascii=False)
+    asignaciones = ", ".join(f"{k} = ?" for k in campos)
+    conn = get_conn()
+    c = conn.cursor()
+    c.execute(f"UPDATE ordenes_produccion SET {asignaciones} WHERE numero_op = ?",
+              list(campos.values()) + [str(numero_op)])
+    actualizada = c.rowcount == 1
+    conn.commit()
+    conn.close()
+    return actualizada
+
+
+def avanzar_etapa(numero_op, etapa_actual, siguiente_etapa, cantidad=None):
+    """Mueve la OP a la siguiente etapa solo si sigue en `etapa_actual`.
+    Devuelve False si otro usuario ya la movió (no se sobrescribe su cambio)."""
+    ahora = datetime.now().isoformat()
+    conn = get_conn()
+    c = conn.cursor()
+    if cantidad is None:
+        c.execute("""
+            UPDATE ordenes_produccion SET estado_actual = ?
+            WHERE numero_op = ? AND estado_actual = ?
+        """, (siguiente_etapa, str(numero_op), etapa_actual))
+    else:
+        c.execute("""
+            UPDATE ordenes_produccion SET estado_actual = ?, cantidad = ?
+            WHERE numero_op = ? AND estado_actual = ?
+        """, (siguiente_etapa, cantidad, str(numero_op), etapa_actual))
+    if c.rowcount != 1:
+        conn.rollback()
+        conn.close()
+        return False
+
+    c.execute("SELECT id FROM ordenes_produccion WHERE numero_op = ?", (str(numero_op),))
+    op_id = c.fetchone()[0]
+    c.execute("""
+        UPDATE op_historial SET fin = ?
+        WHERE op_id = ? AND etapa = ? AND fin IS NULL
+    """, (ahora, op_id, etapa_actual))
+    c.execute("""
+        INSERT INTO op_historial (op_id, etapa, inicio, fin, observacion) VALUES (?, ?, ?, NULL, NULL)
+    """, (op_id, siguiente_etapa, ahora))
+    conn.commit()
+    conn.close()
+    return True
+
+
+def eliminar_op(numero_op):
+    conn = get_conn()
+    c = conn.cursor()
+    c.execute("DELETE FROM ordenes_produccion WHERE numero_op = ?", (str(numero_op),))
+    eliminada = c.rowcount == 1
+    conn.commit()
+    conn.close()
+    return eliminada
+
+
+def dividir_op(numero_op, nuevas_ops):
+    """Reemplaza la OP original por sus sub-OPs en una sola transacción."""
+    conn = get_conn()
+    c = conn.cursor()
+    try:
+        c.execute("DELETE FROM ordenes_produccion WHERE numero_op = ?", (str(numero_op),))
+        if c.rowcount != 1:
+            conn.rollback()
+            return False
+        for op in nuevas_ops:
+            _insertar(c, op)
+        conn.commit()
+        return True
+    except sqlite3.IntegrityError:
+        conn.rollback()
+        return False
+    finally:
+        conn.close()
+
+
+init_db()
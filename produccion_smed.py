@@ -1,18 +1,19 @@
 # smed_module.py
 import streamlit as st
-import sqlite3
+import conexion_db
+import tareas_fondo
+import medios
 import time
 from datetime import datetime
 from reportlab.platypus import SimpleDocTemplate, Paragraph, Spacer, Table, TableStyle
 from reportlab.lib.pagesizes import A4
 from reportlab.lib.styles import getSampleStyleSheet
-import os
 
 # =======================
 # BASE DE DATOS
 # =======================
 def init_db():
-    conn = sqlite3.connect("produccion_smed.db")
+    conn = conexion_db.conectar("produccion_smed.db")
     c = conn.cursor()
     c.execute('''CREATE TABLE IF NOT EXISTS smed_implementaciones (
                     id INTEGER PRIMARY KEY AUTOINCREMENT,
@@ -38,7 +39,7 @@ def init_db():
 # FUNCIONES AUXILIARES
 # =======================
 def guardar_implementacion(version, maquina):
-    conn = sqlite3.connect("produccion_smed.db")
+    conn = conexion_db.conectar("produccion_smed.db")
     c = conn.cursor()
     fecha = datetime.now().strftime("%Y-%m-%d %H:%M:%S")
     c.execute("INSERT INTO smed_implementaciones (version, maquina, fecha) VALUES (?, ?, ?)", 
@@ -47,7 +48,7 @@ def guardar_implementacion(version, maquina):
     conn.close()
 
 def guardar_actividad(version, descripcion, operadores, tiempo, tipo, mejora, foto_path=None):
-    conn = sqlite3.connect("produccion_smed.db")
+    conn = conexion_db.conectar("produccion_smed.db")
     c = conn.cursor()
     c.execute("INSERT INTO smed_actividades (version, descripcion, operadores, tiempo, tipo, mejora, foto_path) VALUES (?, ?, ?, ?, ?, ?, ?)", 
               (version, descripcion, operadores, tiempo, tipo, mejora, foto_path))
@@ -55,7 +56,7 @@ def guardar_actividad(version, descripcion, operadores, tiempo, tipo, mejora, fo
     conn.close()
 
 def exportar_pdf(version):
-    conn = sqlite3.connect("produccion_smed.db")
+    conn = conexion_db.conectar("produccion_smed.db")
     c = conn.cursor()
     c.execute("SELECT * FROM smed_actividades WHERE version=?", (version,))
     actividades = c.fetchall()
@@ -124,15 +125,10 @@ def smed_app():
         mejora = st.text_area("Descripción de la mejora a realizar")
         foto = st.file_uploader("Subir foto (opcional)", type=["jpg", "png"])
 
-        foto_path = None
-        if foto:
-            os.makedirs("fotos", exist_ok=True)
-            foto_path = os.path.join("fotos", foto.name)
-            with open(foto_path, "wb") as f:
-                f.write(foto.getbuffer())
-
         if st.button("Guardar Actividad"):
             if version and descripcion:
+                # La foto se guarda solo al registrar la actividad (reducida, sin duplicados)
+                foto_path = medios.guardar(foto) if foto else None
                 guardar_actividad(version, descripcion, operadores, tiempo, tipo, mejora, foto_path)
                 st.success("Actividad guardada ✅")
             else:
@@ -140,7 +136,7 @@ def smed_app():
 
         st.write("---")
         st.subheader("📜 Historial de actividades")
-        conn = sqlite3.connect("produccion_smed.db")
+        conn = conexion_db.conectar("produccion_smed.db")
         c = conn.cursor()
         c.execute("SELECT * FROM smed_actividades WHERE version=?", (version,))
         actividades = c.fetchall()
@@ -149,8 +145,11 @@ def smed_app():
 
         if st.button("📄 Exportar PDF"):
             if version:
-                filename = exportar_pdf(version)
-                st.success(f"Reporte exportado: {filename}")
+                tareas_fondo.enviar_desde_ui(
+                    "tarea_smed_pdf", exportar_pdf, version, nombre=f"Reporte SMED {version}",
+                    archivo=f"smed_{version}.pdf", mime="application/pdf"
+                )
+        tareas_fondo.panel_tarea("tarea_smed_pdf")
 
     # TAB 2
     with tabs[1]:
@@ -158,7 +157,7 @@ def smed_app():
 
         version_sel = st.text_input("Ingrese número de versión para cargar actividades")
         if st.button("Cargar actividades"):
-            conn = sqlite3.connect("produccion_smed.db")
+            conn = conexion_db.conectar("produccion_smed.db")
             c = conn.cursor()
             c.execute("SELECT descripcion, tiempo, tipo FROM smed_actividades WHERE version=?", (version_sel,))
             acts = c.fetchall()
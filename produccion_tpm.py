@@ -1,18 +1,16 @@
 import streamlit as st
-import sqlite3
+import conexion_db
+import tareas_fondo
+import medios
+import io
 import datetime
-import os
-from PIL import Image
 import pandas as pd
-import re
 
 DB_NAME = "produccion_tpm_inspecciones.db"
-PHOTO_DIR = "fotos_evidencia"
-os.makedirs(PHOTO_DIR, exist_ok=True)
 
 # --- CONEXIÓN A BASE DE DATOS ---
 def init_db():   
-    conn = sqlite3.connect(DB_NAME)
+    conn = conexion_db.conectar(DB_NAME)
     c = conn.cursor()
     c.execute('''CREATE TABLE IF NOT EXISTS inspecciones (
                     id INTEGER PRIMARY KEY,
@@ -48,7 +46,7 @@ init_db()
 
 # --- FUNCIONES DE BASE DE DATOS ---
 def guardar_respuesta(fecha, maquina, seccion, pregunta, respuesta, observacion, foto_path):
-    conn = sqlite3.connect(DB_NAME)
+    conn = conexion_db.conectar(DB_NAME)
     c = conn.cursor()
     c.execute("""INSERT INTO inspecciones (fecha, maquina, seccion, pregunta, respuesta, observacion, foto)
                  VALUES (?, ?, ?, ?, ?, ?, ?)""",
@@ -57,7 +55,7 @@ def guardar_respuesta(fecha, maquina, seccion, pregunta, respuesta, observacion,
     conn.close()
 
 def guardar_maquina(nombre, modelo, fecha_ultimo_mant, observaciones, foto_path):
-    conn = sqlite3.connect(DB_NAME)
+    conn = conexion_db.conectar(DB_NAME)
     c = conn.cursor()
     c.execute("""INSERT INTO maquinas (nombre, modelo, fecha_ultimo_mant, observaciones, foto)
                  VALUES (?, ?, ?, ?, ?)""",
@@ -66,7 +64,7 @@ def guardar_maquina(nombre, modelo, fecha_ultimo_mant, observaciones, foto_path)
     conn.close()
 
 def programar_mantenimiento(maquina, tipo, fecha_programada):
-    conn = sqlite3.connect(DB_NAME)
+    conn = conexion_db.conectar(DB_NAME)
     c = conn.cursor()
     c.execute("""INSERT INTO mantenimientos (maquina, tipo, fecha_programada, realizado, evidencia, observacion)
                  VALUES (?, ?, ?, 0, '', '')""",
@@ -74,14 +72,14 @@ def programar_mantenimiento(maquina, tipo, fecha_programada):
     conn.commit()
     conn.close()
 
-def limpiar_nombre_archivo(texto):
-    texto = re.sub(r'[^\w\s-]', '', texto)
-    texto = texto.strip().replace(' ', '_')
-    return texto[:50]
+def exportar_excel(df):
+    buffer = io.BytesIO()
+    df.to_excel(buffer, index=False)
+    return buffer.getvalue()
 
 # --- DASHBOARD ---
 def generar_dashboard_urgente():
-    conn = sqlite3.connect(DB_NAME)
+    conn = conexion_db.conectar(DB_NAME)
     df = pd.read_sql_query("SELECT * FROM inspecciones WHERE respuesta = 'No'", conn)
     conn.close()
     st.subheader("🚨 Mantenimientos Urgentes")
@@ -94,7 +92,7 @@ def generar_dashboard_urgente():
 
 def generar_recomendaciones():
     st.subheader("💡 Recomendaciones de mantenimiento")
-    conn = sqlite3.connect(DB_NAME)
+    conn = conexion_db.conectar(DB_NAME)
     df = pd.read_sql_query("SELECT * FROM inspecciones", conn)
     conn.close()
 
@@ -114,7 +112,7 @@ def generar_recomendaciones():
 
 def mostrar_calendario_mantenimientos():
     st.subheader("📅 Calendario de mantenimientos")
-    conn = sqlite3.connect(DB_NAME)
+    conn = conexion_db.conectar(DB_NAME)
     df = pd.read_sql_query("SELECT * FROM mantenimientos", conn)
     conn.close()
 
@@ -145,9 +143,7 @@ def mostrar_tpm():
         if st.button("Guardar máquina"):
             foto_path = None
             if foto_maquina:
-                foto_path = os.path.join(PHOTO_DIR, f"{nombre}_{modelo}.jpg")
-                with open(foto_path, "wb") as f:
-                    f.write(foto_maquina.getbuffer())
+                foto_path = medios.guardar(foto_maquina)
             guardar_maquina(nombre, modelo, str(fecha_mant), observ_maquina, foto_path)
             st.success("✅ Máquina registrada correctamente")
 
@@ -155,7 +151,7 @@ def mostrar_tpm():
     st.subheader("📑 Formulario de Inspección TPM")
     fecha = st.date_input("📅 Fecha de inspección", value=datetime.date.today())
 
-    conn = sqlite3.connect(DB_NAME)
+    conn = conexion_db.conectar(DB_NAME)
     maquinas = [row[0] for row in conn.execute("SELECT nombre FROM maquinas").fetchall()]
     conn.close()
 
@@ -236,11 +232,6 @@ def mostrar_tpm():
                 with cols[3]:
                     st.file_uploader("📸 Fotos (múltiples)", type=["png", "jpg", "jpeg"],
                                      accept_multiple_files=True, key=f"f_{seccion}_{pregunta}")
-    def limpiar_nombre_archivo(texto):
-        texto = re.sub(r'[^\w\s-]', '', texto)  # quita caracteres especiales
-        texto = texto.strip().replace(' ', '_')  # espacios a guiones bajos
-        return texto[:50]  # limitar largo
-
     if st.button("💾 Guardar todo el cuestionario", key="guardar_cuestionario"):
         for seccion, preguntas in cuestionario.items():
             for pregunta in preguntas:
@@ -251,17 +242,8 @@ def mostrar_tpm():
                 if fotos:
                     for idx, foto in enumerate(fotos):
                         try:
-                            img = Image.open(foto)
-                            ext = foto.type.split("/")[-1]
-                            maquina_safe = limpiar_nombre_archivo(maquina)
-                            fecha_safe = str(fecha).replace(":", "-").replace("/", "-")
-                            seccion_safe = limpiar_nombre_archivo(seccion)
-                            pregunta_safe = limpiar_nombre_archivo(pregunta)
-
-                            nombre_archivo = f"{maquina_safe}_{fecha_safe}_{seccion_safe}_{pregunta_safe}_{idx}.{ext}"
-                            ruta_archivo = os.path.join(PHOTO_DIR, nombre_archivo)
-
-                            img.save(ruta_archivo)
+                            # Maestro reducido + miniatura, sin duplicar fotos repetidas
+                            ruta_archivo = medios.guardar(foto)
                             guardar_respuesta(str(fecha), maquina, seccion, pregunta, respuesta, observacion, ruta_archivo)
                         except Exception as e:
                             st.error(f"❌ Error al guardar foto de '{pregunta}': {e}")
@@ -273,7 +255,7 @@ def mostrar_tpm():
     # --- VER INSPECCIONES REGISTRADAS ---
     st.subheader("📊 Inspecciones Registradas")
     with st.expander("🔍 Filtrar y visualizar inspecciones"):
-        conn = sqlite3.connect(DB_NAME)
+        conn = conexion_db.conectar(DB_NAME)
         data = conn.execute("SELECT fecha, maquina, seccion, pregunta, respuesta, observacion, foto FROM inspecciones").fetchall()
         columns = ["Fecha", "Máquina", "Sección", "Pregunta", "Respuesta", "Observación", "Foto"]
         df = pd.DataFrame(data, columns=columns)
@@ -284,13 +266,22 @@ def mostrar_tpm():
             df = df[df["Fecha"] == str(fecha_filtro)]
 
         st.dataframe(df)
-        for i, row in df.iterrows():
-            if row["Foto"] and os.path.exists(row["Foto"]):
-                st.image(row["Foto"], caption=f"{row['Máquina']} - {row['Pregunta']}", width=400)
+        # Galería de miniaturas; el original reducido se abre a pedido
+        fotos = [row for _, row in df.iterrows() if medios.ruta_para_mostrar(row["Foto"])]
+        columnas = st.columns(4)
+        for i, row in enumerate(fotos):
+            with columnas[i % 4]:
+                st.image(medios.ruta_para_mostrar(row["Foto"]), caption=f"{row['Máquina']} - {row['Pregunta']}")
+        if fotos:
+            ampliar = st.selectbox("Ver foto completa", [None] + list(range(len(fotos))),
+                                   format_func=lambda i: "-" if i is None else f"{fotos[i]['Máquina']} - {fotos[i]['Pregunta']}",
+                                   key="tpm_foto_ampliar")
+            if ampliar is not None:
+                st.image(medios.ruta_para_mostrar(fotos[ampliar]["Foto"], miniatura=False))
 
     # Puedes continuar este proyecto si deseas que lo divida en módulos (app.py, mod_inspeccion.py, mod_dashboard.py, etc.)
     def generar_dashboard_urgente():
-        conn = sqlite3.connect(DB_NAME)
+        conn = conexion_db.conectar(DB_NAME)
         df = pd.read_sql_query("SELECT * FROM inspecciones WHERE respuesta = 'No'", conn)
         conn.close()
         st.subheader("🚨 Mantenimientos Urgentes")
@@ -311,7 +302,7 @@ def mostrar_tpm():
 
     def generar_recomendaciones():
         st.subheader("💡 Recomendaciones de mantenimiento")
-        conn = sqlite3.connect(DB_NAME)
+        conn = conexion_db.conectar(DB_NAME)
         df = pd.read_sql_query("SELECT * FROM inspecciones", conn)
         conn.close()
 
@@ -331,7 +322,7 @@ def mostrar_tpm():
 
     def mostrar_calendario_mantenimientos():
         st.subheader("📅 Calendario de mantenimientos")
-        conn = sqlite3.connect(DB_NAME)
+        conn = conexion_db.conectar(DB_NAME)
         df = pd.read_sql_query("SELECT * FROM mantenimientos", conn)
         conn.close()
 
@@ -345,8 +336,11 @@ def mostrar_tpm():
                 st.markdown(f"🔜 **{row['maquina']}** → {row['tipo']} el `{row['fecha_programada'].date()}`")
     with st.expander("📤 Exportar inspecciones"):
         if st.button("📄 Exportar a Excel"):
-            df.to_excel("inspecciones_export.xlsx", index=False)
-            with open("inspecciones_export.xlsx", "rb") as f:
-                st.download_button("📥 Descargar Excel", f, file_name="inspecciones_export.xlsx")
+            tareas_fondo.enviar_desde_ui(
+                "tarea_tpm_excel", exportar_excel, df.copy(), nombre="Exportar inspecciones",
+                archivo="inspecciones_export.xlsx",
+                mime="application/vnd.openxmlformats-officedocument.spreadsheetml.sheet"
+            )
+        tareas_fondo.panel_tarea("tarea_tpm_excel")
     
 
@@ -1,38 +1,24 @@
 import streamlit as st
 import pandas as pd
 import plotly.express as px
-import json
-
-TRAZABILIDAD_FILE = "data/trazabilidad.json"
+import produccion_eventos as eventos
 
 def mostrar_trazabilidad():
     st.header("📊 Trazabilidad de Producción")
 
-    # Cargar datos
-    try:
-        with open(TRAZABILIDAD_FILE, "r", encoding="utf-8") as f:
-            datos = json.load(f)
-        df = pd.DataFrame(datos)
-    except FileNotFoundError:
-        st.warning("No hay registros de trazabilidad.")
-        return
-    except json.JSONDecodeError:
-        st.error("Error al leer el archivo de trazabilidad.")
-        return
-
-    if df.empty:
+    # Selección de OP (solo se cargan los eventos de las OPs elegidas)
+    ops_disponibles = eventos.ops_con_eventos()
+    if not ops_disponibles:
         st.warning("No hay registros de trazabilidad.")
         return
 
-    # Selección de OP
-    ops_disponibles = sorted(df["op"].unique())
     ops_seleccionadas = st.multiselect("Selecciona la OP(s)", ops_disponibles)
 
     if not ops_seleccionadas:
         st.info("Selecciona al menos una OP para continuar.")
         return
 
-    df_filtrado = df[df["op"].isin(ops_seleccionadas)]
+    df_filtrado = pd.DataFrame(eventos.leer_eventos(ops=ops_seleccionadas))
 
     # Selección de indicador
     indicadores = ["mt_utilizada", "merma", "cantidad_final", "setup_time", "cycle_time", "idle_time", "tiempo_total", "personas"]
@@ -3,38 +3,22 @@
 import streamlit as st
 from streamlit_echarts import st_echarts
 import pandas as pd
-import json
-import os
-from datetime import datetime
 import random
 
 import speech_recognition as sr
-
-# --- Rutas a archivos (ajusta si es necesario) ---
-TRAZABILIDAD_FILE = os.path.join("data", "trazabilidad.json")
-ORDENES_FILE = os.path.join("data", "ordenes_produccion.json")
+import produccion_repositorio as repo_ops
+import produccion_eventos as eventos
 
 # -----------------------
 # Utilidades de carga
 # -----------------------
-def cargar_json(path):
-    if not os.path.exists(path):
-        return None
-    with open(path, "r", encoding="utf-8") as f:
-        return json.load(f)
-
-def cargar_trazabilidad():
-    data = cargar_json(TRAZABILIDAD_FILE)
-    if data is None:
-        return []
-    # Aseguramos que sea lista
-    return data if isinstance(data, list) else [data]
+def cargar_trazabilidad(op=None):
+    if op is not None:
+        return eventos.eventos_por_op(op)
+    return eventos.leer_eventos()
 
 def cargar_ordenes():
-    data = cargar_json(ORDENES_FILE)
-    if data is None:
-        return []
-    return data if isinstance(data, list) else [data]
+    return repo_ops.cargar_ops()
 
 # -----------------------
 # Normalización de entradas de trazabilidad
@@ -73,51 +57,38 @@ def extraer_campos_traza(traza):
         "mt_utilizada": get_num("mt_utilizada") or get_num("materia_utilizada")
     }
 
-def parse_fecha(traza):
-    f = traza.get("fecha") or traza.get("timestamp") or traza.get("fecha_inicio")
-    if not f:
-        return None
-    try:
-        return datetime.fromisoformat(f)
-    except Exception:
-        try:
-            return datetime.strptime(f, "%Y-%m-%dT%H:%M:%S.%f")
-        except Exception:
-            return None
+# Misma regla de fechas que usa el índice de produccion_eventos
+parse_fecha = eventos.parse_fecha
 
 # -----------------------
 # Normalizar OP -> dataframe para VSM
 # -----------------------
-def normalizar_op_para_vsm(op, trazabilidad_list):
+def normalizar_op_para_vsm(op, trazabilidad_list=None):
     """
-    op: dict de ordenes_produccion.json
-    trazabilidad_list: lista de dicts de trazabilidad.json
+    op: dict de produccion_repositorio.cargar_ops()
+    trazabilidad_list: opcional; sin lista se consulta el índice (op, etapa) de
+    produccion_eventos, así cada etapa se resuelve con una búsqueda O(1).
     Devuelve dataframe con columnas:
     ['etapa', 'cycle_time', 'idle_time', 'setup_time', 'merma', 'cantidad_final', 'tiempo_total', 'eficiencia', 'lead_time_acumulado', 'personas', 'errores', 'rechazos']
     """
     etapas = op.get("etapas", []) or []
     numero_op = str(op.get("numero_op", "")).strip()
-    # Filtrar trazas correspondientes a esta OP
-    trazas_op = [t for t in trazabilidad_list if str(t.get("op","")).strip() == numero_op]
-    # normalizar fechas
-    for t in trazas_op:
-        t["_fecha_parsed"] = parse_fecha(t) or datetime.min
+    if trazabilidad_list is None:
+        ultima = eventos.ultima_traza
+    else:
+        # Índice local para listas externas (no se modifican los eventos)
+        indice = eventos.indexar_ultimas(trazabilidad_list)
+
+        def ultima(op_, etapa_):
+            encontrado = indice.get((op_, eventos.normalizar_etapa(etapa_)))
+            return encontrado[1] if encontrado else None
 
     datos = []
     lead_time = 0
 
     for etapa in etapas:
-        # buscar la traza más reciente para esta etapa (match case-insensitive en etapa_nueva o 'etapa')
-        matches = [t for t in trazas_op if (
-            (t.get("etapa_nueva") and str(t.get("etapa_nueva")).strip().lower() == str(etapa).strip().lower())
-            or (t.get("etapa") and str(t.get("etapa")).strip().lower() == str(etapa).strip().lower())
-            or (t.get("etapa_anterior") and str(t.get("etapa_anterior")).strip().lower() == str(etapa).strip().lower())
-        )]
-        chosen = None
-        if matches:
-            # elegimos la con mayor fecha parseada
-            matches_sorted = sorted(matches, key=lambda x: x.get("_fecha_parsed", datetime.min), reverse=True)
-            chosen = matches_sorted[0]
+        # traza más reciente para esta etapa (case-insensitive en etapa_nueva, etapa o etapa_anterior)
+        chosen = ultima(numero_op, etapa)
 
         if chosen:
             campos = extraer_campos_traza(chosen)
@@ -305,7 +276,6 @@ def mostrar_vsm():
     st.header("📦 Dashboard de OP y VSM")
    
     # Cargar datos
-    trazabilidad = cargar_trazabilidad()
     ordenes = cargar_ordenes()
 
     # Fuente de datos: simular o reales
@@ -319,7 +289,7 @@ def mostrar_vsm():
 
     if fuente == "Usar datos reales (archivos JSON)":
         if not ordenes:
-            st.warning("No se encontraron órdenes en data/ordenes_produccion.json — caeré a simulación.")
+            st.warning("No se encontraron órdenes de producción registradas — caeré a simulación.")
             fuente = "Simular (aleatorio)"
         else:
             # selector OP
@@ -336,8 +306,8 @@ def mostrar_vsm():
             sel = st.selectbox("📋 Selecciona la OP:", options=opciones,
                                format_func=lambda x: f"OP {x.get('numero_op')} — {x.get('cliente','')} — {x.get('producto','')} — {x.get('estado_actual','')}")
             selected_order = sel
-            # Normalizar trazabilidad para la OP seleccionada
-            df = normalizar_op_para_vsm(selected_order, trazabilidad)
+            # Normalizar trazabilidad para la OP seleccionada (solo sus eventos)
+            df = normalizar_op_para_vsm(selected_order)
 
     # Si decidimos simular (por elección o falta de datos reales)
     if fuente == "Simular (aleatorio)":
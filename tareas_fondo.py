@@ -0,0 +1,187 @@
+# tareas_fondo.py
+# Tareas en segundo plano para trabajos lentos (PDF, PDF -> imagen, Excel).
+# La página envía la tarea, guarda su id y consulta el avance; el hilo de
+# Streamlit queda libre. La cola es acotada y cada usuario tiene un máximo
+# de tareas activas, así una exportación enorme no congela a los demás.
+import inspect
+import os
+import threading
+import time
+import uuid
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor
+
+import streamlit as st
+
+MAX_HILOS = 4             # tareas de E/S o que llaman a C (reportlab, pandas)
+MAX_PROCESOS = 2          # tareas de CPU puro (rasterizar PDF)
+MAX_ACTIVAS = 16          # en cola + ejecutándose, entre todos los usuarios
+MAX_POR_USUARIO = 2
+VIDA_RESULTADO_SEG = 30 * 60
+
+_lock = threading.Lock()
+_tareas = {}              # id -> dict de estado
+_hilos = None
+_procesos = None
+
+
+class ColaLlena(Exception):
+    """No se aceptó la tarea por los límites de la cola o del usuario."""
+
+
+def _pool(en_proceso):
+    global _hilos, _procesos
+    with _lock:
+        if en_proceso:
+            if _procesos is None:
+                _procesos = ProcessPoolExecutor(max_workers=MAX_PROCESOS)
+            return _procesos
+        if _hilos is None:
+            _hilos = ThreadPoolExecutor(max_workers=MAX_HILOS, thread_name_prefix="tarea")
+        return _hilos
+
+
+def _activa(t):
+    return t["estado"] in ("en cola", "ejecutando")
+
+
+def _purgar():
+    limite = time.time() - VIDA_RESULTADO_SEG
+    for id_tarea in [i for i, t in _tareas.items() if not _activa(t) and t["terminada"] < limite]:
+        del _tareas[id_tarea]
+
+
+def _actualizar(id_tarea, **campos):
+    with _lock:
+        if id_tarea in _tareas:
+            _tareas[id_tarea].update(campos)
+
+
+def _ejecutar_en_hilo(id_tarea, funcion, args, kwargs):
+    _actualizar(id_tarea, estado="ejecutando")
+    if "al_avanzar" in inspect.signature(funcion).parameters:
+        kwargs = dict(kwargs, al_avanzar=lambda fraccion, mensaje="": _actualizar(
+            id_tarea, progreso=max(0.0, min(1.0, float(fraccion))), mensaje=mensaje))
+    return funcion(*args, **kwargs)
+
+
+def _al_terminar(id_tarea, futuro, al_terminar=None):
+    try:
+        resultado = futuro.result()
+        if al_terminar:
+            al_terminar(resultado)  # en este proceso, no en el hijo
+        _actualizar(id_tarea, estado="listo", progreso=1.0, resultado=resultado, terminada=time.time())
+    except Exception as e:
+        _actualizar(id_tarea, estado="error", error=str(e), terminada=time.time())
+
+
+# ============================
+# API pública
+# ============================
+def enviar(funcion, *args, usuario=None, nombre="", en_proceso=False, archivo=None, mime=None,
+           al_terminar=None, **kwargs):
+    """Encola funcion(*args, **kwargs) y devuelve el id de la tarea.
+    en_proceso=True la ejecuta en el pool de procesos (la función y sus
+    argumentos deben poder serializarse). Si la función acepta `al_avanzar`,
+    en el pool de hilos recibe un callback al_avanzar(fraccion, mensaje).
+    archivo/mime describen el resultado para el botón de descarga.
+    al_terminar(resultado) corre en este proceso al terminar bien (p. ej. para
+    escribir en la base lo que produjo un proceso hijo); si falla, la tarea
+    queda en error.
+    Lanza ColaLlena si se superan los límites."""
+    with _lock:
+        _purgar()
+        activas = [t for t in _tareas.values() if _activa(t)]
+        if len(activas) >= MAX_ACTIVAS:
+            raise ColaLlena("El servidor está ocupado, intenta en unos segundos.")
+        if usuario and sum(1 for t in activas if t["usuario"] == usuario) >= MAX_POR_USUARIO:
+            raise ColaLlena(f"Ya tienes {MAX_POR_USUARIO} tareas en curso; espera a que terminen.")
+        id_tarea = uuid.uuid4().hex[:12]
+        _tareas[id_tarea] = {
+            "id": id_tarea, "nombre": nombre or funcion.__name__, "usuario": usuario,
+            "estado": "en cola", "progreso": 0.0, "mensaje": "", "resultado": None,
+            "error": None, "archivo": archivo, "mime": mime,
+            "creada": time.time(), "terminada": None
+        }
+
+    if en_proceso:
+        _actualizar(id_tarea, estado="ejecutando")
+        futuro = _pool(True).submit(funcion, *args, **kwargs)
+    else:
+        futuro = _pool(False).submit(_ejecutar_en_hilo, id_tarea, funcion, args, kwargs)
+    futuro.add_done_callback(lambda f: _al_terminar(id_tarea, f, al_terminar))
+    return id_tarea
+
+
+def estado(id_tarea):
+    """Copia del estado de la tarea o None si no existe (o ya expiró)."""
+    with _lock:
+        tarea = _tareas.get(id_tarea)
+        return dict(tarea) if tarea else None
+
+
+def tareas_de(usuario):
+    with _lock:
+        return [dict(t) for t in _tareas.values() if t["usuario"] == usuario]
+
+
+def datos_descarga(tarea):
+    """Bytes del resultado: acepta bytes, un buffer o la ruta de un archivo."""
+    resultado = tarea["resultado"]
+    if isinstance(resultado, (bytes, bytearray)):
+        return bytes(resultado)
+    if hasattr(resultado, "getvalue"):
+        return resultado.getvalue()
+    if isinstance(resultado, str) and os.path.exists(resultado):
+        with open(resultado, "rb") as f:
+            return f.read()
+    return None
+
+
+# ============================
+# UI
+# ============================
+def enviar_desde_ui(clave, funcion, *args, **kwargs):
+    """Envía la tarea y guarda su id en st.session_state[clave].
+    Muestra el motivo si la cola la rechaza."""
+    try:
+        st.session_state[clave] = enviar(funcion, *args, usuario=st.session_state.get("usuario"), **kwargs)
+    except ColaLlena as e:
+        st.warning(f"⏳ {e}")
+
+
+def panel_tarea(clave, al_listo=None):
+    """Muestra el avance de la tarea guardada en st.session_state[clave]
+    y el botón de descarga (o al_listo(tarea)) cuando termina.
+    Solo se refresca mientras la tarea está activa; sin tarea no dibuja nada."""
+    id_tarea = st.session_state.get(clave)
+    tarea = estado(id_tarea) if id_tarea else None
+    if tarea is None:
+        st.session_state.pop(clave, None)
+    elif _activa(tarea):
+        _avance(id_tarea)
+    else:
+        _resultado(tarea, al_listo)
+
+
+@st.fragment(run_every=1)
+def _avance(id_tarea):
+    tarea = estado(id_tarea)
+    if tarea is None or not _activa(tarea):
+        st.rerun()  # estado final: una sola recarga y el resultado queda fijo
+    texto = tarea["mensaje"] or f"{tarea['nombre']}: {tarea['estado']}..."
+    st.progress(tarea["progreso"], text=f"⏳ {texto}")
+
+
+def _resultado(tarea, al_listo):
+    id_tarea = tarea["id"]
+    if tarea["estado"] == "error":
+        st.error(f"❌ {tarea['nombre']}: {tarea['error']}")
+    elif al_listo:
+        al_listo(tarea)
+    elif tarea["archivo"]:
+        st.download_button(
+            f"⬇️ Descargar {tarea['archivo']}", data=datos_descarga(tarea),
+            file_name=tarea["archivo"], mime=tarea["mime"], key=f"dl_tarea_{id_tarea}"
+        )
+    else:
+        st.success(f"✅ {tarea['nombre']} terminado")